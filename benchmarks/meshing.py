@@ -0,0 +1,114 @@
+"""
+Compares Chunk.generate_mesh (one quad per visible face) against Chunk.greedy_mesh,
+and the size of their float and packed vertex data.
+
+Usage:
+    just bench meshing [--size 16] [--repeat 50]
+"""
+
+import argparse
+import timeit
+from collections.abc import Callable
+
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+
+from g_game.terrain.chunk import VERTEX_SIZE, Chunk
+
+
+def fill_flat(chunk: Chunk, rng: np.random.Generator) -> None:
+    """Layered ground filling the bottom half, like a superflat world."""
+    height = chunk.size[1] // 2
+    blocks = np.zeros(chunk.size, dtype=np.uint8)
+    blocks[:, : height - 3, :] = 3
+    blocks[:, height - 3 : height - 1, :] = 2
+    blocks[:, height - 1, :] = 1
+    chunk.blocks = blocks
+
+
+def fill_noisy(chunk: Chunk, rng: np.random.Generator) -> None:
+    """Rolling hills from a few random sine waves."""
+    sx, sy, sz = chunk.size
+    x, z = np.meshgrid(np.arange(sx), np.arange(sz), indexing="ij")
+    height = np.full((sx, sz), sy / 2)
+    for _ in range(4):
+        fx, fz, phase = rng.uniform(0.1, 0.6, size=3)
+        height += rng.uniform(1, sy / 8) * np.sin(fx * x + fz * z + phase * 10)
+
+    y = np.arange(sy)[None, :, None]
+    top = np.clip(height.astype(int), 1, sy - 1)[:, None, :]
+    blocks = np.where(y < top - 3, 3, np.where(y < top - 1, 2, 1))
+    blocks[np.broadcast_to(y >= top, chunk.size)] = 0
+    chunk.blocks = blocks
+
+
+def fill_random(chunk: Chunk, rng: np.random.Generator) -> None:
+    """Half air, half one of 3 block types, the worst case for both meshers."""
+    chunk.blocks = rng.integers(1, 4, size=chunk.size) * (rng.random(chunk.size) < 0.5)
+
+
+FILLS: dict[str, Callable[[Chunk, np.random.Generator], None]] = {
+    "flat": fill_flat,
+    "noisy": fill_noisy,
+    "random": fill_random,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=16, help="chunk edge length")
+    parser.add_argument("--repeat", type=int, default=50, help="timed runs per case")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    table = Table(title=f"Meshing a {args.size}³ chunk (best of {args.repeat})")
+    for column in (
+        "fill",
+        "mesher",
+        "vertices",
+        "indices",
+        "build ms",
+        "triangles",
+        "float KiB",
+        "packed KiB",
+    ):
+        table.add_column(column, justify="right")
+
+    for fill_name, fill in FILLS.items():
+        chunk = Chunk((args.size, args.size, args.size))
+        fill(chunk, np.random.default_rng(args.seed))
+
+        per_face_triangles = 0
+        for mesher_name, mesher in (
+            ("per-face", chunk.generate_mesh),
+            ("greedy", chunk.greedy_mesh),
+        ):
+            vertices, indices = mesher()
+            packed_vertices, _ = mesher(packed=True)
+            best = min(timeit.repeat(mesher, number=1, repeat=args.repeat))
+
+            triangles = len(indices) // 3
+            if mesher_name == "per-face":
+                per_face_triangles = triangles
+                ratio = "1.0x"
+            else:
+                ratio = f"{per_face_triangles / max(triangles, 1):.1f}x fewer"
+
+            table.add_row(
+                fill_name,
+                mesher_name,
+                str(len(vertices) // VERTEX_SIZE),
+                str(len(indices)),
+                f"{best * 1e3:.3f}",
+                ratio,
+                f"{vertices.nbytes / 1024:.1f}",
+                f"{packed_vertices.nbytes / 1024:.1f}",
+            )
+        table.add_section()
+
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    main()
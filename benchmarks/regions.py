@@ -0,0 +1,96 @@
+"""
+Measures region file save and load throughput in chunks/sec.
+
+Cold loads drop the region files from the page cache with posix_fadvise first,
+warm loads read them again straight after.
+
+Usage:
+    just bench regions [--columns 16] [--height 4]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from rich.console import Console
+from rich.table import Table
+
+from g_game.terrain.world import World
+
+
+def drop_page_cache(save_dir: str) -> None:
+    """Asks the kernel to evict the (already fsynced) region files from the page cache."""
+    for name in os.listdir(save_dir):
+        fd = os.open(os.path.join(save_dir, name), os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def load_all(save_dir: str, positions: list[tuple[int, int, int]]) -> float:
+    """Loads every chunk into a fresh world and returns the elapsed seconds."""
+    world = World(save_dir, radius=None)
+
+    start = time.perf_counter()
+    for position in positions:
+        world.load_chunk(position)
+    elapsed = time.perf_counter() - start
+
+    world.close()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--columns", type=int, default=16, help="columns per side")
+    parser.add_argument("--height", type=int, default=4, help="chunks per column")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    positions = [
+        (x, y, z)
+        for x in range(args.columns)
+        for y in range(args.height)
+        for z in range(args.columns)
+    ]
+
+    with tempfile.TemporaryDirectory() as save_dir:
+        world = World(save_dir, seed=args.seed, radius=None)
+        for position, chunk in zip(
+            positions, world.generator.generate_chunks(positions)
+        ):
+            world.add_chunk(position, chunk)
+
+        start = time.perf_counter()
+        world.save()
+        save_time = time.perf_counter() - start
+        world.close()
+
+        disk_bytes = sum(
+            os.path.getsize(os.path.join(save_dir, name))
+            for name in os.listdir(save_dir)
+        )
+
+        drop_page_cache(save_dir)
+        cold_time = load_all(save_dir, positions)
+        warm_time = load_all(save_dir, positions)
+
+    count = len(positions)
+    table = Table(title=f"Region files, {count} chunks ({disk_bytes / 1e6:.2f} MB)")
+    table.add_column("operation")
+    table.add_column("seconds", justify="right")
+    table.add_column("chunks/sec", justify="right")
+    for name, seconds in (
+        ("save", save_time),
+        ("load (cold cache)", cold_time),
+        ("load (warm cache)", warm_time),
+    ):
+        table.add_row(name, f"{seconds:.3f}", f"{count / seconds:,.0f}")
+
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    main()
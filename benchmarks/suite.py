@@ -0,0 +1,339 @@
+"""
+Headless benchmark suite for the CPU side of the game: meshing, world access,
+terrain generation and camera math. Needs no GPU or window.
+
+Every case is timed as the best of several runs, each looping enough calls to
+take a few milliseconds. Results are written as JSON and compared against a
+stored baseline, failing when a case got slower than the threshold allows.
+
+Usage:
+    just bench suite [--quick] [--filter mesh] [--threshold 0.15]
+    just bench-baseline                  # record benchmarks/baseline.json
+    just bench-check                     # compare against it, exit 1 on regression
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+from collections.abc import Callable, Iterator
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+
+import numpy as np
+from meshing import FILLS
+from rich.console import Console
+from rich.table import Table
+
+from g_game.terrain.chunk import Chunk
+from g_game.terrain.generator import TerrainGenerator
+from g_game.terrain.lod import LOD_FACTORS
+from g_game.terrain.visibility import face_connectivity
+from g_game.terrain.world import World
+from g_utils import create_perspective_matrix, look_at
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_PATH = os.path.join(BENCH_DIR, "results", "latest.json")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+
+# Each timed run loops a case until it takes at least this many seconds
+MIN_RUN_TIME = 0.005
+
+
+@dataclass
+class CaseResult:
+    """Per call timings of one case, in microseconds."""
+
+    best_us: float
+    median_us: float
+    number: int
+    repeat: int
+
+
+def mesh_cases(sizes: list[int]) -> Iterator[tuple[str, Callable[[], object]]]:
+    """Both meshers, float and packed, coarse levels and connectivity over every chunk size and fill."""
+    for size in sizes:
+        for fill_name, fill in FILLS.items():
+            chunk = Chunk((size, size, size))
+            fill(chunk, np.random.default_rng(0))
+            for mesher in ("generate_mesh", "greedy_mesh"):
+                function = getattr(chunk, mesher)
+                yield f"chunk.{mesher}/{fill_name}/{size}", function
+                if size <= 31:  # The packed format's position limit
+                    yield (
+                        f"chunk.{mesher}.packed/{fill_name}/{size}",
+                        lambda function=function: function(packed=True),
+                    )
+            yield (
+                f"chunk.face_connectivity/{fill_name}/{size}",
+                lambda chunk=chunk: face_connectivity(chunk.blocks),
+            )
+            # Coarse levels of detail, for chunks the 8x level divides
+            if size <= 31 and size % LOD_FACTORS[-1] == 0:
+                for lod in range(1, len(LOD_FACTORS)):
+                    yield (
+                        f"chunk.greedy_mesh.lod{lod}/{fill_name}/{size}",
+                        lambda chunk=chunk, lod=lod: chunk.greedy_mesh(
+                            packed=True, lod=lod
+                        ),
+                    )
+
+
+def world_cases(sizes: list[int]) -> Iterator[tuple[str, Callable[[], object]]]:
+    """1000 random block reads or writes across a 4x2x4 chunk area."""
+    for size in sizes:
+        generator = TerrainGenerator(0, (size, size, size))
+        positions = [(x, y, z) for x in range(4) for y in range(2) for z in range(4)]
+        world = World(radius=None)
+        world.generator = generator
+        for position, chunk in zip(positions, generator.generate_chunks(positions)):
+            world.add_chunk(position, chunk)
+
+        rng = np.random.default_rng(0)
+        extent = np.array((4, 2, 4)) * size
+        blocks = [
+            tuple(p) for p in (rng.random((1000, 3)) * extent).astype(int).tolist()
+        ]
+        # Writes alternate between two type arrays that differ at every block, so
+        # each call really changes its blocks instead of taking the no-op path
+        types = rng.integers(0, 4, size=len(blocks))
+        flipped = (types + rng.integers(1, 4, size=len(blocks))) % 4
+        chunks = [positions[i] for i in rng.integers(0, len(positions), len(blocks))]
+
+        def get_blocks(world: World = world, blocks: list = blocks) -> None:
+            for position in blocks:
+                world.get_block(position)
+
+        def set_blocks(
+            world: World = world,
+            blocks: list = blocks,
+            passes: Iterator = itertools.cycle((types.tolist(), flipped.tolist())),
+        ) -> None:
+            for position, block_type in zip(blocks, next(passes)):
+                world.set_block(position, block_type)
+            world.dirty.clear()
+
+        yield f"world.get_block x1000/{size}", get_blocks
+        yield f"world.set_block x1000/{size}", set_blocks
+
+        block_array = np.array(blocks)
+
+        def set_blocks_batched(
+            world: World = world,
+            blocks: np.ndarray = block_array,
+            passes: Iterator = itertools.cycle((types, flipped)),
+        ) -> None:
+            world.set_blocks(blocks, next(passes))
+            world.dirty.clear()
+
+        yield (
+            f"world.get_blocks x1000/{size}",
+            lambda world=world, blocks=block_array: world.get_blocks(blocks),
+        )
+        yield f"world.set_blocks x1000/{size}", set_blocks_batched
+
+        def get_chunks(world: World = world, chunks: list = chunks) -> None:
+            for position in chunks:
+                world.get_chunk(position)
+
+        yield f"world.get_chunk x1000/{size}", get_chunks
+
+        # Rays from above the terrain, looking down and around like the camera
+        origins = rng.random((1000, 3)) * extent + (0, size, 0)
+        directions = rng.normal(size=(1000, 3)) - (0, 1, 0)
+        directions /= np.linalg.norm(directions, axis=1)[:, None]
+
+        def raycasts(
+            world: World = world, origins=origins, directions=directions
+        ) -> None:
+            for origin, direction in zip(origins, directions):
+                world.raycast(origin, direction, 32.0)
+
+        yield f"world.raycast x1000/{size}", raycasts
+        yield (
+            f"world.raycast_many x1000/{size}",
+            lambda world=world, origins=origins, directions=directions: (
+                world.raycast_many(origins, directions, 32.0)
+            ),
+        )
+
+        # Connectivity search over the area and the unloaded sky above it
+        yield (
+            f"world.reachable_chunks/{size}",
+            lambda world=world: world.reachable_chunks((1, 1, 1), 4),
+        )
+
+
+def terrain_cases(sizes: list[int]) -> Iterator[tuple[str, Callable[[], object]]]:
+    """One chunk alone, and a batch of 16 sharing their columns' heightmaps."""
+    for size in sizes:
+        generator = TerrainGenerator(0, (size, size, size))
+        batch = [(x, y, 0) for x in range(4) for y in range(4)]
+        yield (
+            f"terrain.generate_chunk/{size}",
+            lambda generator=generator: generator.generate_chunk((0, 1, 0)),
+        )
+        yield (
+            f"terrain.generate_chunks x16/{size}",
+            lambda generator=generator, batch=batch: generator.generate_chunks(batch),
+        )
+
+
+def math_cases() -> Iterator[tuple[str, Callable[[], object]]]:
+    """The per-frame camera matrices."""
+    eye = np.array([3.0, 56.0, -3.0])
+    target = eye + np.array([0.0, -0.3, 1.0])
+    up = np.array([0.0, 1.0, 0.0])
+    view = np.empty((4, 4), dtype=np.float32)
+    projection = np.empty((4, 4), dtype=np.float32)
+    yield "math.look_at", lambda: look_at(eye, target, up)
+    yield "math.look_at.out", lambda: look_at(eye, target, up, out=view)
+    yield (
+        "math.create_perspective_matrix",
+        lambda: create_perspective_matrix(45.0, 800 / 600, 0.1, 100.0),
+    )
+    yield (
+        "math.create_perspective_matrix.out",
+        lambda: create_perspective_matrix(45.0, 800 / 600, 0.1, 100.0, out=projection),
+    )
+
+
+def time_case(function: Callable[[], object], repeat: int) -> CaseResult:
+    """Times `function` like timeit's autorange, then keeps the best of `repeat` runs."""
+    timer = timeit.Timer(function)
+    number = 1
+    while timer.timeit(number) < MIN_RUN_TIME:
+        number *= 2
+    runs = np.array(timer.repeat(repeat, number)) / number * 1e6
+    return CaseResult(float(runs.min()), float(np.median(runs)), number, repeat)
+
+
+def compare(
+    results: dict[str, CaseResult], baseline: dict[str, dict], threshold: float
+) -> list[str]:
+    """Prints a comparison table and returns the names of regressed cases."""
+    table = Table(title=f"Against baseline (regression above +{threshold:.0%})")
+    for column in ("case", "baseline µs", "now µs", "change"):
+        table.add_column(column, justify="left" if column == "case" else "right")
+
+    regressions: list[str] = []
+    for name, result in results.items():
+        if name not in baseline:
+            table.add_row(name, "-", f"{result.best_us:,.1f}", "[dim]new[/]")
+            continue
+
+        before = baseline[name]["best_us"]
+        change = result.best_us / before - 1
+        if change > threshold:
+            regressions.append(name)
+            style = "red"
+        elif change < -threshold:
+            style = "green"
+        else:
+            style = "dim"
+        table.add_row(
+            name,
+            f"{before:,.1f}",
+            f"{result.best_us:,.1f}",
+            f"[{style}]{change:+.1%}[/]",
+        )
+
+    Console().print(table)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--repeat", type=int, default=7, help="timed runs per case")
+    parser.add_argument("--quick", action="store_true", help="16³ chunks, 3 runs")
+    parser.add_argument("--filter", default="", help="only cases containing this")
+    parser.add_argument("--output", default=RESULTS_PATH, help="results JSON path")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON path")
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="write results as the baseline"
+    )
+    parser.add_argument(
+        "--check", action="store_true", help="exit 1 if any case regressed"
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=0.15, help="allowed slowdown, 0.15 = 15%%"
+    )
+    args = parser.parse_args()
+
+    if args.quick:
+        args.sizes, args.repeat = [16], 3
+
+    cases = [
+        *mesh_cases(args.sizes),
+        *world_cases(args.sizes),
+        *terrain_cases(args.sizes),
+        *math_cases(),
+    ]
+
+    # 1. Run every case
+    results: dict[str, CaseResult] = {}
+    table = Table(title=f"Benchmark suite (best of {args.repeat})")
+    for column in ("case", "best µs", "median µs", "calls/run"):
+        table.add_column(column, justify="left" if column == "case" else "right")
+
+    start = time.perf_counter()
+    for name, function in cases:
+        if args.filter not in name:
+            continue
+        result = results[name] = time_case(function, args.repeat)
+        table.add_row(
+            name,
+            f"{result.best_us:,.1f}",
+            f"{result.median_us:,.1f}",
+            str(result.number),
+        )
+    Console().print(table)
+    print(f"Ran {len(results)} cases in {time.perf_counter() - start:.1f} s")
+
+    # 2. Save them, with enough context to tell incomparable machines apart
+    document = {
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "system": platform.system(),
+        },
+        "results": {name: asdict(result) for name, result in results.items()},
+    }
+    paths = [args.output] + ([args.baseline] if args.save_baseline else [])
+    for path in paths:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(document, f, indent=2)
+        print(f"Wrote {path}")
+
+    # 3. Compare against the baseline
+    if args.save_baseline:
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, record one with --save-baseline")
+        sys.exit(1 if args.check else 0)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline["meta"]["machine"] != document["meta"]["machine"]:
+        print("[warning] The baseline was recorded on a different machine type")
+
+    regressions = compare(results, baseline["results"], args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regressed: {', '.join(regressions)}")
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Measures TerrainGenerator throughput in chunks/sec, one chunk at a time and in batches.
+
+Usage:
+    just bench terrain [--columns 8] [--height 4]
+"""
+
+import argparse
+import time
+
+from rich.console import Console
+from rich.table import Table
+
+from g_game.terrain.generator import TerrainGenerator
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--columns", type=int, default=8, help="columns per side")
+    parser.add_argument("--height", type=int, default=4, help="chunks per column")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    positions = [
+        (x, y, z)
+        for x in range(args.columns)
+        for z in range(args.columns)
+        for y in range(args.height)
+    ]
+    generator = TerrainGenerator(args.seed)
+
+    table = Table(title=f"Terrain generation, {len(positions)} chunks")
+    table.add_column("batch size", justify="right")
+    table.add_column("seconds", justify="right")
+    table.add_column("chunks/sec", justify="right")
+
+    for batch_size in (1, args.height, 64, len(positions)):
+        start = time.perf_counter()
+        for i in range(0, len(positions), batch_size):
+            generator.generate_chunks(positions[i : i + batch_size])
+        elapsed = time.perf_counter() - start
+
+        table.add_row(
+            str(batch_size), f"{elapsed:.3f}", f"{len(positions) / elapsed:,.0f}"
+        )
+
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,56 @@
-from g_game.game import Game
-from g_utils import GLogger
+import argparse
+
+from g_game.flight import CameraFlight
+from g_game.game import RENDER_RADIUS, TICK_RATE, Game
+from g_utils import GLogger, set_log_queue
 
 glog = GLogger(name="main")
 
 
 def main():
+    parser = argparse.ArgumentParser(prog="g")
+    parser.add_argument(
+        "--headless", action="store_true", help="run without a window or GPU"
+    )
+    parser.add_argument("--frames", type=int, help="stop after this many frames")
+    parser.add_argument("--path", help="camera flight JSON to replay")
+    parser.add_argument("--record", help="save the camera's flight to this JSON file")
+    parser.add_argument(
+        "--no-vsync", action="store_true", help="swap buffers without waiting"
+    )
+    parser.add_argument("--fps-limit", type=float, help="cap the frame rate")
+    parser.add_argument(
+        "--tick-rate", type=float, default=TICK_RATE, help="simulation ticks per second"
+    )
+    parser.add_argument(
+        "--render-radius",
+        type=int,
+        default=RENDER_RADIUS,
+        help="chunk columns streamed in around the camera",
+    )
+    parser.add_argument(
+        "--world", help="directory to load the world from and save it to on exit"
+    )
+    args = parser.parse_args()
+
+    # Keep log formatting and console writes off the render thread
+    set_log_queue(True)
     glog.i("Main entrypoint!")
-    Game().run()
+    flight = CameraFlight.load(args.path) if args.path else None
+    frames = args.frames
+    if args.headless and frames is None:
+        frames = len(flight) if flight is not None else 600
+    if args.headless and flight is None:
+        flight = CameraFlight.straight(frames)
+
+    Game(
+        headless=args.headless,
+        vsync=not args.no_vsync,
+        fps_limit=args.fps_limit,
+        tick_rate=args.tick_rate,
+        render_radius=args.render_radius,
+        world_dir=args.world,
+    ).run(frames, flight, args.record)
 
 
 if __name__ == "__main__":
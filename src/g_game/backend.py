@@ -0,0 +1,595 @@
+import ctypes
+import itertools
+from dataclasses import dataclass
+from typing import Protocol
+
+import numpy as np
+from OpenGL.GL import (
+    GL_ARRAY_BUFFER,
+    GL_COLOR_BUFFER_BIT,
+    GL_COPY_READ_BUFFER,
+    GL_COPY_WRITE_BUFFER,
+    GL_CULL_FACE,
+    GL_DEPTH_BUFFER_BIT,
+    GL_DEPTH_TEST,
+    GL_DYNAMIC_DRAW,
+    GL_ELEMENT_ARRAY_BUFFER,
+    GL_FALSE,
+    GL_FLOAT,
+    GL_RGBA32I,
+    GL_STATIC_DRAW,
+    GL_TEXTURE0,
+    GL_TEXTURE_2D,
+    GL_TEXTURE_2D_ARRAY,
+    GL_TEXTURE_BUFFER,
+    GL_TRIANGLES,
+    GL_UNSIGNED_INT,
+    glActiveTexture,
+    glBindBuffer,
+    glBindTexture,
+    glBindVertexArray,
+    glBufferData,
+    glBufferSubData,
+    glClear,
+    glClearColor,
+    glCopyBufferSubData,
+    glDeleteBuffers,
+    glDeleteTextures,
+    glDeleteVertexArrays,
+    glDrawElements,
+    glEnable,
+    glEnableVertexAttribArray,
+    glGenBuffers,
+    glGenTextures,
+    glGenVertexArrays,
+    glGetUniformLocation,
+    glMultiDrawElementsBaseVertex,
+    glTexBuffer,
+    glUniform1i,
+    glUniform3f,
+    glUniformMatrix4fv,
+    glUseProgram,
+    glVertexAttribIPointer,
+    glVertexAttribPointer,
+    glViewport,
+)
+
+from g_game.terrain.packing import PACKED_WORDS
+from g_utils import ShaderRegistry, TextureArray, load_texture_array
+
+type BufferID = int
+
+# Floats per vertex: (x, y, z, u, v)
+FLOATS_PER_VERTEX = 5
+VERTEX_BYTES = FLOATS_PER_VERTEX * 4
+PACKED_VERTEX_BYTES = PACKED_WORDS * 4
+INDEX_BYTES = 4
+
+
+def _set_vertex_layout(vbo: BufferID) -> None:
+    """Describes the (x, y, z, u, v) vertex format of `vbo` to the bound VAO."""
+    glBindBuffer(GL_ARRAY_BUFFER, vbo)
+    glVertexAttribPointer(
+        index=0,  # target vertex shader input 'aPos'
+        size=3,  # aPos expects (x, y, z) from vertices
+        normalized=GL_FALSE,
+        stride=VERTEX_BYTES,
+        pointer=ctypes.c_void_p(0),
+        type=GL_FLOAT,
+    )
+    glVertexAttribPointer(
+        index=1,  # target vertex shader input 'aTexCoord'
+        size=2,  # aTexCoord expects (u, v) from vertices
+        normalized=GL_FALSE,
+        stride=VERTEX_BYTES,
+        pointer=ctypes.c_void_p(3 * 4),  # offset by 3 floats
+        type=GL_FLOAT,
+    )
+    glEnableVertexAttribArray(0)
+    glEnableVertexAttribArray(1)
+
+
+def _set_packed_vertex_layout(vbo: BufferID) -> None:
+    """Describes the packed 2 x uint32 vertex format of `vbo` to the bound VAO."""
+    glBindBuffer(GL_ARRAY_BUFFER, vbo)
+    # The I variant keeps the words as integers instead of converting to floats
+    glVertexAttribIPointer(
+        0,  # target vertex shader input 'aPacked'
+        PACKED_WORDS,
+        GL_UNSIGNED_INT,
+        PACKED_VERTEX_BYTES,
+        ctypes.c_void_p(0),
+    )
+    glEnableVertexAttribArray(0)
+
+
+class RenderBackend(Protocol):
+    """
+    What GDraw and MeshArena render through: buffers holding meshes, programs
+    and textures, and indexed draws.
+
+    Any class with these methods is a backend, GLBackend and NullBackend are the
+    two that ship. Handles are plain ints only the backend that made them knows
+    the meaning of.
+    """
+
+    def setup(self) -> None:
+        """Sets the fixed render state, once the context is current."""
+        ...
+
+    def clear(self) -> None:
+        """Clears the color and depth buffers."""
+        ...
+
+    def set_viewport(self, width: int, height: int) -> None: ...
+
+    def load_program(self, vertex_path: str, fragment_path: str) -> int:
+        """Compiles and links a program from two shader files, returning its handle."""
+        ...
+
+    def uniform_location(self, program: int, name: str) -> int: ...
+
+    def load_texture_array(self, texture_array: TextureArray) -> int:
+        """Uploads every layer and mip level, returning the texture handle."""
+        ...
+
+    def create_buffers(
+        self, vertices: np.ndarray | int, indices: np.ndarray | int
+    ) -> tuple[int, BufferID, BufferID]:
+        """
+        Creates a VAO with a vertex and an index buffer, filled from arrays or
+        with that many bytes reserved. Returns the VAO, vertex and index buffer.
+        """
+        ...
+
+    def replace_buffers(
+        self,
+        vao: int,
+        vbo: BufferID,
+        ebo: BufferID,
+        vertices: np.ndarray,
+        indices: np.ndarray,
+    ) -> None:
+        """Re-specifies both buffers of a VAO with new data."""
+        ...
+
+    def write_vertices(self, vbo: BufferID, offset: int, data: np.ndarray) -> None:
+        """Overwrites part of a vertex buffer, `offset` in bytes."""
+        ...
+
+    def write_indices(self, vao: int, offset: int, data: np.ndarray) -> None:
+        """Overwrites part of the index buffer bound to `vao`, `offset` in bytes."""
+        ...
+
+    def copy_buffer(
+        self,
+        source: BufferID,
+        destination: BufferID,
+        copies: list[tuple[int, int, int]],
+    ) -> None:
+        """Copies (source offset, destination offset, size) byte ranges between buffers."""
+        ...
+
+    def delete_buffers(self, vao: int, vbo: BufferID, ebo: BufferID) -> None:
+        """Frees a VAO and its buffers."""
+        ...
+
+    def delete_texture(self, texture: int) -> None: ...
+
+    def create_buffer_texture(self, texels: np.ndarray) -> tuple[BufferID, int]:
+        """
+        Creates a buffer filled from (n, 4) int32 texels and a buffer texture
+        reading it. Returns the buffer and texture.
+        """
+        ...
+
+    def write_buffer_texture(
+        self, buffer: BufferID, offset: int, texels: np.ndarray
+    ) -> None:
+        """Overwrites texels of a buffer texture's buffer, `offset` in texels."""
+        ...
+
+    def bind_buffer_texture(self, texture: int, location: int, unit: int) -> None:
+        """Binds a buffer texture to a texture unit and points a sampler at it."""
+        ...
+
+    def delete_buffer_texture(self, buffer: BufferID, texture: int) -> None: ...
+
+    def bind_material(
+        self, program: int, texture: int, texture_loc: int, array: bool
+    ) -> None:
+        """Uses a program and binds a texture, or texture array, to its sampler."""
+        ...
+
+    def set_matrix(self, location: int, matrix: np.ndarray) -> None: ...
+
+    def set_vec3(self, location: int, x: float, y: float, z: float) -> None: ...
+
+    def draw_elements(self, vao: int, count: int) -> None:
+        """Draws `count` indices of a VAO as triangles."""
+        ...
+
+    def multi_draw_elements(
+        self,
+        vao: int,
+        counts: np.ndarray,
+        index_offsets: np.ndarray,
+        base_vertices: np.ndarray,
+    ) -> None:
+        """Draws many (count, byte offset, base vertex) index ranges of a VAO at once."""
+        ...
+
+    def shutdown(self) -> None:
+        """Frees what the backend still holds, before the context goes away."""
+        ...
+
+
+class GLBackend:
+    """Renders through OpenGL, which needs a current context, i.e. a GWin."""
+
+    shaders: ShaderRegistry
+
+    def __init__(self, shader_cache_dir: str | None = None) -> None:
+        """
+        Args:
+            shader_cache_dir (str, optional): Directory for cached program binaries.
+        """
+        self.shaders = ShaderRegistry(shader_cache_dir)
+
+    def setup(self) -> None:
+        """Sets the fixed render state, once the context is current."""
+        glClearColor(0.1, 0.1, 0.3, 1.0)
+        glEnable(GL_CULL_FACE)
+        glEnable(GL_DEPTH_TEST)
+
+    def clear(self) -> None:
+        """Clears the color and depth buffers."""
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+    def set_viewport(self, width: int, height: int) -> None:
+        glViewport(0, 0, width, height)
+
+    def load_program(self, vertex_path: str, fragment_path: str) -> int:
+        return self.shaders.get(vertex_path, fragment_path)
+
+    def uniform_location(self, program: int, name: str) -> int:
+        return glGetUniformLocation(program, name)
+
+    def load_texture_array(self, texture_array: TextureArray) -> int:
+        return load_texture_array(texture_array)
+
+    def create_buffers(
+        self, vertices: np.ndarray | int, indices: np.ndarray | int
+    ) -> tuple[int, BufferID, BufferID]:
+        """
+        Creates a VAO with a vertex and an index buffer.
+
+        Arrays are uploaded as static data. Byte counts reserve that much dynamic
+        storage instead, for the packed layout of a MeshArena.
+
+        Float vertices use the (x, y, z, u, v) layout of simple.vert, uint32 vertices
+        the packed layout of packed.vert.
+
+        Returns:
+            tuple: The VAO, vertex buffer and index buffer.
+        """
+        vao: int = glGenVertexArrays(1)
+        vbo, ebo = glGenBuffers(2)
+
+        # Set the context VAO for subsequent actions
+        glBindVertexArray(vao)
+
+        # Copy the vertices and indices (drawing order), or just reserve room
+        for target, buffer, data in (
+            (GL_ARRAY_BUFFER, vbo, vertices),
+            (GL_ELEMENT_ARRAY_BUFFER, ebo, indices),
+        ):
+            glBindBuffer(target, buffer)
+            if isinstance(data, np.ndarray):
+                glBufferData(target, data.nbytes, data, GL_STATIC_DRAW)
+            else:
+                glBufferData(target, data, None, GL_DYNAMIC_DRAW)
+
+        # INFO: Create and enable the attribute pointers
+        # These describe how our VBO vertex data is formatted
+        # and what gets passed to the vertex shaders' inputs
+        if isinstance(vertices, np.ndarray) and vertices.dtype != np.uint32:
+            _set_vertex_layout(vbo)
+        else:
+            _set_packed_vertex_layout(vbo)
+
+        # Unbind all buffers
+        glBindVertexArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        return vao, vbo, ebo
+
+    def replace_buffers(
+        self,
+        vao: int,
+        vbo: BufferID,
+        ebo: BufferID,
+        vertices: np.ndarray,
+        indices: np.ndarray,
+    ) -> None:
+        """
+        Re-specifies both buffers of a VAO with new data.
+
+        The buffers are re-specified rather than recreated, so the vertex layout
+        stays bound to the VAO and no GL objects are allocated.
+        """
+        glBindBuffer(GL_ARRAY_BUFFER, vbo)
+        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+        # The EBO binding is part of the VAO state, so bind that rather than unbinding it
+        glBindVertexArray(vao)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, ebo)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
+        glBindVertexArray(0)
+
+    def write_vertices(self, vbo: BufferID, offset: int, data: np.ndarray) -> None:
+        """Overwrites part of a vertex buffer, `offset` in bytes."""
+        glBindBuffer(GL_ARRAY_BUFFER, vbo)
+        glBufferSubData(GL_ARRAY_BUFFER, offset, data.nbytes, data)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def write_indices(self, vao: int, offset: int, data: np.ndarray) -> None:
+        """Overwrites part of the index buffer bound to `vao`, `offset` in bytes."""
+        glBindVertexArray(vao)
+        glBufferSubData(GL_ELEMENT_ARRAY_BUFFER, offset, data.nbytes, data)
+        glBindVertexArray(0)
+
+    def copy_buffer(
+        self,
+        source: BufferID,
+        destination: BufferID,
+        copies: list[tuple[int, int, int]],
+    ) -> None:
+        """Copies (source offset, destination offset, size) byte ranges on the GPU."""
+        glBindBuffer(GL_COPY_READ_BUFFER, source)
+        glBindBuffer(GL_COPY_WRITE_BUFFER, destination)
+        for source_offset, destination_offset, size in copies:
+            glCopyBufferSubData(
+                GL_COPY_READ_BUFFER,
+                GL_COPY_WRITE_BUFFER,
+                source_offset,
+                destination_offset,
+                size,
+            )
+        glBindBuffer(GL_COPY_READ_BUFFER, 0)
+        glBindBuffer(GL_COPY_WRITE_BUFFER, 0)
+
+    def delete_buffers(self, vao: int, vbo: BufferID, ebo: BufferID) -> None:
+        """Frees a VAO and its buffers."""
+        glDeleteVertexArrays(1, [vao])
+        glDeleteBuffers(2, [vbo, ebo])
+
+    def delete_texture(self, texture: int) -> None:
+        glDeleteTextures(1, [texture])
+
+    def create_buffer_texture(self, texels: np.ndarray) -> tuple[BufferID, int]:
+        """
+        Creates a buffer filled from (n, 4) int32 texels and a buffer texture
+        reading it as RGBA32I, for isamplerBuffer and texelFetch (GL 3.1).
+
+        Returns:
+            tuple: The buffer and the texture.
+        """
+        buffer: int = glGenBuffers(1)
+        glBindBuffer(GL_TEXTURE_BUFFER, buffer)
+        glBufferData(GL_TEXTURE_BUFFER, texels.nbytes, texels, GL_DYNAMIC_DRAW)
+
+        texture: int = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_BUFFER, texture)
+        glTexBuffer(GL_TEXTURE_BUFFER, GL_RGBA32I, buffer)
+        glBindTexture(GL_TEXTURE_BUFFER, 0)
+        glBindBuffer(GL_TEXTURE_BUFFER, 0)
+        return buffer, texture
+
+    def write_buffer_texture(
+        self, buffer: BufferID, offset: int, texels: np.ndarray
+    ) -> None:
+        """Overwrites texels of a buffer texture's buffer, `offset` in texels."""
+        glBindBuffer(GL_TEXTURE_BUFFER, buffer)
+        glBufferSubData(
+            GL_TEXTURE_BUFFER, offset * texels.strides[0], texels.nbytes, texels
+        )
+        glBindBuffer(GL_TEXTURE_BUFFER, 0)
+
+    def bind_buffer_texture(self, texture: int, location: int, unit: int) -> None:
+        """Binds a buffer texture to a texture unit and points a sampler at it."""
+        glActiveTexture(GL_TEXTURE0 + unit)
+        glBindTexture(GL_TEXTURE_BUFFER, texture)
+        glUniform1i(location, unit)
+        glActiveTexture(GL_TEXTURE0)
+
+    def delete_buffer_texture(self, buffer: BufferID, texture: int) -> None:
+        glDeleteTextures(1, [texture])
+        glDeleteBuffers(1, [buffer])
+
+    def bind_material(
+        self, program: int, texture: int, texture_loc: int, array: bool
+    ) -> None:
+        """Uses a program and binds a texture, or texture array, to its sampler."""
+        glUseProgram(program)
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(GL_TEXTURE_2D_ARRAY if array else GL_TEXTURE_2D, texture)
+        glUniform1i(texture_loc, 0)
+
+    def set_matrix(self, location: int, matrix: np.ndarray) -> None:
+        glUniformMatrix4fv(location, 1, GL_FALSE, matrix)
+
+    def set_vec3(self, location: int, x: float, y: float, z: float) -> None:
+        glUniform3f(location, x, y, z)
+
+    def draw_elements(self, vao: int, count: int) -> None:
+        """Draws `count` indices of a VAO as triangles."""
+        glBindVertexArray(vao)
+        glDrawElements(GL_TRIANGLES, count, GL_UNSIGNED_INT, ctypes.c_void_p(0))
+        glBindVertexArray(0)  # Unbind after drawing
+
+    def multi_draw_elements(
+        self,
+        vao: int,
+        counts: np.ndarray,
+        index_offsets: np.ndarray,
+        base_vertices: np.ndarray,
+    ) -> None:
+        """
+        Draws many index ranges of a VAO as triangles in one call.
+
+        Args:
+            vao (int): The VAO holding every range.
+            counts (np.ndarray): int32 index count of each range.
+            index_offsets (np.ndarray): uintp byte offset of each range's indices.
+            base_vertices (np.ndarray): int32 value added to each range's indices.
+        """
+        glBindVertexArray(vao)
+        glMultiDrawElementsBaseVertex(
+            GL_TRIANGLES,
+            counts,
+            GL_UNSIGNED_INT,
+            index_offsets.ctypes.data_as(ctypes.POINTER(ctypes.c_void_p)),
+            len(counts),
+            base_vertices,
+        )
+        glBindVertexArray(0)
+
+    def shutdown(self) -> None:
+        """Frees the programs, before the context goes away."""
+        self.shaders.clear()
+
+
+@dataclass
+class RenderStats:
+    """What a NullBackend was asked to do, cumulative since it was created."""
+
+    draw_calls: int = 0
+    meshes_drawn: int = 0
+    triangles: int = 0
+    bytes_uploaded: int = 0
+    bytes_copied: int = 0
+    state_changes: int = 0
+    buffers_created: int = 0
+    buffers_deleted: int = 0
+
+
+class NullBackend:
+    """
+    Renders nothing and needs no GPU, it only counts what it was asked to do.
+
+    Handles are made up, so everything above the backend, like MeshArena and its
+    allocators, runs exactly as it would on a GPU. Used for headless runs.
+    """
+
+    stats: RenderStats
+
+    _handles: itertools.count
+
+    def __init__(self) -> None:
+        self.stats = RenderStats()
+        self._handles = itertools.count(1)
+
+    def setup(self) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    def set_viewport(self, width: int, height: int) -> None:
+        self.stats.state_changes += 1
+
+    def load_program(self, vertex_path: str, fragment_path: str) -> int:
+        return next(self._handles)
+
+    def uniform_location(self, program: int, name: str) -> int:
+        return next(self._handles)
+
+    def load_texture_array(self, texture_array: TextureArray) -> int:
+        self.stats.bytes_uploaded += sum(level.nbytes for level in texture_array.levels)
+        return next(self._handles)
+
+    def create_buffers(
+        self, vertices: np.ndarray | int, indices: np.ndarray | int
+    ) -> tuple[int, BufferID, BufferID]:
+        for data in (vertices, indices):
+            if isinstance(data, np.ndarray):
+                self.stats.bytes_uploaded += data.nbytes
+        self.stats.buffers_created += 2
+        return next(self._handles), next(self._handles), next(self._handles)
+
+    def replace_buffers(
+        self,
+        vao: int,
+        vbo: BufferID,
+        ebo: BufferID,
+        vertices: np.ndarray,
+        indices: np.ndarray,
+    ) -> None:
+        self.stats.bytes_uploaded += vertices.nbytes + indices.nbytes
+
+    def write_vertices(self, vbo: BufferID, offset: int, data: np.ndarray) -> None:
+        self.stats.bytes_uploaded += data.nbytes
+
+    def write_indices(self, vao: int, offset: int, data: np.ndarray) -> None:
+        self.stats.bytes_uploaded += data.nbytes
+
+    def copy_buffer(
+        self,
+        source: BufferID,
+        destination: BufferID,
+        copies: list[tuple[int, int, int]],
+    ) -> None:
+        self.stats.bytes_copied += sum(size for _, _, size in copies)
+
+    def delete_buffers(self, vao: int, vbo: BufferID, ebo: BufferID) -> None:
+        self.stats.buffers_deleted += 2
+
+    def delete_texture(self, texture: int) -> None:
+        pass
+
+    def create_buffer_texture(self, texels: np.ndarray) -> tuple[BufferID, int]:
+        self.stats.bytes_uploaded += texels.nbytes
+        self.stats.buffers_created += 1
+        return next(self._handles), next(self._handles)
+
+    def write_buffer_texture(
+        self, buffer: BufferID, offset: int, texels: np.ndarray
+    ) -> None:
+        self.stats.bytes_uploaded += texels.nbytes
+
+    def bind_buffer_texture(self, texture: int, location: int, unit: int) -> None:
+        self.stats.state_changes += 2  # Texture and sampler uniform
+
+    def delete_buffer_texture(self, buffer: BufferID, texture: int) -> None:
+        self.stats.buffers_deleted += 1
+
+    def bind_material(
+        self, program: int, texture: int, texture_loc: int, array: bool
+    ) -> None:
+        self.stats.state_changes += 3  # Program, texture and sampler uniform
+
+    def set_matrix(self, location: int, matrix: np.ndarray) -> None:
+        self.stats.state_changes += 1
+
+    def set_vec3(self, location: int, x: float, y: float, z: float) -> None:
+        self.stats.state_changes += 1
+
+    def draw_elements(self, vao: int, count: int) -> None:
+        self.stats.draw_calls += 1
+        self.stats.meshes_drawn += 1
+        self.stats.triangles += count // 3
+
+    def multi_draw_elements(
+        self,
+        vao: int,
+        counts: np.ndarray,
+        index_offsets: np.ndarray,
+        base_vertices: np.ndarray,
+    ) -> None:
+        self.stats.draw_calls += 1
+        self.stats.meshes_drawn += len(counts)
+        self.stats.triangles += int(counts.sum()) // 3
+
+    def shutdown(self) -> None:
+        pass
@@ -1,3 +1,4 @@
+import math
 from typing import Any
 
 import glfw
@@ -8,28 +9,78 @@ from g_utils import GLogger, look_at
 
 glog = GLogger(name="camera")
 
+# Degrees of yaw and pitch per pixel of mouse movement
+MOUSE_SENSITIVITY = 0.1
+
+# Pitch stops short of straight up or down, where the view basis degenerates
+MAX_PITCH = 89.0
+
 
 class Camera:
+    """
+    A first person camera steered by yaw and pitch.
+
+    The view matrix lives in one preallocated float32 buffer that is only rebuilt
+    when the camera moved or turned since it was last asked for. Mouse movement is
+    summed as it arrives and applied once per frame in process_mouse().
+
+    Movement can run in fixed simulation ticks with tick(), and the view is then
+    drawn from between the last two tick positions, see get_view_matrix().
+    """
+
     position: np.ndarray
+    previous_position: np.ndarray
     world_up: np.ndarray
     front: np.ndarray
+    right: np.ndarray
+    yaw: float
+    pitch: float
     speed: float
     camera_keys: dict[int, bool]
     last_x: float
     last_y: float
     first_mouse: bool
 
+    # Mouse movement since the last process_input(), in pixels
+    _mouse_dx: float
+    _mouse_dy: float
+
+    _eye: np.ndarray
+    _target: np.ndarray
+    _view: np.ndarray
+    _view_dirty: bool
+    _view_alpha: float
+
     def __init__(
-        self, gwin: GWin, position: np.ndarray, up: np.ndarray, speed: float
+        self, gwin: GWin | None, position: np.ndarray, up: np.ndarray, speed: float
     ) -> None:
-        self.position = position
-        self.world_up = up
-        self.front = np.array([0.0, 0.0, 1.0])
+        """
+        Args:
+            gwin (GWin | None): The window whose keys and mouse steer the camera, or
+                None for a camera that is only moved from code, like in headless runs.
+        """
+        self.position = np.array(position, dtype=np.float64)
+        self.previous_position = self.position.copy()
+        self.world_up = np.array(up, dtype=np.float64)
+        self.front = np.empty(3)
+        self.right = np.empty(3)
         self.speed = speed
         self.camera_keys = {}
         self.last_x = 400
         self.last_y = 300
         self.first_mouse = True
+        self._mouse_dx = 0.0
+        self._mouse_dy = 0.0
+        self._eye = np.empty(3)
+        self._target = np.empty(3)
+        self._view = np.empty((4, 4), dtype=np.float32)
+        self._view_alpha = 1.0
+
+        # Looking down +z
+        self.set_rotation(90.0, 0.0)
+
+        if gwin is None:
+            return
 
         def mouse_callback(_window: Any, xpos: float, ypos: float) -> None:
             if self.first_mouse:
@@ -37,16 +88,13 @@ class Camera:
                 self.last_y = ypos
                 self.first_mouse = False
 
-            xoffset = xpos - self.last_x
-            yoffset = (
-                self.last_y - ypos
-            )  # Reversed since y-coordinates go from bottom to top
+            # Only summed here, several events can arrive in one frame
+            self._mouse_dx += xpos - self.last_x
+            self._mouse_dy += self.last_y - ypos  # Reversed, y goes from bottom to top
 
             self.last_x = xpos
             self.last_y = ypos
 
-            self.process_mouse_movement(xoffset, yoffset)
-
         def key_callback(
             _window: Any, key: Any, _scancode: Any, action: int, _mods: Any
         ) -> None:
@@ -59,10 +107,94 @@ class Camera:
         glfw.set_cursor_pos_callback(gwin.window, mouse_callback)
         glfw.set_input_mode(gwin.window, glfw.CURSOR, glfw.CURSOR_DISABLED)
 
-    def get_view_matrix(self) -> np.ndarray:
-        return look_at(self.position, self.position + self.front, self.world_up)
+    def set_rotation(self, yaw: float, pitch: float) -> None:
+        """Turns the camera to a yaw and pitch in degrees, pitch is clamped."""
+        self.yaw = yaw
+        self.pitch = min(max(pitch, -MAX_PITCH), MAX_PITCH)
+
+        yaw_rad, pitch_rad = math.radians(self.yaw), math.radians(self.pitch)
+        cos_pitch = math.cos(pitch_rad)
+        self.front[:] = (
+            math.cos(yaw_rad) * cos_pitch,
+            math.sin(pitch_rad),
+            math.sin(yaw_rad) * cos_pitch,
+        )
+
+        # front x up, kept unit length so strafing speed doesn't depend on pitch
+        fx, fy, fz = self.front
+        ux, uy, uz = self.world_up
+        rx, ry, rz = fy * uz - fz * uy, fz * ux - fx * uz, fx * uy - fy * ux
+        length = math.sqrt(rx * rx + ry * ry + rz * rz) or 1.0
+        self.right[:] = rx / length, ry / length, rz / length
+        self._view_dirty = True
+
+    def set_pose(
+        self,
+        position: np.ndarray | tuple[float, float, float],
+        front: np.ndarray | tuple[float, float, float],
+    ) -> None:
+        """Moves the camera and points it along `front`, e.g. to replay a flight."""
+        self.position[:] = position
+        self.previous_position[:] = (
+            self.position
+        )  # A jump, not something to interpolate
+        fx, fy, fz = float(front[0]), float(front[1]), float(front[2])
+        length = math.sqrt(fx * fx + fy * fy + fz * fz) or 1.0
+        self.set_rotation(
+            math.degrees(math.atan2(fz, fx)),
+            math.degrees(math.asin(max(-1.0, min(1.0, fy / length)))),
+        )
+
+    def get_view_matrix(self, alpha: float = 1.0) -> np.ndarray:
+        """
+        Gets the world to view matrix.
+
+        The same buffer is returned every time and rewritten when the camera has
+        changed, so copy it to keep an old view around.
+
+        Args:
+            alpha (float, optional): Where between the previous and the current
+                tick position to put the eye, from 0 to 1. Defaults to 1, the
+                current position.
+        """
+        moving = not np.array_equal(self.previous_position, self.position)
+        if not self._view_dirty and (alpha == self._view_alpha or not moving):
+            return self._view
+
+        previous, position, eye = self.previous_position, self.position, self._eye
+        if moving and alpha != 1.0:
+            eye[0] = previous[0] + (position[0] - previous[0]) * alpha
+            eye[1] = previous[1] + (position[1] - previous[1]) * alpha
+            eye[2] = previous[2] + (position[2] - previous[2]) * alpha
+        else:
+            eye[:] = position
+        np.add(eye, self.front, out=self._target)
+        look_at(eye, self._target, self.world_up, out=self._view)
+        self._view_dirty = False
+        self._view_alpha = alpha
+        return self._view
 
     def process_input(self, delta_time: float) -> None:
+        """Applies the mouse and moves for `delta_time` seconds, with no ticking."""
+        self.process_mouse()
+        self.process_movement(delta_time)
+
+    def process_mouse(self) -> None:
+        """Turns the camera by the mouse movement summed since the last call."""
+        if self._mouse_dx or self._mouse_dy:
+            self.process_mouse_movement(self._mouse_dx, self._mouse_dy)
+            self._mouse_dx = self._mouse_dy = 0.0
+
+    def tick(self, delta_time: float) -> None:
+        """Runs one fixed simulation tick of movement, keeping where it started."""
+        if not np.array_equal(self.previous_position, self.position):
+            # The drawn eye sat between the two, and will now sit at `position`
+            self.previous_position[:] = self.position
+            self._view_dirty = True
+        self.process_movement(delta_time)
+
+    def process_movement(self, delta_time: float) -> None:
+        """Moves by the held keys for `delta_time` seconds."""
         for key, isPressed in self.camera_keys.items():
             if isPressed:
                 self.process_keyboard(key, delta_time)
@@ -74,38 +206,28 @@ class Camera:
         velocity = self.speed * delta_time
         match key:
             case glfw.KEY_W:
-                self.position += self.front * velocity
+                direction, sign = self.front, 1.0
             case glfw.KEY_A:
-                self.position -= np.cross(self.front, self.world_up) * velocity
+                direction, sign = self.right, -1.0
             case glfw.KEY_S:
-                self.position -= self.front * velocity
+                direction, sign = self.front, -1.0
             case glfw.KEY_D:
-                self.position += np.cross(self.front, self.world_up) * velocity
+                direction, sign = self.right, 1.0
             case _:
-                glog.i("Unrecognized keycode in process_keyboard:", key)
-                pass
+                # Held keys land here every frame, so only say so now and then
+                glog.i("Unrecognized keycode in process_keyboard:", key, every=5.0)
+                return
+
+        # In place on the scalars, without temporary arrays
+        step = sign * velocity
+        position = self.position
+        position[0] += direction[0] * step
+        position[1] += direction[1] * step
+        position[2] += direction[2] * step
+        self._view_dirty = True
 
     def process_mouse_movement(self, xoffset: float, yoffset: float) -> None:
-        sensitivity = 0.1
-        xoffset *= sensitivity
-        yoffset *= sensitivity
-
-        yaw = np.arctan2(self.front[2], self.front[0]) * (180.0 / np.pi)
-        pitch = np.arcsin(self.front[1]) * (180.0 / np.pi)
-
-        yaw += xoffset
-        pitch += yoffset
-
-        if pitch > 89.0:
-            pitch = 89.0
-        if pitch < -89.0:
-            pitch = -89.0
-
-        front = np.array(
-            [
-                np.cos(np.radians(yaw)) * np.cos(np.radians(pitch)),
-                np.sin(np.radians(pitch)),
-                np.sin(np.radians(yaw)) * np.cos(np.radians(pitch)),
-            ]
+        self.set_rotation(
+            self.yaw + xoffset * MOUSE_SENSITIVITY,
+            self.pitch + yoffset * MOUSE_SENSITIVITY,
         )
-        self.front = front / np.linalg.norm(front)
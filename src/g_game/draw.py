@@ -1,38 +1,29 @@
-import ctypes
+from collections.abc import Sequence
 from dataclasses import dataclass
 
 import numpy as np
-from OpenGL.GL import (
-    GL_ARRAY_BUFFER,
-    GL_COLOR_BUFFER_BIT,
-    GL_ELEMENT_ARRAY_BUFFER,
-    GL_FALSE,
-    GL_FLOAT,
-    GL_STATIC_DRAW,
-    GL_TEXTURE0,
-    GL_TEXTURE_2D,
-    GL_TRIANGLES,
-    GL_UNSIGNED_INT,
-    glActiveTexture,
-    glBindBuffer,
-    glBindTexture,
-    glBindVertexArray,
-    glBufferData,
-    glClear,
-    glDrawElements,
-    glEnableVertexAttribArray,
-    glGenBuffers,
-    glGenVertexArrays,
-    glUniform1i,
-    glUniformMatrix4fv,
-    glUseProgram,
-    glVertexAttribPointer,
-)
 
-from g_utils import GLogger
+from g_game.backend import (
+    INDEX_BYTES,
+    PACKED_VERTEX_BYTES,
+    BufferID,
+    GLBackend,
+    RenderBackend,
+)
+from g_game.terrain.packing import MAX_SLOTS, PACKED_WORDS, SLOT_SHIFT
+from g_utils import ArenaAllocator, GLogger
 
 glog = GLogger(name="gdraw")
 
+# Texture unit the arena's chunk position table is bound to, the block textures use 0
+POSITIONS_UNIT = 1
+
+
+def _position_texel(chunk_position: tuple[int, int, int]) -> np.ndarray:
+    """The (1, 4) int32 row of a chunk position in an arena's position table."""
+    x, y, z = chunk_position
+    return np.array([[x, y, z, 0]], dtype=np.int32)
+
 
 @dataclass
 class Mesh:
@@ -41,109 +32,354 @@ class Mesh:
     ebo: int
     vertex_count: int
     shader_program: int
+    nbytes: int = 0
 
 
-type BufferID = int
+@dataclass(eq=False)
+class ArenaMesh:
+    """A mesh living in a slice of a MeshArena's shared buffers."""
 
+    vertex_offset: int  # In vertices, the base vertex of the mesh's indices
+    index_offset: int  # In indices
+    index_count: int
+    nbytes: int
+    slot: int = 0  # Row of the arena's chunk position table, packed into every vertex
 
-class GDraw:
-    def __init__(self) -> None:
-        glog.i("Initializing GDraw...")
 
-    def clear(self) -> None:
-        """Clears the color buffer."""
-        glClear(GL_COLOR_BUFFER_BIT)
+class MeshArena:
+    """
+    Many meshes in one VAO, drawn together with a single multi-draw call.
 
-    def create_mesh(
+    One big vertex buffer and one big index buffer are sub-allocated with an
+    ArenaAllocator each. Indices stay mesh-local and are offset with a base vertex
+    at draw time. When an allocation doesn't fit, both buffers are compacted into
+    new ones, grown if needed, with GPU side copies.
+
+    Meshes use the packed vertex format. There is no per-mesh model matrix in a
+    multi-draw, so every mesh gets a slot in a table of chunk positions kept in a
+    buffer texture. The slot is packed into its vertices on upload and the shader
+    looks the chunk position up, everything is drawn with just the view.
+    """
+
+    backend: RenderBackend
+    shader_program: int
+    chunk_size: tuple[int, int, int]
+    chunk_size_loc: int
+    positions_loc: int
+    positions_buffer: BufferID
+    positions_texture: int
+    free_slots: list[int]
+    vao: int
+    vbo: BufferID
+    ebo: BufferID
+    vertices: ArenaAllocator
+    indices: ArenaAllocator
+    meshes: set[ArenaMesh]
+
+    def __init__(
         self,
-        vertices: np.ndarray,
-        indices: np.ndarray,
+        backend: RenderBackend,
         shader_program: int,
-    ) -> Mesh:
-        """Creates the buffers and vertex layout for a given set of vertices."""
+        chunk_size: tuple[int, int, int],
+        vertex_capacity: int = 1 << 20,
+        index_capacity: int = 3 << 19,
+    ) -> None:
+        """
+        Args:
+            backend (RenderBackend): What the buffers are created and drawn with.
+            shader_program (int): The packed vertex program meshes are drawn with.
+            chunk_size (tuple): The dimensions of the chunks, to place them by.
+            vertex_capacity (int, optional): Initial vertex buffer size in vertices. Defaults to 1Mi.
+            index_capacity (int, optional): Initial index buffer size in indices. Defaults to 1.5Mi.
+        """
+        self.backend = backend
+        self.shader_program = shader_program
+        self.chunk_size = chunk_size
+        self.chunk_size_loc = backend.uniform_location(shader_program, "chunkSize")
+        self.positions_loc = backend.uniform_location(shader_program, "chunkPositions")
+        self.positions_buffer, self.positions_texture = backend.create_buffer_texture(
+            np.zeros((MAX_SLOTS, 4), dtype=np.int32)
+        )
+        self.free_slots = list(range(MAX_SLOTS - 1, -1, -1))  # Lowest slot on top
+        self.vertices = ArenaAllocator(vertex_capacity)
+        self.indices = ArenaAllocator(index_capacity)
+        self.meshes = set()
 
-        # -------------------
-        #   Buffer creation
-        # -------------------
+        self.vao, self.vbo, self.ebo = backend.create_buffers(
+            vertex_capacity * PACKED_VERTEX_BYTES, index_capacity * INDEX_BYTES
+        )
 
-        VAO: int = glGenVertexArrays(
-            1  # n buffers
+    @property
+    def nbytes(self) -> int:
+        """GPU memory reserved by the arena's buffers."""
+        return (
+            self.vertices.capacity * PACKED_VERTEX_BYTES
+            + self.indices.capacity * INDEX_BYTES
+            + MAX_SLOTS * 4 * 4
         )
-        VBO: BufferID = glGenBuffers(
-            1  # n buffers
+
+    def _relocate(self, vertex_capacity: int, index_capacity: int) -> None:
+        """Compacts every mesh into new buffers of at least the given capacities."""
+        vertex_moves = {r.old_offset: r.new_offset for r in self.vertices.defragment()}
+        index_moves = {r.old_offset: r.new_offset for r in self.indices.defragment()}
+        self.vertices.grow(max(vertex_capacity, self.vertices.capacity))
+        self.indices.grow(max(index_capacity, self.indices.capacity))
+
+        old_vao, old_vbo, old_ebo = self.vao, self.vbo, self.ebo
+        self.vao, self.vbo, self.ebo = self.backend.create_buffers(
+            self.vertices.capacity * PACKED_VERTEX_BYTES,
+            self.indices.capacity * INDEX_BYTES,
         )
-        EBO: BufferID = glGenBuffers(
-            1  # n buffers
+
+        # Copy every mesh across on the GPU, moved meshes land at their new offsets
+        vertex_copies: list[tuple[int, int, int]] = []
+        index_copies: list[tuple[int, int, int]] = []
+        for mesh in self.meshes:
+            offset = vertex_moves.get(mesh.vertex_offset, mesh.vertex_offset)
+            vertex_copies.append(
+                (
+                    mesh.vertex_offset * PACKED_VERTEX_BYTES,
+                    offset * PACKED_VERTEX_BYTES,
+                    self.vertices.allocations[offset] * PACKED_VERTEX_BYTES,
+                )
+            )
+            mesh.vertex_offset = offset
+
+            offset = index_moves.get(mesh.index_offset, mesh.index_offset)
+            index_copies.append(
+                (
+                    mesh.index_offset * INDEX_BYTES,
+                    offset * INDEX_BYTES,
+                    self.indices.allocations[offset] * INDEX_BYTES,
+                )
+            )
+            mesh.index_offset = offset
+
+        self.backend.copy_buffer(old_vbo, self.vbo, vertex_copies)
+        self.backend.copy_buffer(old_ebo, self.ebo, index_copies)
+        self.backend.delete_buffers(old_vao, old_vbo, old_ebo)
+
+    def _allocate(self, vertex_count: int, index_count: int) -> tuple[int, int]:
+        """Reserves room for a mesh, compacting or growing the buffers if needed."""
+        vertex_offset = self.vertices.allocate(vertex_count)
+        index_offset = self.indices.allocate(index_count)
+        if vertex_offset is not None and index_offset is not None:
+            return vertex_offset, index_offset
+
+        # Undo the half that succeeded so the relocation sees a consistent arena
+        if vertex_offset is not None:
+            self.vertices.free(vertex_offset)
+        if index_offset is not None:
+            self.indices.free(index_offset)
+
+        vertex_capacity = self.vertices.capacity
+        if self.vertices.free_space < vertex_count:
+            vertex_capacity = max(
+                2 * vertex_capacity, self.vertices.used + vertex_count
+            )
+        index_capacity = self.indices.capacity
+        if self.indices.free_space < index_count:
+            index_capacity = max(2 * index_capacity, self.indices.used + index_count)
+        glog.i(
+            f"Relocating mesh arena to {vertex_capacity} vertices, {index_capacity} indices"
         )
+        self._relocate(vertex_capacity, index_capacity)
+
+        vertex_offset = self.vertices.allocate(vertex_count)
+        index_offset = self.indices.allocate(index_count)
+        assert vertex_offset is not None and index_offset is not None
+        return vertex_offset, index_offset
+
+    def _write(
+        self,
+        mesh: ArenaMesh,
+        vertices: np.ndarray,
+        indices: np.ndarray,
+        position: np.ndarray,
+    ) -> None:
+        """Uploads mesh data into the slices reserved for it, and its chunk position."""
+        positioned = vertices.reshape(-1, PACKED_WORDS).copy()
+        positioned[:, 1] |= np.uint32(mesh.slot << SLOT_SHIFT)
+
+        self.backend.write_buffer_texture(self.positions_buffer, mesh.slot, position)
 
-        # Set the context VAO for subsequent actions
-        glBindVertexArray(VAO)
-
-        # Copy mesh vertices into the VBO
-        glBindBuffer(GL_ARRAY_BUFFER, VBO)
-        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
-
-        # Copy indices (drawing order) into the EBO
-        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, EBO)
-        glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
-
-        # INFO: Create and enable the attribute pointers
-        # These describe how our VBO vertex data is formatted
-        # and what gets passed to the vertex shaders' inputs
-        glVertexAttribPointer(
-            index=0,  # target vertex shader input 'aPos'
-            size=3,  # aPos expects (x, y, z) from vertices
-            normalized=GL_FALSE,
-            stride=5 * vertices.itemsize,  # 5 floats per vertex
-            pointer=ctypes.c_void_p(0),
-            type=GL_FLOAT,
+        self.backend.write_vertices(
+            self.vbo, mesh.vertex_offset * PACKED_VERTEX_BYTES, positioned
         )
-        glVertexAttribPointer(
-            index=1,  # target vertex shader input 'aTexCoord'
-            size=2,  # aTexCoord expects (u, v) from vertices
-            normalized=GL_FALSE,
-            stride=5 * vertices.itemsize,  # 5 floats per vertex
-            pointer=ctypes.c_void_p(3 * vertices.itemsize),  # offset by 3 floats
-            type=GL_FLOAT,
+        self.backend.write_indices(self.vao, mesh.index_offset * INDEX_BYTES, indices)
+
+        mesh.index_count = len(indices)
+        mesh.nbytes = positioned.nbytes + indices.nbytes
+
+    def add(
+        self,
+        vertices: np.ndarray,
+        indices: np.ndarray,
+        chunk_position: tuple[int, int, int],
+    ) -> ArenaMesh:
+        """
+        Uploads a chunk mesh into the arena.
+
+        Args:
+            vertices (np.ndarray): Flat packed vertex data from a packed mesher.
+            indices (np.ndarray): uint32 indices into `vertices`.
+            chunk_position (tuple): The (x, y, z) position of the chunk.
+
+        Returns:
+            ArenaMesh: The handle to draw, update and remove the mesh with.
+
+        Raises:
+            RuntimeError: If all MAX_SLOTS slots are taken, before anything is allocated.
+        """
+        position = _position_texel(chunk_position)
+        if not self.free_slots:
+            raise RuntimeError(f"Mesh arena is full, it holds {MAX_SLOTS} meshes.")
+        vertex_count = len(vertices) // PACKED_WORDS
+        vertex_offset, index_offset = self._allocate(vertex_count, len(indices))
+        mesh = ArenaMesh(vertex_offset, index_offset, 0, 0, self.free_slots.pop())
+        self.meshes.add(mesh)
+        self._write(mesh, vertices, indices, position)
+        return mesh
+
+    def update(
+        self,
+        mesh: ArenaMesh,
+        vertices: np.ndarray,
+        indices: np.ndarray,
+        chunk_position: tuple[int, int, int],
+    ) -> None:
+        """Replaces a mesh's data, in place when it still fits in its slices."""
+        position = _position_texel(chunk_position)
+        vertex_count = len(vertices) // PACKED_WORDS
+        if (
+            vertex_count > self.vertices.allocations[mesh.vertex_offset]
+            or len(indices) > self.indices.allocations[mesh.index_offset]
+        ):
+            self.vertices.free(mesh.vertex_offset)
+            self.indices.free(mesh.index_offset)
+            self.meshes.discard(mesh)  # Its old slices must not be copied on relocation
+            mesh.vertex_offset, mesh.index_offset = self._allocate(
+                vertex_count, len(indices)
+            )
+            self.meshes.add(mesh)
+        self._write(mesh, vertices, indices, position)
+
+    def remove(self, mesh: ArenaMesh) -> None:
+        """Frees a mesh's slices of the arena."""
+        self.meshes.remove(mesh)
+        self.vertices.free(mesh.vertex_offset)
+        self.indices.free(mesh.index_offset)
+        self.free_slots.append(mesh.slot)
+
+    def delete(self) -> None:
+        """Frees the arena's GPU buffers, vertex layout and chunk position table."""
+        self.backend.delete_buffers(self.vao, self.vbo, self.ebo)
+        self.backend.delete_buffer_texture(
+            self.positions_buffer, self.positions_texture
         )
-        glEnableVertexAttribArray(0)
-        glEnableVertexAttribArray(1)
+        self.meshes.clear()
+
+
+class GDraw:
+    """Draws meshes through a render backend, OpenGL unless told otherwise."""
+
+    backend: RenderBackend
+
+    def __init__(self, backend: RenderBackend | None = None) -> None:
+        glog.i("Initializing GDraw...")
+        self.backend = backend if backend is not None else GLBackend()
 
-        # Unbind all buffers
-        glBindBuffer(GL_ARRAY_BUFFER, 0)
-        glBindVertexArray(0)
+    def clear(self) -> None:
+        """Clears the color and depth buffers."""
+        self.backend.clear()
 
+    def create_mesh(
+        self,
+        vertices: np.ndarray,
+        indices: np.ndarray,
+        shader_program: int,
+    ) -> Mesh:
+        """
+        Creates the buffers and vertex layout for a given set of vertices.
+
+        Float vertices use the (x, y, z, u, v) layout of simple.vert, uint32 vertices
+        the packed layout of packed.vert.
+        """
+        vao, vbo, ebo = self.backend.create_buffers(vertices, indices)
         return Mesh(
-            vao=VAO,
-            vbo=VBO,
-            ebo=EBO,
+            vao=vao,
+            vbo=vbo,
+            ebo=ebo,
             vertex_count=len(indices),
             shader_program=shader_program,
+            nbytes=vertices.nbytes + indices.nbytes,
         )
 
-    def draw(
+    def update_mesh(
+        self, mesh: Mesh, vertices: np.ndarray, indices: np.ndarray
+    ) -> None:
+        """
+        Replaces the vertices and indices of an existing mesh in place.
+
+        The buffers are re-specified rather than recreated, so no GL objects are
+        allocated.
+        """
+        self.backend.replace_buffers(mesh.vao, mesh.vbo, mesh.ebo, vertices, indices)
+        mesh.vertex_count = len(indices)
+        mesh.nbytes = vertices.nbytes + indices.nbytes
+
+    def draw_arena(
         self,
-        mesh: Mesh,
+        arena: MeshArena,
+        meshes: Sequence[ArenaMesh],
         projection_loc: int,
         model_view_loc: int,
         texture_loc: int,
         texture: int,
         projection: np.ndarray,
-        model_view: np.ndarray,
+        view: np.ndarray,
     ) -> None:
-        """Draws a given mesh object."""
-        glUseProgram(mesh.shader_program)
+        """Draws the given meshes of an arena with one multi-draw call."""
+        if not meshes:
+            return
 
-        # Bind the texture and set the uniform
-        glActiveTexture(GL_TEXTURE0)
-        glBindTexture(GL_TEXTURE_2D, texture)
-        glUniform1i(texture_loc, 0)
+        self.backend.bind_material(arena.shader_program, texture, texture_loc, True)
 
-        glUniformMatrix4fv(projection_loc, 1, GL_FALSE, projection)
-        glUniformMatrix4fv(model_view_loc, 1, GL_FALSE, model_view)
+        # Chunk positions come from the slot table, so the model matrix is the identity
+        self.backend.set_matrix(projection_loc, projection)
+        self.backend.set_matrix(model_view_loc, view)
+        self.backend.set_vec3(arena.chunk_size_loc, *arena.chunk_size)
+        self.backend.bind_buffer_texture(
+            arena.positions_texture, arena.positions_loc, POSITIONS_UNIT
+        )
 
-        glBindVertexArray(mesh.vao)
-        glDrawElements(
-            GL_TRIANGLES, mesh.vertex_count, GL_UNSIGNED_INT, ctypes.c_void_p(0)
+        counts = np.fromiter((m.index_count for m in meshes), np.int32, len(meshes))
+        base_vertices = np.fromiter(
+            (m.vertex_offset for m in meshes), np.int32, len(meshes)
         )
-        glBindVertexArray(0)  # Unbind after drawing
+        index_pointers = np.fromiter(
+            (m.index_offset * INDEX_BYTES for m in meshes), np.uintp, len(meshes)
+        )
+        self.backend.multi_draw_elements(
+            arena.vao, counts, index_pointers, base_vertices
+        )
+
+    def delete_mesh(self, mesh: Mesh) -> None:
+        """Frees the GPU buffers and vertex layout of a mesh."""
+        self.backend.delete_buffers(mesh.vao, mesh.vbo, mesh.ebo)
+
+    def draw(
+        self,
+        mesh: Mesh,
+        projection_loc: int,
+        model_view_loc: int,
+        texture_loc: int,
+        texture: int,
+        projection: np.ndarray,
+        model_view: np.ndarray,
+    ) -> None:
+        """Draws a given mesh object."""
+        self.backend.bind_material(mesh.shader_program, texture, texture_loc, False)
+        self.backend.set_matrix(projection_loc, projection)
+        self.backend.set_matrix(model_view_loc, model_view)
+        self.backend.draw_elements(mesh.vao, mesh.vertex_count)
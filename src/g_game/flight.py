@@ -0,0 +1,116 @@
+import json
+import os
+from dataclasses import dataclass, field
+
+import numpy as np
+
+
+@dataclass
+class FlightSample:
+    """Where the camera was and looked during one frame, and how long it took."""
+
+    position: tuple[float, float, float]
+    front: tuple[float, float, float]
+    delta_time: float
+
+
+@dataclass
+class CameraFlight:
+    """
+    A camera path with one sample per frame, recorded from play or made up.
+
+    Saved as JSON: {"frames": [{"position": [x, y, z], "front": [x, y, z],
+    "delta_time": seconds}, ...]}. Replays loop once they run out of samples.
+    """
+
+    samples: list[FlightSample] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def __getitem__(self, frame: int) -> FlightSample:
+        return self.samples[frame % len(self.samples)]
+
+    def record(
+        self, position: np.ndarray, front: np.ndarray, delta_time: float
+    ) -> None:
+        """Appends the camera state of one frame."""
+        self.samples.append(
+            FlightSample(
+                (float(position[0]), float(position[1]), float(position[2])),
+                (float(front[0]), float(front[1]), float(front[2])),
+                float(delta_time),
+            )
+        )
+
+    @classmethod
+    def straight(
+        cls,
+        frames: int,
+        start: tuple[float, float, float] = (0.0, 56.0, 0.0),
+        front: tuple[float, float, float] = (0.0, -0.2, 1.0),
+        speed: float = 20.0,
+        delta_time: float = 1 / 60,
+    ) -> "CameraFlight":
+        """
+        A flight in a straight line at a steady speed, crossing new terrain the whole way.
+
+        Args:
+            frames (int): Samples in the flight.
+            start (tuple, optional): Where the camera starts.
+            front (tuple, optional): The direction it looks in, and flies level along.
+            speed (float, optional): Blocks per second. Defaults to 20.
+            delta_time (float, optional): Seconds per frame. Defaults to 1/60.
+        """
+        direction = np.array(front, dtype=np.float64)
+        direction /= np.linalg.norm(direction)
+        heading = np.array((direction[0], 0.0, direction[2]))
+        heading /= max(np.linalg.norm(heading), 1e-9)
+
+        flight = cls()
+        for frame in range(frames):
+            position = np.array(start) + heading * speed * delta_time * frame
+            flight.record(position, direction, delta_time)
+        return flight
+
+    @classmethod
+    def load(cls, path: str) -> "CameraFlight":
+        """
+        Reads a flight saved with save().
+
+        Raises:
+            ValueError: If the file holds no samples.
+        """
+        with open(path, "r") as f:
+            document = json.load(f)
+
+        flight = cls(
+            [
+                FlightSample(
+                    tuple(frame["position"]),
+                    tuple(frame["front"]),
+                    frame["delta_time"],
+                )
+                for frame in document["frames"]
+            ]
+        )
+        if not flight.samples:
+            raise ValueError(f"Camera flight {path} has no frames.")
+        return flight
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "frames": [
+                        {
+                            "position": sample.position,
+                            "front": sample.front,
+                            "delta_time": sample.delta_time,
+                        }
+                        for sample in self.samples
+                    ]
+                },
+                f,
+            )
@@ -1,126 +1,826 @@
 from __future__ import annotations
 
+import math
 import sys
+import time
+from collections import deque
+from collections.abc import Sequence
+from dataclasses import dataclass, field
 
 import glfw
 import numpy as np
-from OpenGL.GL import (
-    GL_CULL_FACE,
-    glClearColor,
-    glEnable,
-    glGetUniformLocation,
-)
+from rich.console import Console
+from rich.table import Table
 
+from g_game.backend import GLBackend, NullBackend
 from g_game.controls import Camera
-from g_game.draw import GDraw
+from g_game.draw import ArenaMesh, GDraw, MeshArena
+from g_game.flight import CameraFlight
+from g_game.terrain.blocks import BLOCK_NAMES
 from g_game.terrain.chunk import Chunk
-from g_game.terrain.world import World
+from g_game.terrain.lod import LOD_DISTANCES, LOD_FACTORS, lod_of
+from g_game.terrain.pipeline import ChunkBuild, ChunkPipeline, create_process_pool
+from g_game.terrain.raycast import RayHit
+from g_game.terrain.residency import ChunkResidency
+from g_game.terrain.world import NEIGHBOUR_OFFSETS, WORLD_HEIGHT, World
 from g_game.window import GWin
 from g_utils import (
+    FixedTimestep,
+    FrameLimiter,
+    FrameProfiler,
     GLogger,
-    compile_shader_program,
+    WorkBudget,
+    boxes_in_frustum,
+    build_texture_array,
     create_perspective_matrix,
-    load_texture,
+    extract_frustum_planes,
+    flush_logs,
+    sleep_until,
 )
 
 glog = GLogger(name="game")
 
+# Radius in chunk columns of the terrain streamed in around the camera
+RENDER_RADIUS = 6
+
+# Chunks are only unloaded this many columns past the render radius, so crossing
+# a border doesn't churn
+UNLOAD_MARGIN = 2
+
+# Max bytes of loaded chunk data plus chunk meshes
+RESIDENCY_BUDGET = 256 * 1024 * 1024
+
+# Decoded assets cached between runs
+CACHE_DIR = "src/g_game/graphics/.cache"
+
+# Block textures, and where they are cached decoded
+TEXTURE_DIR = "src/g_game/graphics/textures"
+TEXTURE_CACHE = f"{CACHE_DIR}/blocks.gtex"
+
+# Most seconds of each frame spent uploading finished chunk meshes, re-meshing
+# edited chunks, and loading and saving chunks. Each only gets what the frame has
+# to spare
+UPLOAD_BUDGET = 0.004
+REMESH_BUDGET = 0.004
+LOAD_BUDGET = 0.004
+
+# Seconds between connectivity searches while chunks stream in, the camera
+# entering another chunk or an edit redoes it right away
+REACHABLE_REFRESH = 0.5
+
+# How far away, in blocks, the block the camera looks at can be picked
+REACH = 8.0
+
+# Simulation ticks per second, movement is stepped at this rate whatever the fps
+TICK_RATE = 60.0
+
+# Perspective projection, the aspect ratio follows the window. The far plane is
+# pushed out further when the render radius needs it
+FOV = 45.0
+NEAR_PLANE = 0.1
+FAR_PLANE = 100.0
+
+# Where F3 writes a Chrome trace of the recent frames' stage timings
+TRACE_PATH = f"{CACHE_DIR}/frame_trace.json"
+
+
+@dataclass
+class CullStats:
+    visible: int = 0
+    culled: int = 0  # Outside the view frustum
+    occluded: int = 0  # In the frustum, but not reachable through open chunk faces
+
+
+@dataclass
+class LodStats:
+    # Summed over every frame, per level of detail
+    triangles: list[int] = field(default_factory=lambda: [0] * len(LOD_FACTORS))
+    switches: int = 0  # Chunks moved to another level
+    reseams: int = 0  # Level 0 chunks re-meshed against changed neighbours
+
+
+def _culled_faces(neighbours: Sequence[Chunk | None] | None) -> int:
+    """Bit mask of the entries in FACES a mesh hid border faces on, given its neighbours."""
+    if neighbours is None:
+        return 0
+    return sum(1 << face for face, chunk in enumerate(neighbours) if chunk is not None)
+
 
 class Game:
-    # Main game objects
-    gwin: GWin
+    # Main game objects, there is no window in headless runs
+    gwin: GWin | None
     gdraw: GDraw
     camera: Camera
 
     # Other variables
     last_frame_time: float
+    arena: MeshArena
+    pipeline: ChunkPipeline
+    chunk_meshes: dict[tuple[int, int, int], ArenaMesh]
+    cull_stats: CullStats
+    render_radius: int
+    world_dir: str | None
+    far_plane: float
+    target: RayHit | None  # The block the camera looks at
+    profiler: FrameProfiler
+    projection: np.ndarray
+
+    # Chunks the camera can see into through connected faces, see visibility.py,
+    # with the chunk it was found from, the chunks loaded then, and when
+    reachable: set[tuple[int, int, int]] | None
+    _reachable_from: tuple[int, int, int] | None
+    _reachable_known: set[tuple[int, int, int]]
+    _reachable_time: float
+    _reachable_stale: bool
 
-    def __init__(self) -> None:
+    # Level of detail of every meshed chunk, see lod.py
+    chunk_lods: dict[tuple[int, int, int], int]
+    lod_stats: LodStats
+
+    # Faces each level 0 mesh hid its border faces on, see _culled_faces. Chunks
+    # that arrived or changed level since the last reseam() are in _relevelled
+    chunk_culls: dict[tuple[int, int, int], int]
+    _relevelled: set[tuple[int, int, int]]
+
+    # Frame pacing
+    vsync: bool
+    timestep: FixedTimestep
+    limiter: FrameLimiter | None
+    work_budget: WorkBudget
+
+    # Chunk positions and bounds of chunk_meshes, rebuilt only when the meshes change
+    _cull_positions: list[tuple[int, int, int]] | None
+    _cull_min: np.ndarray
+    _cull_max: np.ndarray
+    _cull_reachable: np.ndarray | None
+    _view_projection: np.ndarray
+
+    # Chunk positions, centers and levels of chunk_lods, rebuilt when its keys change
+    _lod_positions: list[tuple[int, int, int]] | None
+    _lod_centers: np.ndarray
+    _lod_levels: np.ndarray
+
+    def __init__(
+        self,
+        headless: bool = False,
+        vsync: bool = True,
+        fps_limit: float | None = None,
+        tick_rate: float = TICK_RATE,
+        render_radius: int = RENDER_RADIUS,
+        world_dir: str | None = None,
+    ) -> None:
+        """
+        Args:
+            headless (bool, optional): Run without a window or GPU, drawing through a
+                NullBackend. Defaults to False.
+            vsync (bool, optional): Sync buffer swaps to the display. Defaults to True.
+            fps_limit (float, optional): Sleep out each frame to hold this rate.
+            tick_rate (float, optional): Simulation ticks per second.
+            render_radius (int, optional): Chunk columns streamed in around the camera.
+            world_dir (str, optional): Directory the world is saved to on exit and
+                loaded back from. Without one the world is generated afresh each run.
+        """
         glog.i("Initializing Game...")
-        self.gwin = GWin()
-        self.gdraw = GDraw()
+        if headless:
+            self.gwin = None
+            self.gdraw = GDraw(NullBackend())
+        else:
+            self.gwin = GWin()
+            self.gdraw = GDraw(GLBackend(f"{CACHE_DIR}/shaders"))
         self.camera = Camera(
             gwin=self.gwin,
-            position=np.array([0.0, 0.0, -3.0]),
+            position=np.array([0.0, 56.0, -3.0]),
             up=np.array([0.0, 1.0, 0.0]),
             speed=2.5,
         )
         self.last_frame_time = 0.0
+        self.chunk_meshes = {}
+        self.cull_stats = CullStats()
+        self.render_radius = render_radius
+        self.world_dir = world_dir
+        self.far_plane = FAR_PLANE
+        self.chunk_lods = {}
+        self.lod_stats = LodStats()
+        self.chunk_culls = {}
+        self._relevelled = set()
+        self._lod_positions = None
+        self._lod_centers = np.empty((0, 3))
+        self._lod_levels = np.empty(0, dtype=np.intp)
+        self.target = None
+        self.profiler = FrameProfiler()
+        self.reachable = None
+        self._reachable_from = None
+        self._reachable_known = set()
+        self._reachable_time = 0.0
+        self._reachable_stale = False
+        self._cull_positions = None
+        self._cull_reachable = None
+        self._cull_min = np.empty((0, 3))
+        self._cull_max = np.empty((0, 3))
+        self.projection = np.zeros((4, 4), dtype=np.float32)
+        self._view_projection = np.empty((4, 4), dtype=np.float32)
+        self.vsync = vsync
+        self.timestep = FixedTimestep(tick_rate)
+        self.limiter = FrameLimiter(fps_limit) if fps_limit else None
+
+        # Background work fits in the frame the limit or the display allows
+        if fps_limit:
+            period = 1.0 / fps_limit
+        elif vsync and self.gwin is not None:
+            period = 1.0 / self.gwin.refresh_rate
+        else:
+            period = 1.0 / 60.0
+        self.work_budget = WorkBudget(period)
+
+    def upload_ready(
+        self, ready: deque[ChunkBuild], residency: ChunkResidency, budget: float
+    ) -> None:
+        """
+        Uploads finished chunk meshes to the GPU until `budget` seconds are spent.
+
+        At least one mesh is uploaded per call, the rest wait for later frames.
+        """
+        start = time.perf_counter()
+        while ready and time.perf_counter() - start < budget:
+            build = ready.popleft()
+            resident = residency.residents.get(build.position)
+            if resident is None or resident.chunk is not build.chunk:
+                continue  # Evicted, or re-loaded from disk since it was built
+            if build.position in self.chunk_meshes:
+                continue  # Already re-meshed on this thread after an edit
+            if not residency.world.needs_mesh(build.position):
+                continue
+
+            # Kept even for empty meshes, a finer level may still have faces
+            self.chunk_lods[build.position] = build.lod
+            self._lod_positions = None
+            self.chunk_culls.pop(build.position, None)  # Meshed without neighbours
+            self._relevelled.add(build.position)
+            if len(build.indices) == 0:
+                continue
+
+            mesh = self.arena.add(build.vertices, build.indices, build.position)
+            self.chunk_meshes[build.position] = mesh
+            self._cull_positions = None
+            residency.attach_mesh(build.position, mesh)
+
+    def remesh_dirty(
+        self,
+        residency: ChunkResidency,
+        camera_chunk: tuple[int, int, int],
+        budget: float,
+    ) -> None:
+        """
+        Re-meshes chunks whose blocks changed, nearest to the camera first.
+
+        Every edit since the last frame is coalesced, so each chunk is re-meshed and
+        uploaded at most once per frame no matter how many of its blocks changed.
+        Chunks left over once `budget` seconds are spent stay dirty for the next frame.
+        """
+        world = residency.world
+        cx, cy, cz = camera_chunk
+        start = time.perf_counter()
+        for position in sorted(
+            world.dirty,
+            key=lambda p: (p[0] - cx) ** 2 + (p[1] - cy) ** 2 + (p[2] - cz) ** 2,
+        ):
+            if time.perf_counter() - start > budget:
+                break
+
+            lod = self.chunk_lods.get(position)
+            if lod is None:
+                lod = self.chunk_lods[position] = 0
+                self._lod_positions = None
+                self._relevelled.add(position)  # Loaded from disk, not streamed
+            vertices, indices = world.mesh_chunk(
+                position, packed=True, lod=lod, lods=self.chunk_lods
+            )
+            self.chunk_culls[position] = _culled_faces(
+                world.culling_neighbours(position, lod, self.chunk_lods)
+            )
+            self.pipeline.cancel_remesh(position)  # Built from the old blocks
+            self._reachable_stale = True  # The chunk's faces may connect differently
+            residency.refresh(position)
+            self.replace_mesh(residency, position, vertices, indices)
+
+    def apply_remeshed(
+        self, builds: list[ChunkBuild], residency: ChunkResidency
+    ) -> None:
+        """Swaps in the meshes of chunks the pipeline re-meshed at a new level of detail."""
+        for build in builds:
+            position = build.position
+            if position not in residency or self.chunk_lods.get(position) != build.lod:
+                continue  # Unloaded, or its level changed again since
+            self.replace_mesh(residency, position, build.vertices, build.indices)
+
+    def replace_mesh(
+        self,
+        residency: ChunkResidency,
+        position: tuple[int, int, int],
+        vertices: np.ndarray,
+        indices: np.ndarray,
+    ) -> None:
+        """Uploads a resident chunk's new mesh over its old one, if it had one."""
+        existing = self.chunk_meshes.get(position)
+        if len(indices) == 0:
+            if existing is not None:
+                residency.detach_mesh(position)
+        elif existing is not None:
+            self.arena.update(existing, vertices, indices, position)
+            residency.attach_mesh(position, existing)
+        else:
+            mesh = self.arena.add(vertices, indices, position)
+            self.chunk_meshes[position] = mesh
+            self._cull_positions = None
+            residency.attach_mesh(position, mesh)
+
+    def release_mesh(self, position: tuple[int, int, int], mesh: ArenaMesh) -> None:
+        """Frees the mesh of a chunk that was evicted or re-meshed."""
+        self.chunk_meshes.pop(position, None)
+        self._cull_positions = None
+        self._lod_positions = None
+        self.arena.remove(mesh)
+
+    def update_lods(self, world: World, eye: np.ndarray) -> None:
+        """
+        Moves chunks to the level of detail their distance to `eye` calls for.
+
+        Levels only change past the hysteresis band around each threshold, see
+        lod_of(). Chunks that change are re-meshed at their new level by the
+        pipeline's workers and keep drawing their old mesh until apply_remeshed()
+        swaps the new one in.
+        """
+        if self._lod_positions is None:
+            # Forget chunks that were unloaded since
+            self.chunk_lods = {
+                p: lod for p, lod in self.chunk_lods.items() if p in world.chunks
+            }
+            self.chunk_culls = {
+                p: faces for p, faces in self.chunk_culls.items() if p in world.chunks
+            }
+            self._lod_positions = list(self.chunk_lods)
+            origins = np.array(self._lod_positions, dtype=np.float64).reshape(-1, 3)
+            self._lod_centers = (origins + 0.5) * world.chunk_size
+            self._lod_levels = np.array(list(self.chunk_lods.values()), dtype=np.intp)
+        if not self._lod_positions:
+            return
 
-    def run(self) -> None:
-        self.gwin.set_as_context()
+        distances = np.linalg.norm(self._lod_centers - eye, axis=1)
+        levels = lod_of(distances, self._lod_levels)
+        for i in np.flatnonzero(levels != self._lod_levels).tolist():
+            position = self._lod_positions[i]
+            chunk = world.chunks.get(position)
+            if chunk is None:
+                self._lod_positions = None  # Unloaded without a mesh to release
+                continue
+            self.chunk_lods[position] = level = int(levels[i])
+            self.queue_remesh(world, position, chunk, level)
+            self._relevelled.add(position)
+            self.lod_stats.switches += 1
+        if self._lod_positions is not None:
+            self._lod_levels = levels
 
-        glClearColor(0.1, 0.1, 0.3, 1.0)
-        glEnable(GL_CULL_FACE)
+    def queue_remesh(
+        self, world: World, position: tuple[int, int, int], chunk: Chunk, lod: int
+    ) -> None:
+        """
+        Re-meshes a chunk on the pipeline's workers at a level of detail.
+
+        Border faces are hidden against the neighbours World.culling_neighbours
+        picks, and recorded in chunk_culls.
+        """
+        neighbours = world.culling_neighbours(position, lod, self.chunk_lods)
+        self.pipeline.remesh(position, chunk, lod, neighbours)
+        self.chunk_culls[position] = _culled_faces(neighbours)
+
+    def reseam(self, world: World) -> None:
+        """
+        Re-meshes level 0 chunks whose neighbours at level 0 changed since their mesh.
+
+        The workers mesh streamed chunks on their own, keeping every border face.
+        Once all the neighbours of a level 0 chunk are loaded it is re-meshed to
+        hide the faces its level 0 neighbours cover, and again when one of them
+        changes level, see lod.py. Waiting for every neighbour first keeps it to
+        one re-mesh per chunk while an area streams in.
+        """
+        candidates: set[tuple[int, int, int]] = set()
+        for x, y, z in self._relevelled:
+            candidates.update(
+                (x + dx, y + dy, z + dz) for dx, dy, dz in NEIGHBOUR_OFFSETS
+            )
+        candidates.update(self._relevelled)
+        self._relevelled.clear()
+
+        for position in candidates:
+            chunk = world.chunks.get(position)
+            if chunk is None or chunk.is_empty or self.chunk_lods.get(position) != 0:
+                continue
+            if position in world.dirty:
+                continue  # Re-meshed on this thread this frame or the next
+            x, y, z = position
+            if any(
+                0 <= y + dy < WORLD_HEIGHT
+                and (x + dx, y + dy, z + dz) not in world.chunks
+                for dx, dy, dz in NEIGHBOUR_OFFSETS
+            ):
+                continue  # Waits for the rest of its neighbours
+            neighbours = world.culling_neighbours(position, 0, self.chunk_lods)
+            if _culled_faces(neighbours) != self.chunk_culls.get(position, 0):
+                self.queue_remesh(world, position, chunk, 0)
+                self.lod_stats.reseams += 1
+
+    def count_lod_triangles(self, drawn: list[tuple[int, int, int]]) -> None:
+        """Adds the triangles of the meshes drawn this frame to their level's total."""
+        triangles = self.lod_stats.triangles
+        for position in drawn:
+            level = self.chunk_lods.get(position, 0)
+            triangles[level] += self.chunk_meshes[position].index_count // 3
+
+    def lod_memory(self) -> tuple[list[int], list[int]]:
+        """Counts the resident meshes and their bytes per level of detail."""
+        meshes = [0] * len(LOD_FACTORS)
+        nbytes = [0] * len(LOD_FACTORS)
+        for position, mesh in self.chunk_meshes.items():
+            level = self.chunk_lods.get(position, 0)
+            meshes[level] += 1
+            nbytes[level] += mesh.nbytes
+        return meshes, nbytes
+
+    def update_reachable(
+        self, world: World, camera_chunk: tuple[int, int, int], now: float
+    ) -> None:
+        """
+        Re-runs the connectivity search from the camera's chunk when it's out of date.
+
+        That is when the camera entered another chunk or an edited chunk was
+        re-meshed, and every REACHABLE_REFRESH seconds while new chunks arrive.
+        Chunks loaded since the last search are drawn either way until the next.
+        """
+        arrived = len(world.chunks.keys() - self._reachable_known) > 0
+        if not (
+            camera_chunk != self._reachable_from
+            or self._reachable_stale
+            or (arrived and now - self._reachable_time > REACHABLE_REFRESH)
+        ):
+            return
+
+        self.reachable = world.reachable_chunks(camera_chunk, self.render_radius)
+        self._reachable_from = camera_chunk
+        self._reachable_known = set(world.chunks)
+        self._reachable_time = now
+        self._reachable_stale = False
+        self._cull_reachable = None
+
+    def visible_chunks(
+        self, view: np.ndarray, projection: np.ndarray, chunk_size: tuple[int, int, int]
+    ) -> list[tuple[int, int, int]]:
+        """
+        Culls the chunk meshes to the ones the camera could see.
+
+        Every chunk's bounds are tested against the view frustum in one batch,
+        and chunks the last connectivity search couldn't reach are dropped.
+
+        Returns:
+            list: The positions of the chunks that are at least partly in view.
+        """
+        if self._cull_positions is None:
+            self._cull_positions = list(self.chunk_meshes)
+            origins = np.array(self._cull_positions, dtype=np.float64).reshape(-1, 3)
+            self._cull_min = origins * chunk_size
+            self._cull_max = self._cull_min + chunk_size
+            self._cull_reachable = None
+        positions = self._cull_positions
+
+        if self._cull_reachable is None and self.reachable is not None:
+            reachable, known = self.reachable, self._reachable_known
+            self._cull_reachable = np.array(
+                [p in reachable or p not in known for p in positions], dtype=bool
+            )
+
+        view_projection = np.matmul(view, projection, out=self._view_projection)
+        planes = extract_frustum_planes(view_projection)
+        visible = boxes_in_frustum(planes, self._cull_min, self._cull_max)
+        in_frustum = int(np.count_nonzero(visible))
+        if self._cull_reachable is not None:
+            visible &= self._cull_reachable
+
+        self.cull_stats.visible = int(np.count_nonzero(visible))
+        self.cull_stats.culled = len(positions) - in_frustum
+        self.cull_stats.occluded = in_frustum - self.cull_stats.visible
+        return [positions[i] for i in np.flatnonzero(visible)]
+
+    def resize(self, width: int, height: int) -> None:
+        """Fits the viewport and projection to a framebuffer size in pixels."""
+        if width <= 0 or height <= 0:
+            return  # Minimized, keep the last projection
+        create_perspective_matrix(
+            FOV, width / height, NEAR_PLANE, self.far_plane, out=self.projection
+        )
+        self.gdraw.backend.set_viewport(width, height)
+
+    def run(
+        self,
+        frames: int | None = None,
+        flight: CameraFlight | None = None,
+        record_path: str | None = None,
+    ) -> None:
+        """
+        Runs the game loop until the window closes, or for a number of frames.
+
+        Args:
+            frames (int, optional): Frames to run for. Required without a window.
+            flight (CameraFlight, optional): Camera path to replay instead of reading
+                input, with its recorded frame times.
+            record_path (str, optional): Where to save the camera's flight on exit.
+        """
+        if self.gwin is None and frames is None:
+            raise ValueError("Headless runs need a frame count.")
+
+        if self.gwin is not None:
+            self.gwin.set_as_context()
+            self.gwin.set_vsync(self.vsync)
+        backend = self.gdraw.backend
+        backend.setup()
 
         # 1. Compile shaders
-        shader = compile_shader_program(
-            "src/shaders/simple.vert", "src/shaders/simple.frag"
+        shader = backend.load_program(
+            "src/shaders/packed.vert", "src/shaders/packed.frag"
         )
 
-        # 2. Create the world and a single chunk
-        world = World()
-        chunk = Chunk()
-        # You can populate the chunk with blocks here later
-        # For now, it's empty, but our mesher returns a test cube regardless
-        world.add_chunk((0, 0, 0), chunk)
+        # 2. Start an empty world, terrain is streamed in around the camera
+        world = World(self.world_dir, radius=None)
 
-        # 3. Generate a mesh for the chunk and create the renderable mesh object
-        chunk_vertices, chunk_indices = chunk.generate_mesh()
-        chunk_mesh = self.gdraw.create_mesh(chunk_vertices, chunk_indices, shader)
+        # 3. Generate and mesh chunks in background processes, far ones coarser
+        pipeline = self.pipeline = ChunkPipeline(
+            create_process_pool(),
+            world.generator.seed,
+            world.chunk_size,
+            packed=True,
+            lod_distances=LOD_DISTANCES,
+            executor_factory=create_process_pool,
+        )
+        self.arena = MeshArena(backend, shader, world.chunk_size)
+        ready: deque[ChunkBuild] = deque()
+        residency = ChunkResidency(
+            world,
+            release_mesh=self.release_mesh,
+            load_radius=self.render_radius,
+            unload_radius=self.render_radius + UNLOAD_MARGIN,
+            byte_budget=RESIDENCY_BUDGET,
+            save_hook=world.save_chunk if world.save_dir is not None else None,
+            load_hook=world.read_chunk if world.save_dir is not None else None,
+            is_saved=world.has_saved_chunk if world.save_dir is not None else None,
+        )
+        camera_chunk: tuple[int, int, int] | None = None
 
-        # 4. Load texture
-        texture = load_texture("src/g_game/graphics/textures/grass_16x16.png")
+        # 4. Load the block textures, one texture array layer per block type
+        start = time.perf_counter()
+        texture_array = build_texture_array(
+            TEXTURE_DIR,
+            [BLOCK_NAMES.get(block) for block in range(max(BLOCK_NAMES) + 1)],
+            TEXTURE_CACHE,
+        )
+        texture = backend.load_texture_array(texture_array)
+        texture_array.close()
+        glog.i(
+            f"Loaded {len(texture_array.names)} block textures "
+            f"{'from cache ' if texture_array.from_cache else ''}"
+            f"in {(time.perf_counter() - start) * 1e3:.1f} ms"
+        )
 
         # 5. Get uniform locations
-        projection_loc = glGetUniformLocation(shader, "projection")
-        model_view_loc = glGetUniformLocation(shader, "modelView")
-        texture_loc = glGetUniformLocation(shader, "u_texture")
-
-        # 6. Create matrices
-        fov = 45.0
-        aspect = 800 / 600
-        near_plane = 0.1
-        far_plane = 100.0
-        projection = create_perspective_matrix(
-            fov,
-            aspect,
-            near_plane,
-            far_plane,
+        projection_loc = backend.uniform_location(shader, "projection")
+        model_view_loc = backend.uniform_location(shader, "modelView")
+        texture_loc = backend.uniform_location(shader, "u_texture")
+
+        # 6. Create the projection, again whenever the window is resized. The far
+        # plane reaches the corners of the streamed area
+        self.far_plane = max(
+            FAR_PLANE, (self.render_radius + 1) * max(world.chunk_size) * math.sqrt(2)
         )
-        model = np.identity(4, dtype=np.float32)
+        self.resize(*(GWin.size if self.gwin is None else self.gwin.framebuffer_size))
+        projection = self.projection
 
         # --- Main Render Loop ---
+        profiler = self.profiler
+        timestep = self.timestep
+        work_budget = self.work_budget
+        recording = CameraFlight() if record_path is not None else None
+        trace_key_down = False
+        frame = 0
+        chunks_streamed = 0
+        loop_start = time.perf_counter()
         try:
-            while not self.gwin.should_close():
-                current_frame_time = glfw.get_time()
-                delta_time = current_frame_time - self.last_frame_time
-                self.last_frame_time = current_frame_time
+            while frames is None or frame < frames:
+                if self.gwin is not None and self.gwin.should_close():
+                    glog.i("Window was closed.")
+                    break
+                profiler.next_frame()
+                frame_start = time.perf_counter()
+                work_budget.start_frame(frame_start)
 
-                self.camera.process_input(delta_time)
+                with profiler.stage("input"):
+                    if flight is not None:
+                        sample = flight[frame]
+                        self.camera.set_pose(sample.position, sample.front)
+                        delta_time = sample.delta_time
+                        current_frame_time = self.last_frame_time + delta_time
+                        alpha = 1.0
+                    else:
+                        current_frame_time = (
+                            glfw.get_time()
+                            if self.gwin is not None
+                            else time.perf_counter() - loop_start
+                        )
+                        delta_time = current_frame_time - self.last_frame_time
+                        # Turning follows the frame, moving follows fixed ticks
+                        self.camera.process_mouse()
+                        for _ in range(timestep.advance(delta_time)):
+                            self.camera.tick(timestep.tick)
+                        alpha = timestep.alpha
+                    self.last_frame_time = current_frame_time
+                    if recording is not None:
+                        recording.record(
+                            self.camera.position, self.camera.front, delta_time
+                        )
 
+                # Stream terrain, re-targeting whenever the camera enters a new chunk
+                with profiler.stage("stream"):
+                    current_chunk = world.chunk_position_of(self.camera.position)
+                    if current_chunk != camera_chunk:
+                        camera_chunk = current_chunk
+                        pipeline.set_wanted(residency.update(camera_chunk))
+                    residency.drain(work_budget.remaining(LOAD_BUDGET))
+                    pipeline.set_view(self.camera.position, self.camera.front)
+                    for build in pipeline.poll():
+                        residency.admit(build.position, build.chunk)
+                        self._relevelled.add(build.position)
+                        ready.append(build)
+                        chunks_streamed += 1
+                with profiler.stage("lod"):
+                    self.update_lods(world, self.camera.position)
+                    self.reseam(world)
+                with profiler.stage("pick"):
+                    self.target = world.raycast(
+                        self.camera.position, self.camera.front, REACH
+                    )
+                with profiler.stage("upload"):
+                    self.upload_ready(
+                        ready, residency, work_budget.remaining(UPLOAD_BUDGET)
+                    )
+                    self.apply_remeshed(pipeline.poll_remeshed(), residency)
+                with profiler.stage("remesh"):
+                    self.remesh_dirty(
+                        residency, current_chunk, work_budget.remaining(REMESH_BUDGET)
+                    )
+                render_start = time.perf_counter()
+
+                if self.gwin is not None and self.gwin.resized:
+                    self.gwin.resized = False
+                    self.resize(*self.gwin.framebuffer_size)
                 self.gdraw.clear()
 
-                view = self.camera.get_view_matrix()
-                model_view = view @ model
-
-                self.gdraw.draw(
-                    chunk_mesh,
-                    projection_loc,
-                    model_view_loc,
-                    texture_loc,
-                    texture,
-                    projection,
-                    model_view,
-                )
+                view = self.camera.get_view_matrix(alpha)
 
-                glfw.swap_buffers(self.gwin.window)
-                glfw.poll_events()
-            glog.i("Window was closed.")
+                with profiler.stage("occlude"):
+                    self.update_reachable(world, current_chunk, current_frame_time)
+                with profiler.stage("cull"):
+                    visible = self.visible_chunks(view, projection, world.chunk_size)
+                    for chunk_position in visible:
+                        residency.touch(chunk_position)
+                    if self.gwin is None:
+                        self.count_lod_triangles(visible)
+                with profiler.stage("draw"):
+                    self.gdraw.draw_arena(
+                        self.arena,
+                        [self.chunk_meshes[p] for p in visible],
+                        projection_loc,
+                        model_view_loc,
+                        texture_loc,
+                        texture,
+                        projection,
+                        view,
+                    )
+                frame += 1
+                work_budget.record_render(time.perf_counter() - render_start)
+
+                if self.gwin is None:
+                    # Hold each frame for its recorded time, like vsync would, so
+                    # the background pipeline keeps the pace it has in play
+                    with profiler.stage("swap"):
+                        sleep_until(frame_start + delta_time)
+                    continue
+
+                if int(current_frame_time) != int(current_frame_time - delta_time):
+                    frame_stats = profiler.stats().get("frame")
+                    glfw.set_window_title(
+                        self.gwin.window,
+                        f"g | {self.cull_stats.visible} chunks drawn, "
+                        f"{self.cull_stats.culled} culled, "
+                        f"{self.cull_stats.occluded} occluded"
+                        + (
+                            f" | looking at {BLOCK_NAMES.get(self.target.block_type)}"
+                            f" {self.target.block}"
+                            if self.target is not None
+                            else ""
+                        )
+                        + (f" | p95 {frame_stats.p95:.1f} ms" if frame_stats else ""),
+                    )
+
+                # Write a trace once per F3 press, not every frame it's held
+                trace_key = glfw.get_key(self.gwin.window, glfw.KEY_F3) == glfw.PRESS
+                if trace_key and not trace_key_down:
+                    profiler.dump_chrome_trace(TRACE_PATH)
+                    glog.i(f"Wrote frame trace to {TRACE_PATH}")
+                trace_key_down = trace_key
+
+                with profiler.stage("swap"):
+                    if self.limiter is not None:
+                        self.limiter.wait()
+                    glfw.swap_buffers(self.gwin.window)
+                    glfw.poll_events()
         except KeyboardInterrupt:
             print()
             glog.i("[b red]KeyboardInterrupt[/] received, exiting...")
             sys.stdout.flush()
         finally:
-            glfw.terminate()
+            elapsed = time.perf_counter() - loop_start
+            if self.gwin is None:
+                self.report(frame, elapsed, chunks_streamed)
+            else:
+                for name, stats in profiler.stats().items():
+                    glog.i(
+                        f"{name:>6}: p50 {stats.p50:.2f} ms, p95 {stats.p95:.2f} ms, "
+                        f"p99 {stats.p99:.2f} ms"
+                    )
+            if recording is not None and record_path is not None:
+                recording.save(record_path)
+                glog.i(f"Saved {len(recording)} frame camera flight to {record_path}")
+
+            pipeline.shutdown()
+            if world.save_dir is not None:
+                residency.flush()
+                world.save()
+                glog.i(
+                    f"Saved {len(world.chunks)} chunks to {world.save_dir}, "
+                    f"{residency.stats.loaded} were loaded from it"
+                )
+            world.close()
+            self.arena.delete()
+            backend.shutdown()
+            if self.gwin is not None:
+                glfw.terminate()
             glog.i("[green]Successful cleanup![/]")
+
+    def report(self, frames: int, elapsed: float, chunks_streamed: int) -> None:
+        """Prints the frame times and throughput of a headless run."""
+        flush_logs()  # The table goes straight to the console, after the queued logs
+        table = Table(title=f"Headless run, {frames} frames in {elapsed:.2f} s")
+        table.add_column("stage")
+        for column in ("p50 ms", "p95 ms", "p99 ms"):
+            table.add_column(column, justify="right")
+        for name, stats in self.profiler.stats().items():
+            table.add_row(
+                name, f"{stats.p50:.3f}", f"{stats.p95:.3f}", f"{stats.p99:.3f}"
+            )
+        Console().print(table)
+
+        frames = max(frames, 1)
+        lines = [
+            f"{frames / elapsed:,.1f} frames/s",
+            f"{chunks_streamed} chunks streamed ({chunks_streamed / elapsed:,.1f}/s), "
+            f"{len(self.chunk_meshes)} meshes resident",
+            f"Last frame: {self.cull_stats.visible} chunks drawn, "
+            f"{self.cull_stats.culled} outside the frustum, "
+            f"{self.cull_stats.occluded} occluded",
+        ]
+        backend = self.gdraw.backend
+        if isinstance(backend, NullBackend):
+            stats = backend.stats
+            lines += [
+                f"{stats.draw_calls / frames:.2f} draw calls, "
+                f"{stats.meshes_drawn / frames:,.1f} meshes and "
+                f"{stats.triangles / frames:,.0f} triangles per frame",
+                f"{stats.state_changes / frames:.1f} state changes per frame",
+                f"{stats.bytes_uploaded / 2**20:,.1f} MiB uploaded, "
+                f"{stats.bytes_copied / 2**20:,.1f} MiB copied on relocation",
+            ]
+        meshes, nbytes = self.lod_memory()
+        for level, factor in enumerate(LOD_FACTORS):
+            lines.append(
+                f"LOD {level} ({factor}x): {meshes[level]} meshes, "
+                f"{nbytes[level] / 2**20:,.2f} MiB, "
+                f"{self.lod_stats.triangles[level] / frames:,.0f} triangles per frame"
+            )
+        lines.append(
+            f"{self.lod_stats.switches} level of detail switches, "
+            f"{self.lod_stats.reseams} seam re-meshes"
+        )
+        pipeline_stats = self.pipeline.stats
+        if pipeline_stats.failed or pipeline_stats.restarts:
+            lines.append(
+                f"{pipeline_stats.failed} chunk jobs failed, "
+                f"{pipeline_stats.restarts} pipeline restarts"
+            )
+        for line in lines:
+            glog.i(line)
@@ -1,7 +1,18 @@
 from .chunk import Chunk
+from .generator import TerrainGenerator
+from .grid import ChunkGrid
+from .pipeline import ChunkPipeline
+from .residency import ChunkResidency
+from .storage import DenseStorage, PaletteStorage
 from .world import World
 
 __all__ = [
     "Chunk",
+    "ChunkGrid",
+    "ChunkPipeline",
+    "ChunkResidency",
+    "DenseStorage",
+    "PaletteStorage",
+    "TerrainGenerator",
     "World",
 ]
@@ -0,0 +1,20 @@
+# INFO: Block type IDs
+# 0 is reserved for empty space, every other ID is a solid block.
+AIR = 0
+GRASS = 1
+DIRT = 2
+STONE = 3
+LAMP = 4
+
+# Texture name of every block type, see g_utils.build_texture_array
+BLOCK_NAMES: dict[int, str] = {
+    GRASS: "grass",
+    DIRT: "dirt",
+    STONE: "stone",
+    LAMP: "lamp",
+}
+
+# Block light given off by emissive block types, 1 to 15, see lighting.py
+BLOCK_EMISSION: dict[int, int] = {
+    LAMP: 14,
+}
@@ -1,21 +1,453 @@
+from collections.abc import Sequence
+from typing import Literal
+
 import numpy as np
 
+from g_game.terrain.blocks import AIR
+from g_game.terrain.lighting import FULL_SKY, TRANSPARENT
+from g_game.terrain.lod import LOD_FACTORS, downsample_blocks, downsample_light
+from g_game.terrain.packing import MAX_CHUNK_EDGE, pack_vertices
+from g_game.terrain.storage import (
+    MAX_BLOCK,
+    MAX_DENSE_BLOCK,
+    STORAGES,
+    BlockStorage,
+    DenseStorage,
+    StorageMemory,
+    UniformStorage,
+)
+from g_game.terrain.visibility import ALL_CONNECTED, face_connectivity
+
+# INFO: Face table used by the meshers
+# Each entry describes one of the 6 cube faces as:
+#   (normal axis, normal sign, corner offsets, right axis, up axis)
+# Corner offsets are unit cube corners in counter-clockwise order when
+# viewed from outside the face (bottom left, bottom right, top right, top left),
+# which is what opengl culling expects. The right/up axes are the axes the
+# texture u/v coordinates run along for that face.
+# fmt: off
+FACES: tuple[tuple[int, int, np.ndarray, int, int], ...] = (
+    (0,  1, np.array([[1, 0, 1], [1, 0, 0], [1, 1, 0], [1, 1, 1]], dtype="f4"), 2, 1),  # +X
+    (0, -1, np.array([[0, 0, 0], [0, 0, 1], [0, 1, 1], [0, 1, 0]], dtype="f4"), 2, 1),  # -X
+    (1,  1, np.array([[0, 1, 1], [1, 1, 1], [1, 1, 0], [0, 1, 0]], dtype="f4"), 0, 2),  # +Y
+    (1, -1, np.array([[0, 0, 0], [1, 0, 0], [1, 0, 1], [0, 0, 1]], dtype="f4"), 0, 2),  # -Y
+    (2,  1, np.array([[0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1]], dtype="f4"), 0, 1),  # +Z
+    (2, -1, np.array([[1, 0, 0], [0, 0, 0], [0, 1, 0], [1, 1, 0]], dtype="f4"), 0, 1),  # -Z
+)
+# fmt: on
+
+RIGHT_AXES = np.array([face[3] for face in FACES])
+UP_AXES = np.array([face[4] for face in FACES])
+
+# Texture coordinates for the 4 corners of a quad (bottom left, bottom right, top right, top left)
+QUAD_UVS = np.array([[0, 0], [1, 0], [1, 1], [0, 1]], dtype="f4")
+
+# Two counter-clockwise triangles per quad, split along the 0-2 diagonal, or
+# along the 1-3 diagonal when flipped
+QUAD_INDICES = np.array([0, 1, 2, 2, 3, 0], dtype="uint32")
+FLIPPED_QUAD_INDICES = np.array([1, 2, 3, 3, 0, 1], dtype="uint32")
+
+# Where each of the 4 corners' ambient occlusion sits in a packed occlusion byte
+CORNER_SHIFTS = np.array([0, 2, 4, 6], dtype=np.uint32)
+
+# Floats per vertex: (x, y, z, u, v)
+VERTEX_SIZE = 5
+
+# (6, 4, 5) unit quad vertices for every face, ready to be offset per voxel
+FACE_VERTICES = np.zeros((len(FACES), 4, VERTEX_SIZE), dtype="f4")
+for _face, (_, _, _corners, _, _) in enumerate(FACES):
+    FACE_VERTICES[_face, :, :3] = _corners
+    FACE_VERTICES[_face, :, 3:] = QUAD_UVS
+
+# (6, 4, 3) integer unit quad corners, for the packed vertex format
+FACE_CORNERS = FACE_VERTICES[:, :, :3].astype(np.int64)
+
+# Grown on demand and sliced, since every mesh uses the same index pattern
+_quad_index_cache = np.empty(0, dtype="uint32")
+
+
+def quad_indices(quad_count: int) -> np.ndarray:
+    """Returns the index buffer for `quad_count` consecutive 4-vertex quads."""
+    global _quad_index_cache
+    if len(_quad_index_cache) < quad_count * 6:
+        capacity = max(quad_count, 2 * len(_quad_index_cache) // 6, 1024)
+        base = np.arange(capacity, dtype="uint32")[:, None] * 4
+        _quad_index_cache = (base + QUAD_INDICES[None, :]).reshape(-1)
+    return _quad_index_cache[: quad_count * 6].copy()
+
+
+def emit_quads(
+    face_counts: np.ndarray, origins: np.ndarray, extents: np.ndarray | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Builds the vertex and index data for a batch of quads.
+
+    Args:
+        face_counts (np.ndarray): (6,) number of quads for each entry in FACES.
+            The quads must be grouped by face in FACES order.
+        origins (np.ndarray): (N, 3) minimum voxel corner of each quad.
+        extents (np.ndarray, optional): (N, 3) size of each quad in voxels
+            (1 along the normal axis). Unit quads are assumed when omitted.
+
+    Returns:
+        tuple[np.array, np.array]: The flat vertex data and the index data.
+    """
+    quad_count = len(origins)
+    vertices = np.repeat(FACE_VERTICES, face_counts, axis=0)
+
+    if extents is not None:
+        # Unit corners are 0/1 on every axis, so scaling by the extents stretches
+        # the quad. The uvs are stretched too so textures repeat once per voxel.
+        faces = np.repeat(np.arange(len(FACES)), face_counts)
+        scale = np.empty((quad_count, 1, VERTEX_SIZE), dtype="f4")
+        scale[:, 0, :3] = extents
+        scale[:, 0, 3] = extents[np.arange(quad_count), RIGHT_AXES[faces]]
+        scale[:, 0, 4] = extents[np.arange(quad_count), UP_AXES[faces]]
+        vertices *= scale
+
+    offset = np.zeros((quad_count, 1, VERTEX_SIZE), dtype="f4")
+    offset[:, 0, :3] = origins
+    vertices += offset
+
+    return vertices.reshape(-1), quad_indices(quad_count)
+
+
+def emit_packed_quads(
+    face_counts: np.ndarray,
+    origins: np.ndarray,
+    extents: np.ndarray,
+    tiles: np.ndarray,
+    occlusion: np.ndarray | None = None,
+    light: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Builds packed vertex and index data for a batch of quads, see packing.py.
+
+    Args:
+        face_counts (np.ndarray): (6,) number of quads for each entry in FACES.
+            The quads must be grouped by face in FACES order.
+        origins (np.ndarray): (N, 3) integer minimum voxel corner of each quad.
+        extents (np.ndarray): (N, 3) integer size of each quad in voxels.
+        tiles (np.ndarray): (N,) block type of each quad.
+        occlusion (np.ndarray, optional): (N,) ambient occlusion of each quad's 4
+            corners, see face_occlusion. None for no occlusion.
+        light (np.ndarray, optional): (N,) light in front of each quad, see
+            lighting.py. None for full sky light.
+
+    Returns:
+        tuple[np.array, np.array]: The flat uint32 vertex data and the index data.
+    """
+    quad_count = len(origins)
+    faces = np.repeat(np.arange(len(FACES)), face_counts)
+    quads = np.arange(quad_count)
+
+    # (N, 4, 3) corners stretched over each quad, same as emit_quads
+    positions = origins[:, None, :] + FACE_CORNERS[faces] * extents[:, None, :]
+    scale = np.stack(
+        (extents[quads, RIGHT_AXES[faces]], extents[quads, UP_AXES[faces]]), axis=1
+    )
+    uvs = QUAD_UVS.astype(np.int64)[None, :, :] * scale[:, None, :]
+
+    corner_ao = None
+    indices = quad_indices(quad_count)
+    if occlusion is not None:
+        corner_ao = (occlusion.astype(np.uint32)[:, None] >> CORNER_SHIFTS) & 3
+        # Split quads along the diagonal away from their darkest corners, or the
+        # occlusion gets smeared over the whole quad in one direction only
+        flip = corner_ao[:, 0] + corner_ao[:, 2] > corner_ao[:, 1] + corner_ao[:, 3]
+        quads = indices.reshape(-1, 6)
+        quads[flip] = quads[flip, :1] + FLIPPED_QUAD_INDICES
+
+    vertices = pack_vertices(
+        positions.reshape(-1, 3),
+        np.repeat(faces, 4),
+        uvs.reshape(-1, 2),
+        np.repeat(tiles, 4),
+        corner_ao.reshape(-1) if corner_ao is not None else None,
+        np.repeat(light, 4) if light is not None else None,
+    )
+    return vertices.reshape(-1), indices
+
+
+def empty_mesh(packed: bool = False) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the (vertices, indices) of a mesh with nothing in it."""
+    vertices = np.empty(0, dtype="uint32" if packed else "f4")
+    return vertices, np.empty(0, dtype="uint32")
+
+
+def padded_solid(
+    blocks: np.ndarray, boundaries: Sequence[np.ndarray | bool] | None = None
+) -> np.ndarray:
+    """
+    Builds the solid mask of a chunk with a 1 voxel ring around it.
+
+    Args:
+        blocks (np.ndarray): (sx, sy, sz) block types.
+        boundaries (Sequence, optional): Per entry in FACES, whether the layer of
+            voxels just outside the chunk on that side is solid, as a 2D mask or a
+            single bool (see Chunk.boundary_solid). Everything outside the block
+            array is treated as air when omitted, and so are the ring's edges and
+            corners, which belong to diagonal neighbours.
+
+    Returns:
+        np.ndarray: (sx + 2, sy + 2, sz + 2) boolean mask.
+    """
+    padded = np.pad(blocks != AIR, 1, constant_values=False)
+    inner = (slice(1, -1),) * 3
+
+    if boundaries is not None:
+        for (axis, sign, _, _, _), boundary in zip(FACES, boundaries):
+            layer = list(inner)
+            layer[axis] = -1 if sign > 0 else 0
+            padded[tuple(layer)] = boundary
+    return padded
+
+
+def visible_faces(
+    blocks: np.ndarray,
+    boundaries: Sequence[np.ndarray | bool] | None = None,
+    padded: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Finds every solid voxel face that borders air.
+
+    Neighbours are found by comparing the solid mask against a copy of itself
+    shifted one voxel along each axis, so no per-voxel python code runs.
+
+    Args:
+        blocks (np.ndarray): (sx, sy, sz) block types.
+        boundaries (Sequence, optional): The neighbouring layers, see padded_solid.
+        padded (np.ndarray, optional): The result of padded_solid, if already built.
+
+    Returns:
+        np.ndarray: (6, sx, sy, sz) boolean masks, one per entry in FACES.
+    """
+    if padded is None:
+        padded = padded_solid(blocks, boundaries)
+    solid = padded[1:-1, 1:-1, 1:-1]
+    inner = (slice(1, -1),) * 3
+
+    masks = np.empty((len(FACES), *blocks.shape), dtype=bool)
+    for face, (axis, sign, _, _, _) in enumerate(FACES):
+        neighbour = list(inner)
+        neighbour[axis] = slice(1 + sign, padded.shape[axis] - 1 + sign)
+        np.logical_and(solid, ~padded[tuple(neighbour)], out=masks[face])
+    return masks
+
+
+def _shifted(padded: np.ndarray, offset: Sequence[int]) -> np.ndarray:
+    """The (sx, sy, sz) view of a padded array moved by `offset` voxels."""
+    sx, sy, sz = (n - 2 for n in padded.shape[-3:])
+    ox, oy, oz = offset
+    return padded[..., 1 + ox : 1 + ox + sx, 1 + oy : 1 + oy + sy, 1 + oz : 1 + oz + sz]
+
+
+def face_occlusion(padded: np.ndarray) -> np.ndarray:
+    """
+    Computes the ambient occlusion of the 4 corners of every voxel face.
+
+    A corner is darkened by the solid voxels touching it in the layer in front of
+    the face: the two beside it along the face's edges and the one diagonal to
+    it. With both sides solid the corner is fully occluded whatever the diagonal.
+
+    Args:
+        padded (np.ndarray): The padded solid mask, see padded_solid.
+
+    Returns:
+        np.ndarray: (6, sx, sy, sz) uint8, 2 bits per corner in FACES corner
+            order, each 0 (open) to 3 (fully occluded).
+    """
+    occlusion = np.zeros((len(FACES), *(n - 2 for n in padded.shape)), np.uint8)
+    for face, (axis, sign, corners, right_axis, up_axis) in enumerate(FACES):
+        front = np.zeros(3, dtype=np.int64)
+        front[axis] = sign
+        for corner, shift in zip(corners.astype(np.int64), CORNER_SHIFTS):
+            right = np.zeros(3, dtype=np.int64)
+            right[right_axis] = corner[right_axis] * 2 - 1
+            up = np.zeros(3, dtype=np.int64)
+            up[up_axis] = corner[up_axis] * 2 - 1
+
+            side = _shifted(padded, front + right)
+            other_side = _shifted(padded, front + up)
+            diagonal = _shifted(padded, front + right + up)
+            level = side.astype(np.uint8) + other_side + diagonal
+            level[side & other_side] = 3
+            occlusion[face] |= level << np.uint8(shift)
+    return occlusion
+
+
+def face_light(
+    light: np.ndarray, neighbours: Sequence["Chunk | None"] | None = None
+) -> np.ndarray:
+    """
+    Gets the light in front of every voxel face, from the chunk or its neighbours.
+
+    Args:
+        light (np.ndarray): The chunk's (sx, sy, sz) light volume.
+        neighbours (Sequence, optional): The adjacent chunk for every entry in FACES.
+            Outside the chunk where no neighbour light is known counts as full sky.
+
+    Returns:
+        np.ndarray: (6, sx, sy, sz) uint8 light, see lighting.py.
+    """
+    shape = light.shape
+    padded = np.full(tuple(n + 2 for n in shape), FULL_SKY, dtype=np.uint8)
+    inner = (slice(1, -1),) * 3
+    padded[inner] = light
+    for (axis, sign, _, _, _), neighbour in zip(FACES, neighbours or ()):
+        if neighbour is None or neighbour.light is None:
+            continue
+        layer = list(inner)
+        layer[axis] = -1 if sign > 0 else 0
+        index = 0 if sign > 0 else neighbour.size[axis] - 1
+        padded[tuple(layer)] = np.take(neighbour.light, index, axis=axis)
+
+    lit = np.empty((len(FACES), *shape), dtype=np.uint8)
+    for face, (axis, sign, _, _, _) in enumerate(FACES):
+        front = [0, 0, 0]
+        front[axis] = sign
+        lit[face] = _shifted(padded, front)
+    return lit
+
+
+def neighbour_boundaries(
+    neighbours: Sequence["Chunk | None"],
+) -> list[np.ndarray | bool]:
+    """
+    Collects the solid layers the 6 neighbouring chunks present to a chunk.
+
+    Args:
+        neighbours (Sequence): The adjacent chunk for every entry in FACES, or None
+            where no chunk is loaded, which counts as air.
+
+    Returns:
+        list: The boundaries argument of visible_faces.
+    """
+    boundaries: list[np.ndarray | bool] = []
+    for (axis, sign, _, _, _), neighbour in zip(FACES, neighbours):
+        if neighbour is None:
+            boundaries.append(False)
+        else:
+            # The +X neighbour touches us with its x = 0 layer and so on
+            index = 0 if sign > 0 else neighbour.size[axis] - 1
+            boundaries.append(neighbour.boundary_solid(axis, index))
+    return boundaries
+
+
+def touching_layers(
+    neighbours: Sequence["Chunk | None"],
+) -> list["Chunk | None"]:
+    """
+    Cuts the 6 neighbouring chunks down to the layer each one touches a chunk with.
+
+    That layer is all the meshers read from a neighbour, see neighbour_boundaries
+    and face_light, so the layers stand in for the whole neighbours when a chunk
+    is meshed in another process.
+
+    Args:
+        neighbours (Sequence): The adjacent chunk for every entry in FACES, or None.
+
+    Returns:
+        list: One block thick chunks holding the touching blocks and light, None
+            where no neighbour was given.
+    """
+    layers: list[Chunk | None] = []
+    for (axis, sign, _, _, _), neighbour in zip(FACES, neighbours):
+        if neighbour is None:
+            layers.append(None)
+            continue
+        index = 0 if sign > 0 else neighbour.size[axis] - 1
+        sx, sy, sz = (1 if i == axis else n for i, n in enumerate(neighbour.size))
+        layer = Chunk((sx, sy, sz), neighbour.backend)
+        layer.blocks = np.take(neighbour.blocks, [index], axis=axis)
+        if neighbour.light is not None:
+            layer.light = np.take(neighbour.light, [index], axis=axis)
+        layers.append(layer)
+    return layers
+
 
 class Chunk:
     size: tuple[int, int, int]
-    blocks: np.ndarray
+    backend: Literal["dense", "palette"]
+    storage: BlockStorage
+
+    # Sky and block light per voxel, see lighting.py. None until the chunk is lit,
+    # either by the terrain generator or when it is added to a World
+    light: np.ndarray | None
 
-    def __init__(self, size: tuple[int, int, int] = (16, 16, 16)):
+    # Which faces see each other through the chunk, see visibility.py. None
+    # until asked for again after the blocks changed
+    _connectivity: int | None
+
+    def __init__(
+        self,
+        size: tuple[int, int, int] = (16, 16, 16),
+        storage: Literal["dense", "palette"] = "dense",
+        fill: int = AIR,
+    ):
         """
         Initializes a chunk.
 
+        The chunk starts out uniformly filled with no block array allocated. It is
+        promoted to its storage backend by the first set_block that differs.
+
         Args:
             size (tuple, optional): The dimensions of the chunk (width, height, depth). Defaults to (16, 16, 16).
+            storage (str, optional): The block storage backend. "dense" keeps one byte per block,
+                "palette" bit-packs indices into a per-chunk palette. Defaults to "dense".
+            fill (int, optional): The block type the chunk starts filled with. Defaults to AIR.
         """
         self.size = size
-        self.blocks = np.zeros(size, dtype=np.uint8)
+        self.backend = storage
+        self.storage = UniformStorage(size, fill)
+        self.light = None
+        self._connectivity = None
 
-    def get_block(self, x: int, y: int, z: int):
+    @property
+    def blocks(self) -> np.ndarray:
+        """
+        The blocks of the chunk as a dense (sx, sy, sz) array.
+
+        With dense storage this is the live array and can be written to directly.
+        Uniform and palette storage return a read only array, assign a whole array
+        to `blocks` instead to write in bulk.
+        """
+        return self.storage.to_dense()
+
+    @blocks.setter
+    def blocks(self, blocks: np.ndarray) -> None:
+        blocks = np.asarray(blocks)
+        if blocks.shape != self.size:
+            raise ValueError(
+                f"Block array of shape {blocks.shape} does not match chunk size {self.size}."
+            )
+
+        self._connectivity = None
+        first = blocks.flat[0]
+        if (blocks == first).all():
+            self.storage = UniformStorage(self.size, int(first))
+        else:
+            self.storage = STORAGES[self.backend].from_dense(blocks)
+
+    @property
+    def uniform_block(self) -> int | None:
+        """The block type filling the whole chunk, or None if it holds several types."""
+        if isinstance(self.storage, UniformStorage):
+            return self.storage.block
+        return None
+
+    @property
+    def is_empty(self) -> bool:
+        """Whether the chunk is known to be all air."""
+        return self.uniform_block == AIR
+
+    @property
+    def is_full(self) -> bool:
+        """Whether the chunk is known to be filled with a single solid block."""
+        block = self.uniform_block
+        return block is not None and block != AIR
+
+    def get_block(self, x: int, y: int, z: int) -> int:
         """
         Gets the block type at a specific coordinate within the chunk.
 
@@ -27,9 +459,9 @@ class Chunk:
         Returns:
             int: The block type ID.
         """
-        return x + y + z
+        return self.storage.get(x, y, z)
 
-    def set_block(self, x: int, y: int, z: int, block_type: int):
+    def set_block(self, x: int, y: int, z: int, block_type: int) -> None:
         """
         Sets the block type at a specific coordinate within the chunk.
 
@@ -39,62 +471,331 @@ class Chunk:
             z (int): The z-coordinate.
             block_type (int): The block type ID to set.
         """
-        return x + y + z + block_type > 0
+        if isinstance(self.storage, UniformStorage):
+            if block_type == self.storage.block:
+                return
+            self.storage = STORAGES[self.backend](self.size, self.storage.block)
+        self.storage.set(x, y, z, block_type)
+        self._connectivity = None
 
-    def generate_mesh(self):
+    def get_blocks(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
         """
-        Generates a mesh for a given chunk.
+        Gets the block types at a batch of coordinates within the chunk.
 
-        This function will eventually iterate through the chunk's blocks
-        and generate a mesh of the visible faces.
+        Args:
+            x (np.ndarray): (n,) x-coordinates.
+            y (np.ndarray): (n,) y-coordinates.
+            z (np.ndarray): (n,) z-coordinates.
+
+        Returns:
+            np.ndarray: (n,) uint16 block type IDs, whatever the storage backend.
+        """
+        block = self.uniform_block
+        if block is not None:
+            return np.full(len(x), block, dtype=np.uint16)
+        return self.blocks[x, y, z].astype(np.uint16, copy=False)
 
-        For now, it returns a predefined mesh for a single cube for testing.
+    def set_blocks(
+        self, x: np.ndarray, y: np.ndarray, z: np.ndarray, block_types: np.ndarray
+    ) -> None:
+        """
+        Sets the block types at a batch of coordinates within the chunk.
+
+        Dense storage is written in place. Uniform and palette storage are
+        unpacked, written and stored again, once for the whole batch. Where a
+        coordinate repeats the last write wins.
 
         Args:
-            chunk (Chunk): The chunk to generate a mesh for.
+            x (np.ndarray): (n,) x-coordinates.
+            y (np.ndarray): (n,) y-coordinates.
+            z (np.ndarray): (n,) z-coordinates.
+            block_types (np.ndarray): (n,) block type IDs to set, or one for all.
+
+        Raises:
+            ValueError: If any ID is negative or above what the storage holds,
+                MAX_DENSE_BLOCK for dense storage and MAX_BLOCK otherwise, which
+                the write would otherwise wrap.
+        """
+        block_types = np.asarray(block_types)
+        if isinstance(self.storage, DenseStorage):
+            if block_types.size and (
+                block_types.min() < 0 or block_types.max() > MAX_DENSE_BLOCK
+            ):
+                raise ValueError("Block types are out of range for dense storage.")
+            self.storage.blocks[x, y, z] = block_types
+            self._connectivity = None
+            return
+        if block_types.size and (
+            block_types.min() < 0 or block_types.max() > MAX_BLOCK
+        ):
+            raise ValueError("Block types are out of range.")
+        blocks = np.array(self.blocks, dtype=np.uint16)
+        blocks[x, y, z] = block_types
+        self.blocks = blocks
+
+    @property
+    def connectivity(self) -> int:
+        """
+        Which of the chunk's faces are connected through its air, see visibility.py.
+
+        Computed on first use after the blocks change. build_chunk() and
+        World.mesh_chunk() compute it along with the mesh, so it's ready by the
+        time the chunk is drawn.
+        """
+        return self.compute_connectivity()
+
+    def compute_connectivity(self) -> int:
+        """Computes the face connectivity now unless it's cached, and returns it."""
+        if self._connectivity is None:
+            block = self.uniform_block
+            if block is not None:
+                self._connectivity = ALL_CONNECTED if TRANSPARENT[block] else 0
+            else:
+                self._connectivity = face_connectivity(self.blocks)
+        return self._connectivity
+
+    def boundary_solid(self, axis: int, index: int) -> np.ndarray | bool:
+        """
+        Gets which blocks of one layer of the chunk are solid.
+
+        Args:
+            axis (int): The axis the layer is perpendicular to.
+            index (int): The position of the layer along that axis.
+
+        Returns:
+            np.ndarray | bool: A 2D solid mask, or a single bool for uniform chunks.
+        """
+        block = self.uniform_block
+        if block is not None:
+            return block != AIR
+        return np.take(self.blocks, index, axis=axis) != AIR
+
+    def writable_light(self) -> np.ndarray:
+        """Gets the light volume as an array that can be written to, copying a uniform one."""
+        if self.light is None:
+            raise ValueError("Chunk has no light volume yet.")
+        if not self.light.flags.writeable:
+            self.light = np.array(self.light)
+        return self.light
+
+    @property
+    def light_nbytes(self) -> int:
+        """Bytes the light volume takes up, 0 while it is uniform or missing."""
+        if self.light is None or not self.light.flags.writeable:
+            return 0
+        return self.light.nbytes
+
+    def _shading(
+        self,
+        padded: np.ndarray,
+        neighbours: Sequence["Chunk | None"] | None,
+        level: int = 0,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """The (6, sx, sy, sz) face occlusion and light the packed meshers bake in."""
+        light = self.light if self.light is not None else np.uint8(FULL_SKY)
+        light = np.broadcast_to(light, self.size)
+        if level:
+            light = downsample_light(light, level)
+        return face_occlusion(padded), face_light(light, neighbours)
+
+    def _check_packable(self) -> None:
+        if max(self.size) > MAX_CHUNK_EDGE:
+            raise ValueError(
+                f"Chunks larger than {MAX_CHUNK_EDGE} blocks can't use packed vertices."
+            )
+
+    def memory_usage(self) -> StorageMemory:
+        """Reports how much memory the block storage of this chunk uses."""
+        return self.storage.memory()
+
+    def generate_mesh(
+        self, neighbours: Sequence["Chunk | None"] | None = None, packed: bool = False
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Generates a mesh of the visible faces of the chunk.
+
+        Every solid face that borders air becomes one quad, built in bulk for all
+        6 directions at once. Vertex positions are in chunk-local voxel units, so
+        block (x, y, z) spans [x, x+1] on each axis.
+
+        Args:
+            neighbours (Sequence, optional): The adjacent chunk for every entry in FACES,
+                used to skip faces on the chunk border that a neighbour hides. Without
+                them every border face is kept.
+            packed (bool, optional): Emit 2 uint32 words per vertex (see packing.py)
+                instead of 5 floats. Defaults to False.
 
         Returns:
             tuple[np.array, np.array]: A tuple containing the vertex data and the index data.
         """
-        # Predefined vertices for a single cube at the origin
-        # (x, y, z, u, v) coordinates for each vertex
-        # fmt: off
-        vertices = np.array([
-            # Front face
-            -0.5, -0.5,  0.5, 0.0, 0.0, # bottom left (looking from +z)
-             0.5, -0.5,  0.5, 1.0, 0.0, # bottom right
-             0.5,  0.5,  0.5, 1.0, 1.0, # top right
-            -0.5,  0.5,  0.5, 0.0, 1.0, # top left
-            # Back face
-             0.5, -0.5, -0.5, 0.0, 0.0, # bottom left (looking from -z)
-            -0.5, -0.5, -0.5, 1.0, 0.0, # bottom right
-            -0.5,  0.5, -0.5, 1.0, 1.0, # top right
-             0.5,  0.5, -0.5, 0.0, 1.0, # top left
-        ], dtype="f4")
-
-        # Indice order for block must be Counter-Clockwise b/c opengl culling.
-        indices = np.array([
-            # Front face (viewed from +Z)
-            0, 1, 2, 2, 3, 0,
-            # Back face (viewed from -Z)
-            4, 5, 6, 6, 7, 4,
-            # Top face (viewed from +Y)
-            3, 2, 7, 7, 6, 3,
-            # Bottom face (viewed from -Y)
-            5, 4, 1, 1, 0, 5,
-            # Right face (viewed from +X)
-            1, 4, 7, 7, 2, 1,
-            # Left face (viewed from -X)
-            5, 0, 3, 3, 6, 5,
-        ], dtype="uint32")
-        # fmt: on
-        return vertices, indices
-
-    def greedy_mesh(self):
+        if self.is_empty:
+            return empty_mesh(packed)
+        if packed:
+            self._check_packable()
+
+        blocks = self.blocks
+        padded = padded_solid(
+            blocks, neighbour_boundaries(neighbours) if neighbours else None
+        )
+        masks = visible_faces(blocks, padded=padded)
+
+        # Flat indices come out grouped by face, which is what emit_quads expects
+        flat = np.flatnonzero(masks)
+        face_counts = np.count_nonzero(masks.reshape(len(FACES), -1), axis=1)
+        _, x, y, z = np.unravel_index(flat, masks.shape)
+
+        if packed:
+            occlusion, light = self._shading(padded, neighbours)
+            return emit_packed_quads(
+                face_counts,
+                np.stack((x, y, z), axis=1),
+                np.ones((len(flat), 3), dtype=np.int64),
+                blocks[x, y, z],
+                occlusion.reshape(-1)[flat],
+                light.reshape(-1)[flat],
+            )
+
+        origins = np.empty((len(flat), 3), dtype="f4")
+        origins[:, 0] = x
+        origins[:, 1] = y
+        origins[:, 2] = z
+
+        return emit_quads(face_counts, origins)
+
+    def greedy_mesh(
+        self,
+        neighbours: Sequence["Chunk | None"] | None = None,
+        packed: bool = False,
+        lod: int = 0,
+    ) -> tuple[np.ndarray, np.ndarray]:
         """
         A more advanced meshing algorithm that combines adjacent faces
         of the same block type into larger rectangles.
 
-        (This is a stub for a future optimization).
+        Each face direction is viewed as a stack of 2D slices. Visible faces are first
+        merged into maximal same-type runs along the slice's u axis, then runs with the
+        same start, length and type in consecutive rows are merged into one rectangle.
+        Both steps are array operations over every slice at once.
+
+        Packed meshes also bake each face's ambient occlusion and light into its
+        vertices, and only merge faces that have the same of both.
+
+        Args:
+            neighbours (Sequence, optional): The adjacent chunk for every entry in FACES,
+                see generate_mesh. Ignored above level of detail 0.
+            packed (bool, optional): Emit the packed vertex format, see generate_mesh.
+            lod (int, optional): Level of detail to mesh at, see lod.py. Defaults to 0,
+                full resolution.
+
+        Returns:
+            tuple[np.array, np.array]: A tuple containing the vertex data and the index data.
         """
-        return
+        if self.is_empty:
+            return empty_mesh(packed)
+        if packed:
+            self._check_packable()
+
+        blocks = self.blocks
+        if lod:
+            # Coarse meshes keep their border faces to close seams, see lod.py
+            blocks = downsample_blocks(blocks, lod)
+            neighbours = None
+        padded = padded_solid(
+            blocks, neighbour_boundaries(neighbours) if neighbours else None
+        )
+        masks = visible_faces(blocks, padded=padded)
+
+        # Faces merge when their keys match, so packed keys carry the shading too
+        keys = blocks.astype(np.int64)
+        if packed:
+            occlusion, light = self._shading(padded, neighbours, lod)
+            keys = (
+                keys
+                | (occlusion.astype(np.int64) << 16)
+                | (light.astype(np.int64) << 24)
+            )
+
+        face_counts = np.zeros(len(FACES), dtype=np.intp)
+        origins: list[np.ndarray] = []
+        extents: list[np.ndarray] = []
+        tiles: list[np.ndarray] = []
+        for face, (axis, _, _, right_axis, up_axis) in enumerate(FACES):
+            # View the face keys as (slice, row, column) = (normal, up, right)
+            order = (axis, up_axis, right_axis)
+            face_keys = keys[face] if packed else keys
+            grid = np.where(masks[face], face_keys, AIR).transpose(order)
+
+            rect_origins, rect_extents, rect_blocks = _greedy_rectangles(grid)
+            face_counts[face] = len(rect_origins)
+
+            # Move the (slice, row, column) rectangles back into xyz space
+            inverse = np.argsort(order)
+            origins.append(rect_origins[:, inverse])
+            extents.append(rect_extents[:, inverse])
+            tiles.append(rect_blocks)
+
+        # Cells of a coarse level cover LOD_FACTORS[lod] blocks a side
+        scale = LOD_FACTORS[lod]
+        if packed:
+            rect_keys = np.concatenate(tiles)
+            return emit_packed_quads(
+                face_counts,
+                np.concatenate(origins) * scale,
+                np.concatenate(extents) * scale,
+                rect_keys & 0xFFFF,
+                (rect_keys >> 16) & 0xFF,
+                (rect_keys >> 24) & 0xFF,
+            )
+        return emit_quads(
+            face_counts,
+            (np.concatenate(origins) * scale).astype("f4"),
+            (np.concatenate(extents) * scale).astype("f4"),
+        )
+
+
+def _greedy_rectangles(
+    grid: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Merges the non-air cells of a stack of 2D slices into same-type rectangles.
+
+    Args:
+        grid (np.ndarray): (slices, rows, columns) block types, or any other
+            nonzero key faces must share to merge, AIR where there is no face.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: (N, 3) rectangle origins and
+            (N, 3) extents in (slice, row, column) order, and the (N,) keys.
+    """
+    # 1. Maximal runs of one type along each row
+    padded = np.pad(grid, ((0, 0), (0, 0), (1, 1)), constant_values=AIR)
+    body = padded[:, :, 1:-1]
+    solid = body != AIR
+    run_starts = np.flatnonzero(solid & (body != padded[:, :, :-2]))
+    run_ends = np.flatnonzero(solid & (body != padded[:, :, 2:]))
+
+    layer, row, column = np.unravel_index(run_starts, grid.shape)
+    length = run_ends - run_starts + 1
+    block = grid.reshape(-1)[run_starts]
+
+    # 2. Stack identical runs from consecutive rows into rectangles
+    order = np.lexsort((row, block, length, column, layer))
+    layer, row, column = layer[order], row[order], column[order]
+    length, block = length[order], block[order]
+
+    new_rect = np.ones(len(order), dtype=bool)
+    new_rect[1:] = (
+        (layer[1:] != layer[:-1])
+        | (column[1:] != column[:-1])
+        | (length[1:] != length[:-1])
+        | (block[1:] != block[:-1])
+        | (row[1:] != row[:-1] + 1)
+    )
+    rect_starts = np.flatnonzero(new_rect)
+    height = np.diff(np.append(rect_starts, len(order)))
+
+    origins = np.stack(
+        (layer[rect_starts], row[rect_starts], column[rect_starts]), axis=1
+    )
+    extents = np.stack((np.ones_like(height), height, length[rect_starts]), axis=1)
+    return origins, extents, block[rect_starts]
@@ -0,0 +1,225 @@
+from collections.abc import Sequence
+
+import numpy as np
+
+from g_game.terrain.blocks import AIR, DIRT, GRASS, STONE
+from g_game.terrain.chunk import Chunk
+from g_game.terrain.lighting import compute_light
+from g_game.terrain.noise import PerlinNoise
+
+# Cave noise is sampled every CAVE_STEP blocks and trilinearly interpolated between
+CAVE_STEP = 4
+
+
+def _upsample_weights(size: int, step: int) -> np.ndarray:
+    """
+    Builds the (size, samples) linear interpolation matrix from a lattice sampled
+    every `step` blocks, including the far edge, back to every block.
+    """
+    samples = -(-size // step) + 1
+    position = np.arange(size) / step
+    lower = np.floor(position).astype(np.int64)
+    t = position - lower
+
+    weights = np.zeros((size, samples))
+    weights[np.arange(size), lower] = 1 - t
+    weights[np.arange(size), lower + 1] = t
+    return weights
+
+
+class TerrainGenerator:
+    """
+    Deterministic, seeded terrain from a 2D fractal heightmap carved by 3D cave noise.
+
+    Whole batches of chunks are generated together: the heightmap is evaluated once
+    per unique chunk column and the cave noise once for every chunk that reaches
+    below the surface, each as a single array expression.
+    """
+
+    seed: int
+    chunk_size: tuple[int, int, int]
+    base_height: float
+    height_amplitude: float
+    height_scale: float
+    cave_scale: float
+    cave_threshold: float
+    dirt_depth: int
+
+    def __init__(
+        self,
+        seed: int = 0,
+        chunk_size: tuple[int, int, int] = (16, 16, 16),
+        base_height: float = 32.0,
+        height_amplitude: float = 16.0,
+        height_scale: float = 1 / 96,
+        cave_scale: float = 1 / 24,
+        cave_threshold: float = 0.3,
+        dirt_depth: int = 3,
+    ) -> None:
+        """
+        Args:
+            seed (int, optional): Seed for every noise field. Defaults to 0.
+            chunk_size (tuple, optional): The dimensions of generated chunks. Defaults to (16, 16, 16).
+            base_height (float, optional): Average surface height in blocks. Defaults to 32.
+            height_amplitude (float, optional): How far the surface strays from base_height. Defaults to 16.
+            height_scale (float, optional): Heightmap noise frequency per block. Defaults to 1/96.
+            cave_scale (float, optional): Cave noise frequency per block. Defaults to 1/24.
+            cave_threshold (float, optional): Cave noise above this is carved to air. Defaults to 0.3.
+            dirt_depth (int, optional): Dirt layers between the grass and the stone. Defaults to 3.
+        """
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.base_height = base_height
+        self.height_amplitude = height_amplitude
+        self.height_scale = height_scale
+        self.cave_scale = cave_scale
+        self.cave_threshold = cave_threshold
+        self.dirt_depth = dirt_depth
+
+        self._height_noise = PerlinNoise(seed)
+        self._cave_noise = PerlinNoise(seed + 1)
+        self._cave_weights = tuple(
+            _upsample_weights(size, CAVE_STEP) for size in chunk_size
+        )
+
+    def heightmap(self, x: np.ndarray, z: np.ndarray) -> np.ndarray:
+        """
+        Computes the surface height at world block columns.
+
+        Args:
+            x (np.ndarray): World x block coordinates.
+            z (np.ndarray): World z block coordinates, broadcastable with x.
+
+        Returns:
+            np.ndarray: Integer surface heights, the first air block above ground.
+        """
+        noise = self._height_noise.fractal2(
+            x * self.height_scale, z * self.height_scale, octaves=5
+        )
+        return np.floor(self.base_height + self.height_amplitude * noise).astype(
+            np.int64
+        )
+
+    def generate_blocks(
+        self, chunk_positions: Sequence[tuple[int, int, int]]
+    ) -> np.ndarray:
+        """
+        Generates the blocks of a batch of chunks.
+
+        Args:
+            chunk_positions (Sequence): The (x, y, z) positions of the chunks.
+
+        Returns:
+            np.ndarray: (N, sx, sy, sz) uint8 block types, in chunk_positions order.
+        """
+        return self._generate(chunk_positions)[0]
+
+    def sky_open(self, chunk_position: tuple[int, int, int]) -> np.ndarray:
+        """
+        Finds the columns of a chunk that generated terrain leaves open to the sky.
+
+        Caves never break through the surface crust, so a column is open exactly
+        when the surface is at or below the chunk's top.
+
+        Returns:
+            np.ndarray: (sx, sz) bool mask, the sky_open argument of compute_light.
+        """
+        sx, sy, sz = self.chunk_size
+        x, y, z = chunk_position
+        heights = self.heightmap(
+            (x * sx + np.arange(sx))[:, None], (z * sz + np.arange(sz))[None, :]
+        )
+        return heights <= (y + 1) * sy
+
+    def _generate(
+        self, chunk_positions: Sequence[tuple[int, int, int]]
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """The blocks of a batch of chunks, and the (N, sx, sz) surface heights over each."""
+        sx, sy, sz = self.chunk_size
+        positions = np.asarray(chunk_positions, dtype=np.int64).reshape(-1, 3)
+        blocks = np.zeros((len(positions), sx, sy, sz), dtype=np.uint8)
+        if len(positions) == 0:
+            return blocks, np.zeros((0, sx, sz), dtype=np.int64)
+
+        # 1. One heightmap per unique chunk column, shared by every chunk above it
+        columns, column_of = np.unique(
+            positions[:, [0, 2]], axis=0, return_inverse=True
+        )
+        world_x = columns[:, 0, None] * sx + np.arange(sx)[None, :]
+        world_z = columns[:, 1, None] * sz + np.arange(sz)[None, :]
+        heights = self.heightmap(world_x[:, :, None], world_z[:, None, :])
+        heights = heights[column_of.reshape(-1)]  # (N, sx, sz)
+
+        # 2. Skip chunks that are entirely above the surface, they stay air
+        bottoms = positions[:, 1] * sy
+        below = np.flatnonzero(bottoms < heights.max(axis=(1, 2)))
+        if len(below) == 0:
+            return blocks, heights
+
+        # 3. Layer grass, dirt and stone by depth below the surface
+        world_y = bottoms[below, None] + np.arange(sy)[None, :]  # (M, sy)
+        depth = heights[below][:, :, None, :] - world_y[:, None, :, None]
+        layers = np.where(
+            depth > self.dirt_depth + 1, STONE, np.where(depth > 1, DIRT, GRASS)
+        )
+        layers[depth <= 0] = AIR
+
+        # 4. Carve caves with 3D noise over every chunk that has ground in it
+        caves = self._caves(positions[below])
+        # Keep a solid crust so caves don't riddle the surface with holes
+        layers[(caves > self.cave_threshold) & (depth > 2)] = AIR
+
+        blocks[below] = layers
+        return blocks, heights
+
+    def _caves(self, positions: np.ndarray) -> np.ndarray:
+        """
+        Evaluates the cave noise for a batch of chunks.
+
+        The noise is sampled on a coarse lattice and trilinearly interpolated,
+        which is far cheaper than sampling every block and smooth enough for caves.
+
+        Args:
+            positions (np.ndarray): (M, 3) chunk positions.
+
+        Returns:
+            np.ndarray: (M, sx, sy, sz) cave noise values.
+        """
+        wx, wy, wz = self._cave_weights
+
+        # World block coordinates of the lattice points along each axis, (M, samples)
+        lattice: list[np.ndarray] = []
+        for axis, weights in enumerate(self._cave_weights):
+            offsets = np.arange(weights.shape[1]) * CAVE_STEP
+            origins = positions[:, axis, None] * self.chunk_size[axis]
+            lattice.append((origins + offsets[None, :]) * self.cave_scale)
+
+        coarse = self._cave_noise.fractal3(
+            lattice[0][:, :, None, None],
+            # Squash caves vertically so they run more like tunnels
+            lattice[1][:, None, :, None] * 1.5,
+            lattice[2][:, None, None, :],
+            octaves=3,
+        )
+        return np.einsum("ai,bj,ck,mijk->mabc", wx, wy, wz, coarse, optimize=True)
+
+    def generate_chunks(
+        self, chunk_positions: Sequence[tuple[int, int, int]]
+    ) -> list[Chunk]:
+        """Generates a batch of chunks, lit, in chunk_positions order."""
+        sy = self.chunk_size[1]
+        chunks: list[Chunk] = []
+        all_blocks, heights = self._generate(chunk_positions)
+        for (_, y, _), blocks, column in zip(chunk_positions, all_blocks, heights):
+            chunk = Chunk(self.chunk_size)
+            chunk.blocks = blocks
+            # Each chunk is lit on its own. Air in untouched terrain is under open
+            # sky or in caves under the crust, so light only crosses between
+            # chunks where a cave opens onto a steep slope right at a border
+            chunk.light = compute_light(blocks, column <= (y + 1) * sy)
+            chunks.append(chunk)
+        return chunks
+
+    def generate_chunk(self, chunk_position: tuple[int, int, int]) -> Chunk:
+        """Generates a single chunk."""
+        return self.generate_chunks([chunk_position])[0]
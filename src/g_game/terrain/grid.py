@@ -0,0 +1,213 @@
+from collections.abc import (
+    ItemsView,
+    Iterator,
+    KeysView,
+    Mapping,
+    MutableMapping,
+    ValuesView,
+)
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from g_game.terrain.chunk import Chunk
+
+# INFO: Chunk grid
+# World.chunks maps chunk positions to chunks like a dict, and single lookups go
+# straight to one. Alongside it every loaded chunk sits in a slot of a dense
+# toroidal grid: chunk (x, y, z) goes to slot (x mod W, y mod H, z mod D), with
+# power of two extents so the wrap is a mask. Loaded chunks form a box around
+# the camera, so while that box fits in the grid no two of them share a slot,
+# and a whole array of positions maps to its chunks with a few integer ops and
+# one compare against the packed key each slot holds.
+#   When two chunks do land on the same slot the grid doubles along the axes
+#   they differ on and re-slots everything, which only happens while the load
+#   radius grows past what the grid covered.
+#   Scalar lookups stay on the dict. In Python hashing a position tuple is as
+#   fast as working out its slot, the grid pays off for arrays of positions.
+DEFAULT_EXTENT = (32, 8, 32)
+
+# Chunk coordinates are offset by this and packed 21 bits per axis into one int64
+KEY_OFFSET = 1 << 20
+_KEY_MASK = (1 << 21) - 1
+
+# Key of a slot with no chunk in it, never a valid packed key
+EMPTY = -1
+
+
+def chunk_keys(chunk_positions: np.ndarray) -> np.ndarray:
+    """Packs (..., 3) chunk positions into (...) int64 keys that sort and compare fast."""
+    shifted = np.asarray(chunk_positions, dtype=np.int64) + KEY_OFFSET
+    return (shifted[..., 0] << 42) | (shifted[..., 1] << 21) | shifted[..., 2]
+
+
+def _chunk_key(x: int, y: int, z: int) -> int:
+    return ((x + KEY_OFFSET) << 42) | ((y + KEY_OFFSET) << 21) | (z + KEY_OFFSET)
+
+
+def _unpack_key(key: int) -> tuple[int, int, int]:
+    return (
+        (key >> 42) - KEY_OFFSET,
+        ((key >> 21) & _KEY_MASK) - KEY_OFFSET,
+        (key & _KEY_MASK) - KEY_OFFSET,
+    )
+
+
+class ChunkGrid(MutableMapping[tuple[int, int, int], "Chunk"]):
+    """
+    Loaded chunks by position, with a dense toroidal slot index for batched lookups.
+
+    Reads and writes like a dict, see the top of this module for the grid.
+    """
+
+    extent: tuple[int, int, int]
+    slot_keys: np.ndarray  # (capacity,) int64 packed key per slot, EMPTY if free
+    slots: list["Chunk | None"]  # Chunk per slot
+
+    def __init__(
+        self,
+        chunks: Mapping[tuple[int, int, int], "Chunk"] | None = None,
+        extent: tuple[int, int, int] = DEFAULT_EXTENT,
+    ) -> None:
+        """
+        Args:
+            chunks (Mapping, optional): Chunks to start with. Defaults to none.
+            extent (tuple, optional): Starting grid size in chunks along each
+                axis, powers of two. Defaults to DEFAULT_EXTENT.
+        """
+        if any(size < 1 or size & (size - 1) for size in extent):
+            raise ValueError(f"Grid extent {extent} must be powers of two.")
+        self._chunks: dict[tuple[int, int, int], Chunk] = dict(chunks or {})
+        self._reslot(extent)
+
+    @property
+    def capacity(self) -> int:
+        """Number of slots, the bound on the indices lookup() returns."""
+        return len(self.slots)
+
+    # --------------------
+    #   Mapping protocol
+    # --------------------
+
+    def __getitem__(self, chunk_position: tuple[int, int, int]) -> "Chunk":
+        return self._chunks[chunk_position]
+
+    def __setitem__(self, chunk_position: tuple[int, int, int], chunk: "Chunk") -> None:
+        self._chunks[chunk_position] = chunk
+        collision = self._place(chunk_position, chunk)
+        if collision is not None:
+            self._reslot(self._grown(chunk_position, collision))
+
+    def __delitem__(self, chunk_position: tuple[int, int, int]) -> None:
+        del self._chunks[chunk_position]
+        slot = self._slot(*chunk_position)
+        self.slot_keys[slot] = EMPTY
+        self.slots[slot] = None
+
+    def __contains__(self, chunk_position: object) -> bool:
+        return chunk_position in self._chunks
+
+    def __iter__(self) -> Iterator[tuple[int, int, int]]:
+        return iter(self._chunks)
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def get(self, chunk_position, default=None):  # type: ignore[override]
+        return self._chunks.get(chunk_position, default)
+
+    def keys(self) -> KeysView[tuple[int, int, int]]:
+        return self._chunks.keys()
+
+    def values(self) -> ValuesView["Chunk"]:
+        return self._chunks.values()
+
+    def items(self) -> ItemsView[tuple[int, int, int], "Chunk"]:
+        return self._chunks.items()
+
+    # -------------------
+    #   Batched lookups
+    # -------------------
+
+    def lookup(self, chunk_positions: np.ndarray) -> np.ndarray:
+        """
+        Finds the slots of a batch of chunks.
+
+        Any leading shape works, so the 6 neighbours of n chunks are a single
+        lookup of `positions[:, None] + NEIGHBOUR_OFFSETS`.
+
+        Args:
+            chunk_positions (np.ndarray): (..., 3) int chunk positions.
+
+        Returns:
+            np.ndarray: (...) int64 slot of each chunk, -1 where it isn't loaded.
+                chunk_at() turns a slot back into its chunk.
+        """
+        positions = np.asarray(chunk_positions, dtype=np.int64)
+        width, height, depth = self.extent
+        slots = (
+            (positions[..., 0] & (width - 1)) * height
+            + (positions[..., 1] & (height - 1))
+        ) * depth + (positions[..., 2] & (depth - 1))
+        return np.where(self.slot_keys[slots] == chunk_keys(positions), slots, -1)
+
+    def chunk_at(self, slot: int) -> "Chunk":
+        """Gets the chunk in a slot returned by lookup()."""
+        chunk = self.slots[slot]
+        if chunk is None:
+            raise KeyError(f"Grid slot {slot} holds no chunk.")
+        return chunk
+
+    def slot_of(self, chunk_position: tuple[int, int, int]) -> int:
+        """Gets the slot a chunk position maps to, whether a chunk is in it or not."""
+        return self._slot(*chunk_position)
+
+    # ---------
+    #   Slots
+    # ---------
+
+    def _slot(self, x: int, y: int, z: int) -> int:
+        width, height, depth = self.extent
+        return ((x & (width - 1)) * height + (y & (height - 1))) * depth + (
+            z & (depth - 1)
+        )
+
+    def _place(
+        self, chunk_position: tuple[int, int, int], chunk: "Chunk"
+    ) -> tuple[int, int, int] | None:
+        """Puts a chunk in its slot, or returns the position of the one already there."""
+        key = _chunk_key(*chunk_position)
+        slot = self._slot(*chunk_position)
+        held = int(self.slot_keys[slot])
+        if held != EMPTY and held != key:
+            return _unpack_key(held)
+        self.slot_keys[slot] = key
+        self.slots[slot] = chunk
+        return None
+
+    def _grown(
+        self, a: tuple[int, int, int], b: tuple[int, int, int]
+    ) -> tuple[int, int, int]:
+        """The extent doubled along every axis two colliding positions differ on."""
+        width, height, depth = self.extent
+        return (
+            width * 2 if a[0] != b[0] else width,
+            height * 2 if a[1] != b[1] else height,
+            depth * 2 if a[2] != b[2] else depth,
+        )
+
+    def _reslot(self, extent: tuple[int, int, int]) -> None:
+        """Rebuilds the grid at a new extent, growing it further until nothing collides."""
+        while True:
+            self.extent = extent
+            capacity = extent[0] * extent[1] * extent[2]
+            self.slot_keys = np.full(capacity, EMPTY, dtype=np.int64)
+            self.slots = [None] * capacity
+            for chunk_position, chunk in self._chunks.items():
+                collision = self._place(chunk_position, chunk)
+                if collision is not None:
+                    extent = self._grown(chunk_position, collision)
+                    break
+            else:
+                return
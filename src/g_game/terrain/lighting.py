@@ -0,0 +1,273 @@
+from collections import deque
+from collections.abc import Mapping, Sequence
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from g_game.terrain.blocks import AIR, BLOCK_EMISSION
+
+if TYPE_CHECKING:
+    from g_game.terrain.chunk import Chunk
+
+# INFO: Light volumes
+# Every chunk keeps one byte of light per voxel, sky light in the high nibble and
+# block light (from emissive blocks) in the low one, both 0 to MAX_LIGHT.
+#   Sky light comes straight down from open sky at full strength, and loses one
+#   level for every other step, sideways or down past an overhang.
+#   Block light starts at the emission of its block and loses one level per step.
+# Light only spreads through air. Opaque voxels hold 0, except emissive ones,
+# which hold their own emission. Light is derived data, it isn't saved with the
+# chunk and is recomputed when a chunk is loaded.
+MAX_LIGHT = 15
+SKY_SHIFT = 4
+BLOCK_MASK = 0x0F
+
+# Light of a voxel under open sky with no lamps around
+FULL_SKY = MAX_LIGHT << SKY_SHIFT
+
+# Per block type lookup tables, indexable straight with a block array
+EMISSION = np.zeros(1 << 16, dtype=np.uint8)
+for _block, _level in BLOCK_EMISSION.items():
+    EMISSION[_block] = _level
+TRANSPARENT = np.zeros(1 << 16, dtype=bool)
+TRANSPARENT[AIR] = True
+
+# Channel index in the (2, ...) working arrays of compute_light
+SKY, BLOCK = 0, 1
+
+# The 6 face neighbours, with whether the step goes straight down
+_STEPS: tuple[tuple[int, int, int, bool], ...] = (
+    (1, 0, 0, False),
+    (-1, 0, 0, False),
+    (0, 1, 0, False),
+    (0, -1, 0, True),
+    (0, 0, 1, False),
+    (0, 0, -1, False),
+)
+
+
+def uniform_light(size: tuple[int, int, int], value: int) -> np.ndarray:
+    """A read only light volume with the same value everywhere, with no array behind it."""
+    return np.broadcast_to(np.array(value, dtype=np.uint8), size)
+
+
+def compute_light(
+    blocks: np.ndarray,
+    sky_open: np.ndarray | bool,
+    borders: Sequence[np.ndarray | None] | None = None,
+) -> np.ndarray:
+    """
+    Lights a whole chunk at once.
+
+    Sky light is seeded down every open column until the first opaque block, and
+    block light at every emissive block, both as array expressions. Both are then
+    flooded through the air together, one BFS layer per step: every voxel takes
+    the brightest of its neighbours minus one. This stops as soon as a step
+    changes nothing, which for plain terrain is right after the first.
+
+    Args:
+        blocks (np.ndarray): (sx, sy, sz) block types.
+        sky_open (np.ndarray | bool): (sx, sz) which columns get full sky light
+            from above the chunk's top layer, or one bool for all of them.
+        borders (Sequence, optional): The light layer each neighbouring chunk in
+            NEIGHBOUR_OFFSETS / FACES order touches this chunk with, None where
+            unknown. Light flows in from them but isn't written back.
+
+    Returns:
+        np.ndarray: (sx, sy, sz) uint8 light volume. Read only when uniform.
+    """
+    size = blocks.shape
+    transparent = TRANSPARENT[blocks]
+    incoming = borders is not None and any(b is not None for b in borders)
+
+    # 1. Uniform chunks with nothing flowing in, which is most of them
+    first = int(blocks.flat[0])
+    if not incoming and (blocks == first).all():
+        if first == AIR and np.all(sky_open):
+            return uniform_light(size, FULL_SKY)
+        if first != AIR:
+            return uniform_light(size, int(EMISSION[first]))
+
+    # 2. Seed sky light down open columns, and block light at emissive blocks
+    light = np.zeros((2, *size), dtype=np.int16)
+    exposed = np.logical_and.accumulate(transparent[:, ::-1, :], axis=1)[:, ::-1, :]
+    columns = np.broadcast_to(np.asarray(sky_open, dtype=bool), (size[0], size[2]))
+    exposed &= columns[:, None, :]
+    light[SKY][exposed] = MAX_LIGHT
+    light[BLOCK] = EMISSION[blocks]
+
+    # 3. The neighbours' light lives in a 1 voxel ring around the chunk
+    padded = np.zeros((2, size[0] + 2, size[1] + 2, size[2] + 2), dtype=np.int16)
+    inner = (slice(None), slice(1, -1), slice(1, -1), slice(1, -1))
+    if incoming and borders is not None:
+        for (dx, dy, dz, _), border in zip(_STEPS, borders):
+            if border is None:
+                continue
+            layer = list(inner)
+            axis, sign = (0, dx) if dx else (1, dy) if dy else (2, dz)
+            layer[axis + 1] = -1 if sign > 0 else 0
+            border = np.asarray(border, dtype=np.int16)
+            padded[tuple(layer)] = (border >> SKY_SHIFT, border & BLOCK_MASK)
+
+    # 4. Flood, each step moves the light front one voxel further
+    spread = np.empty_like(light)
+    for _ in range(MAX_LIGHT):
+        padded[inner] = light
+        np.maximum(padded[:, 2:, 1:-1, 1:-1], padded[:, :-2, 1:-1, 1:-1], out=spread)
+        np.maximum(spread, padded[:, 1:-1, 2:, 1:-1], out=spread)
+        np.maximum(spread, padded[:, 1:-1, :-2, 1:-1], out=spread)
+        np.maximum(spread, padded[:, 1:-1, 1:-1, 2:], out=spread)
+        np.maximum(spread, padded[:, 1:-1, 1:-1, :-2], out=spread)
+        spread -= 1
+        brighter = (spread > light) & transparent
+        if not brighter.any():
+            break
+        light[brighter] = spread[brighter]
+
+    return ((light[SKY] << SKY_SHIFT) | light[BLOCK]).astype(np.uint8)
+
+
+def relight(
+    chunks: Mapping[tuple[int, int, int], "Chunk"],
+    chunk_size: tuple[int, int, int],
+    position: tuple[int, int, int],
+    sky_height: int,
+) -> set[tuple[int, int, int]]:
+    """
+    Updates the light around one block that just changed, in both channels.
+
+    The light the old block lit or let through is taken away first: a BFS from
+    the block clears every voxel dimmer than the one it was reached from, since
+    that light may have come through here, and collects the brighter ones it runs
+    into, which are lit some other way. Those, the block's own emission and its
+    neighbours then spread light back in with a second BFS. Both only touch
+    voxels whose light actually changes, so a lamp relights at most the
+    MAX_LIGHT voxels around it.
+
+    Voxels in chunks that aren't loaded or have no light volume are skipped.
+
+    Args:
+        chunks (Mapping): Loaded chunks by chunk position, e.g. World.chunks.
+        chunk_size (tuple): Size of every chunk in blocks.
+        position (tuple): The (x, y, z) world position of the changed block.
+        sky_height (int): World y above which there is open sky.
+
+    Returns:
+        set: Positions of the chunks whose light changed, plus the neighbours of
+            changed voxels on a chunk border, whose faces show that light.
+    """
+    sx, sy, sz = chunk_size
+    volumes: dict[tuple[int, int, int], tuple[np.ndarray, np.ndarray] | None] = {}
+    touched: set[tuple[int, int, int]] = set()
+
+    def volume(x: int, y: int, z: int) -> tuple[np.ndarray, np.ndarray] | None:
+        """The (blocks, light) of the chunk holding a voxel, made writable once."""
+        key = (x // sx, y // sy, z // sz)
+        if key in volumes:
+            return volumes[key]
+        chunk = chunks.get(key)
+        if chunk is None or chunk.light is None:
+            found = None
+        else:
+            found = (chunk.blocks, chunk.writable_light())
+        volumes[key] = found
+        return found
+
+    def write(x: int, y: int, z: int, light: np.ndarray, value: int) -> None:
+        light[x % sx, y % sy, z % sz] = value
+        key = (x // sx, y // sy, z // sz)
+        touched.add(key)
+        # Faces of the neighbouring chunk show the light of border voxels
+        for axis, (local, edge) in enumerate(
+            ((x % sx, sx), (y % sy, sy), (z % sz, sz))
+        ):
+            if local == 0 or local == edge - 1:
+                neighbour = list(key)
+                neighbour[axis] += 1 if local else -1
+                touched.add((neighbour[0], neighbour[1], neighbour[2]))
+
+    x, y, z = position
+    origin = volume(x, y, z)
+    if origin is None:
+        return touched
+    blocks, _ = origin
+    block_type = int(blocks[x % sx, y % sy, z % sz])
+
+    for channel, shift in ((SKY, SKY_SHIFT), (BLOCK, 0)):
+        other = BLOCK_MASK << (SKY_SHIFT - shift)  # The nibble left alone
+
+        def level(light: np.ndarray, x: int, y: int, z: int) -> int:
+            return (int(light[x % sx, y % sy, z % sz]) >> shift) & BLOCK_MASK
+
+        def store(light: np.ndarray, x: int, y: int, z: int, value: int) -> None:
+            old = int(light[x % sx, y % sy, z % sz])
+            write(x, y, z, light, (old & other) | (value << shift))
+
+        # 1. Take away the light that may have depended on this block
+        _, light = origin
+        removal: deque[tuple[int, int, int, int]] = deque()
+        sources: list[tuple[int, int, int]] = []
+        old_level = level(light, x, y, z)
+        if old_level:
+            store(light, x, y, z, 0)
+            removal.append((x, y, z, old_level))
+
+        while removal:
+            rx, ry, rz, reached = removal.popleft()
+            for dx, dy, dz, down in _STEPS:
+                nx, ny, nz = rx + dx, ry + dy, rz + dz
+                found = volume(nx, ny, nz)
+                if found is None:
+                    continue
+                _, neighbour_light = found
+                neighbour = level(neighbour_light, nx, ny, nz)
+                if not neighbour:
+                    continue
+                # Direct sky light doesn't fade on the way down, so a full
+                # voxel below a full one was lit through it
+                fed = channel == SKY and down and reached == neighbour == MAX_LIGHT
+                if neighbour < reached or fed:
+                    store(neighbour_light, nx, ny, nz, 0)
+                    removal.append((nx, ny, nz, neighbour))
+                else:
+                    sources.append((nx, ny, nz))
+
+        # 2. Light the block gives off or lets in
+        if channel == BLOCK and EMISSION[block_type]:
+            store(light, x, y, z, int(EMISSION[block_type]))
+            sources.append((x, y, z))
+        if TRANSPARENT[block_type]:
+            if channel == SKY and y + 1 >= sky_height:
+                store(light, x, y, z, MAX_LIGHT)
+                sources.append((x, y, z))
+            for dx, dy, dz, _ in _STEPS:
+                nx, ny, nz = x + dx, y + dy, z + dz
+                found = volume(nx, ny, nz)
+                if found is not None and level(found[1], nx, ny, nz):
+                    sources.append((nx, ny, nz))
+
+        # 3. Spread it back out
+        spread = deque(sources)
+        while spread:
+            px, py, pz = spread.popleft()
+            found = volume(px, py, pz)
+            if found is None:
+                continue
+            current = level(found[1], px, py, pz)
+            for dx, dy, dz, down in _STEPS:
+                nx, ny, nz = px + dx, py + dy, pz + dz
+                found = volume(nx, ny, nz)
+                if found is None:
+                    continue
+                neighbour_blocks, neighbour_light = found
+                if not TRANSPARENT[neighbour_blocks[nx % sx, ny % sy, nz % sz]]:
+                    continue
+                if channel == SKY and down and current == MAX_LIGHT:
+                    reaching = MAX_LIGHT
+                else:
+                    reaching = current - 1
+                if level(neighbour_light, nx, ny, nz) < reaching:
+                    store(neighbour_light, nx, ny, nz, reaching)
+                    spread.append((nx, ny, nz))
+
+    return touched
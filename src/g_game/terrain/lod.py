@@ -0,0 +1,113 @@
+from collections.abc import Sequence
+
+import numpy as np
+
+from g_game.terrain.blocks import AIR
+
+# INFO: Levels of detail
+# Far chunks are meshed from a downsampled copy of their blocks, level n merging
+# 2**n x 2**n x 2**n blocks into one cell, so a 16 block chunk is 8, 4 or 2
+# cells a side at levels 1 to 3. The coarse mesh is scaled back up to chunk
+# units, and its textures still repeat once per block.
+#   A cell is solid when at least half of its blocks are, and takes the type of
+#   its highest solid block, so surfaces keep their grass instead of turning
+#   into the dirt or stone under them.
+#   Coarse meshes are built without neighbours, so they keep every face on the
+#   chunk border. Where two levels meet their surfaces don't line up, and these
+#   border walls fill the gaps that would otherwise open between them. Level 0
+#   meshes only hide border faces against level 0 neighbours, so the fine side
+#   of a seam keeps its walls too, whether it was streamed or edited. A level 0
+#   chunk is re-meshed against its neighbours once they have all loaded, and
+#   again when one of them changes level, see Game.reseam.
+LOD_FACTORS = (1, 2, 4, 8)
+
+# Distance in blocks from the camera to a chunk's center past which each level
+# from 1 on is used
+LOD_DISTANCES = (64.0, 128.0, 192.0)
+
+# A chunk only switches level once it is this many blocks past a threshold,
+# so a camera moving back and forth across one doesn't keep re-meshing it
+LOD_HYSTERESIS = 8.0
+
+
+def _cells(volume: np.ndarray, factor: int) -> np.ndarray:
+    """Views a (sx, sy, sz) volume as (cx, cy, cz, factor**3) cells, top layer first."""
+    sx, sy, sz = volume.shape
+    if sx % factor or sy % factor or sz % factor:
+        raise ValueError(f"Chunk size {volume.shape} isn't divisible by {factor}.")
+    cells = volume.reshape(
+        sx // factor, factor, sy // factor, factor, sz // factor, factor
+    ).transpose(0, 2, 4, 3, 1, 5)
+    return cells[:, :, :, ::-1].reshape(
+        sx // factor, sy // factor, sz // factor, factor**3
+    )
+
+
+def downsample_blocks(blocks: np.ndarray, level: int) -> np.ndarray:
+    """
+    Merges the blocks of a chunk into the cells of a level of detail.
+
+    Args:
+        blocks (np.ndarray): (sx, sy, sz) block types.
+        level (int): The level, an index into LOD_FACTORS.
+
+    Returns:
+        np.ndarray: (sx, sy, sz) // factor block types.
+    """
+    factor = LOD_FACTORS[level]
+    if factor == 1:
+        return blocks
+    cells = _cells(blocks, factor)
+    solid = cells != AIR
+
+    # The first solid block in top down order is the highest one
+    highest = np.take_along_axis(cells, solid.argmax(axis=-1)[..., None], axis=-1)
+    coarse = highest[..., 0]
+    coarse[np.count_nonzero(solid, axis=-1) * 2 < factor**3] = AIR
+    return coarse
+
+
+def downsample_light(light: np.ndarray, level: int) -> np.ndarray:
+    """
+    Merges a light volume into the cells of a level of detail, see lighting.py.
+
+    Each cell gets the brightest light among its blocks, so a cell that turned
+    to air isn't darkened by the blocks that were solid inside it.
+    """
+    factor = LOD_FACTORS[level]
+    if factor == 1:
+        return light
+    return _cells(np.asarray(light), factor).max(axis=-1)
+
+
+def lod_of(
+    distances: np.ndarray,
+    current: np.ndarray | None = None,
+    thresholds: Sequence[float] = LOD_DISTANCES,
+    hysteresis: float = LOD_HYSTERESIS,
+) -> np.ndarray:
+    """
+    Picks the level of detail of a batch of chunks from their distances.
+
+    Without current levels each chunk gets the level its distance falls in.
+    With them, a chunk only goes coarser once it is `hysteresis` past a
+    threshold, and finer once it is `hysteresis` back inside one.
+
+    Args:
+        distances (np.ndarray): (n,) distances from the camera to the chunks.
+        current (np.ndarray, optional): (n,) levels the chunks are at now.
+        thresholds (Sequence, optional): Distances at which levels 1 and up start.
+        hysteresis (float, optional): How far past a threshold a switch waits.
+
+    Returns:
+        np.ndarray: (n,) int levels, indices into LOD_FACTORS.
+    """
+    limits = np.asarray(thresholds, dtype=np.float64)
+    distances = np.asarray(distances, dtype=np.float64)[:, None]
+    if current is None:
+        return np.count_nonzero(distances > limits, axis=1)
+
+    # The lowest level a chunk may be at now and the highest
+    lowest = np.count_nonzero(distances > limits + hysteresis, axis=1)
+    highest = np.count_nonzero(distances > limits - hysteresis, axis=1)
+    return np.clip(current, lowest, highest)
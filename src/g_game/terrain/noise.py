@@ -0,0 +1,160 @@
+import numpy as np
+
+# 8 evenly spread 2D gradient directions
+# fmt: off
+_GRAD2 = np.array([
+    [1, 0], [-1, 0], [0, 1], [0, -1],
+    [0.7071, 0.7071], [-0.7071, 0.7071], [0.7071, -0.7071], [-0.7071, -0.7071],
+])
+
+# The 12 cube edge directions of improved perlin noise, padded to 16 for masking
+_GRAD3 = np.array([
+    [1, 1, 0], [-1, 1, 0], [1, -1, 0], [-1, -1, 0],
+    [1, 0, 1], [-1, 0, 1], [1, 0, -1], [-1, 0, -1],
+    [0, 1, 1], [0, -1, 1], [0, 1, -1], [0, -1, -1],
+    [1, 1, 0], [0, -1, 1], [-1, 1, 0], [0, -1, -1],
+])
+# fmt: on
+
+# Per component lookup tables, cheaper to gather from than the (16, 3) table
+_GRAD2_X, _GRAD2_Y = _GRAD2[:, 0].copy(), _GRAD2[:, 1].copy()
+_GRAD3_X, _GRAD3_Y, _GRAD3_Z = (_GRAD3[:, i].copy() for i in range(3))
+
+
+def _fade(t: np.ndarray) -> np.ndarray:
+    """Perlin's quintic smoothstep, 6t^5 - 15t^4 + 10t^3."""
+    return t * t * t * (t * (t * 6 - 15) + 10)
+
+
+def _lerp(t: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return a + t * (b - a)
+
+
+class PerlinNoise:
+    """
+    Seeded gradient noise evaluated on whole NumPy arrays at once.
+
+    Every method accepts coordinate arrays of any broadcastable shape and returns
+    an array of the broadcast shape, so a whole chunk (or a batch of chunks) is
+    one call instead of one call per voxel.
+    """
+
+    perm: np.ndarray
+
+    def __init__(self, seed: int) -> None:
+        permutation = np.random.default_rng(seed).permutation(256)
+        # Doubled so hashes like perm[perm[x] + y + 1] never need wrapping
+        self.perm = np.concatenate((permutation, permutation))
+
+    def noise2(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """2D perlin noise in roughly [-1, 1]."""
+        x0 = np.floor(x)
+        y0 = np.floor(y)
+        xi = x0.astype(np.int64) & 255
+        yi = y0.astype(np.int64) & 255
+        xf = x - x0
+        yf = y - y0
+
+        perm = self.perm
+        a = perm[xi]
+        b = perm[xi + 1]
+
+        def corner(h: np.ndarray, dx: np.ndarray, dy: np.ndarray) -> np.ndarray:
+            h = h & 7
+            return _GRAD2_X[h] * dx + _GRAD2_Y[h] * dy
+
+        u = _fade(xf)
+        bottom = _lerp(
+            u, corner(perm[a + yi], xf, yf), corner(perm[b + yi], xf - 1, yf)
+        )
+        top = _lerp(
+            u,
+            corner(perm[a + yi + 1], xf, yf - 1),
+            corner(perm[b + yi + 1], xf - 1, yf - 1),
+        )
+        return _lerp(_fade(yf), bottom, top)
+
+    def noise3(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+        """3D improved perlin noise in roughly [-1, 1]."""
+        x0, y0, z0 = np.floor(x), np.floor(y), np.floor(z)
+        xi = x0.astype(np.int64) & 255
+        yi = y0.astype(np.int64) & 255
+        zi = z0.astype(np.int64) & 255
+        xf, yf, zf = x - x0, y - y0, z - z0
+
+        perm = self.perm
+        a = perm[xi] + yi
+        b = perm[xi + 1] + yi
+        aa, ab = perm[a] + zi, perm[a + 1] + zi
+        ba, bb = perm[b] + zi, perm[b + 1] + zi
+
+        def corner(
+            h: np.ndarray, dx: np.ndarray, dy: np.ndarray, dz: np.ndarray
+        ) -> np.ndarray:
+            h = h & 15
+            return _GRAD3_X[h] * dx + _GRAD3_Y[h] * dy + _GRAD3_Z[h] * dz
+
+        u, v, w = _fade(xf), _fade(yf), _fade(zf)
+        near = _lerp(
+            v,
+            _lerp(u, corner(perm[aa], xf, yf, zf), corner(perm[ba], xf - 1, yf, zf)),
+            _lerp(
+                u,
+                corner(perm[ab], xf, yf - 1, zf),
+                corner(perm[bb], xf - 1, yf - 1, zf),
+            ),
+        )
+        far = _lerp(
+            v,
+            _lerp(
+                u,
+                corner(perm[aa + 1], xf, yf, zf - 1),
+                corner(perm[ba + 1], xf - 1, yf, zf - 1),
+            ),
+            _lerp(
+                u,
+                corner(perm[ab + 1], xf, yf - 1, zf - 1),
+                corner(perm[bb + 1], xf - 1, yf - 1, zf - 1),
+            ),
+        )
+        return _lerp(w, near, far)
+
+    def fractal2(
+        self,
+        x: np.ndarray,
+        y: np.ndarray,
+        octaves: int = 4,
+        lacunarity: float = 2.0,
+        persistence: float = 0.5,
+    ) -> np.ndarray:
+        """Sums octaves of 2D noise, normalized back into roughly [-1, 1]."""
+        total = np.zeros(np.broadcast_shapes(np.shape(x), np.shape(y)))
+        frequency, amplitude, amplitude_sum = 1.0, 1.0, 0.0
+        for _ in range(octaves):
+            total += amplitude * self.noise2(x * frequency, y * frequency)
+            amplitude_sum += amplitude
+            frequency *= lacunarity
+            amplitude *= persistence
+        return total / amplitude_sum
+
+    def fractal3(
+        self,
+        x: np.ndarray,
+        y: np.ndarray,
+        z: np.ndarray,
+        octaves: int = 3,
+        lacunarity: float = 2.0,
+        persistence: float = 0.5,
+    ) -> np.ndarray:
+        """Sums octaves of 3D noise, normalized back into roughly [-1, 1]."""
+        shape = np.broadcast_shapes(np.shape(x), np.shape(y), np.shape(z))
+        total = np.zeros(shape)
+        frequency, amplitude, amplitude_sum = 1.0, 1.0, 0.0
+        for _ in range(octaves):
+            total += amplitude * self.noise3(
+                x * frequency, y * frequency, z * frequency
+            )
+            amplitude_sum += amplitude
+            frequency *= lacunarity
+            amplitude *= persistence
+        return total / amplitude_sum
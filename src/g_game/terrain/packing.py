@@ -0,0 +1,115 @@
+import numpy as np
+
+from g_game.terrain.lighting import FULL_SKY
+
+# INFO: Packed chunk vertex layout
+# Every vertex is 2 uint32 words instead of 5 floats, 8 bytes instead of 20.
+#   word 0: x:5 | y:5 | z:5 | face:3 | u:5 | v:5 | ao:2 | unused:2  (bit 0 first)
+#   word 1: tile:8 | block light:4 | sky light:4 | slot:16
+# Positions are chunk-local and run 0..size inclusive, so chunks can be at most
+# 31 blocks on a side. Light is the byte from lighting.py.
+# The slot is left 0 by the mesher and filled in on upload. It indexes a table of
+# chunk positions the MeshArena keeps on the GPU, which lets many chunks share
+# one buffer and still be drawn without a model matrix, at 16 bits per vertex
+# instead of a whole chunk position.
+# src/shaders/packed.vert decodes the same layout, keep the two in sync.
+PACKED_WORDS = 2
+
+POSITION_BITS = 5
+FACE_SHIFT = 15
+U_SHIFT = 18
+V_SHIFT = 23
+AO_SHIFT = 28
+
+TILE_BITS = 8
+LIGHT_SHIFT = 8
+SLOT_SHIFT = 16
+SLOT_BITS = 16
+
+MAX_CHUNK_EDGE = (1 << POSITION_BITS) - 1
+MAX_TILE = (1 << TILE_BITS) - 1
+MAX_SLOTS = 1 << SLOT_BITS
+
+
+def pack_vertices(
+    positions: np.ndarray,
+    faces: np.ndarray,
+    uvs: np.ndarray,
+    tiles: np.ndarray,
+    ao: np.ndarray | None = None,
+    light: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Packs chunk-local vertex attributes into the 2 word format, in slot 0.
+
+    Args:
+        positions (np.ndarray): (N, 3) integer chunk-local positions, 0..31.
+        faces (np.ndarray): (N,) index into FACES of each vertex's quad.
+        uvs (np.ndarray): (N, 2) integer texture coordinates, 0..31.
+        tiles (np.ndarray): (N,) texture tile, the block type for now, 0..MAX_TILE.
+        ao (np.ndarray, optional): (N,) ambient occlusion level, 0 (none) to 3.
+        light (np.ndarray, optional): (N,) sky and block light byte, see lighting.py.
+            Full sky light when omitted.
+
+    Returns:
+        np.ndarray: (N, 2) uint32 packed vertices.
+
+    Raises:
+        ValueError: If a tile is above MAX_TILE, it would turn into another one.
+    """
+    if len(tiles) and tiles.max() > MAX_TILE:
+        raise ValueError(
+            f"Block type {int(tiles.max())} is above {MAX_TILE}, too high to pack."
+        )
+    positions = positions.astype(np.uint32)
+    uvs = uvs.astype(np.uint32)
+
+    packed = np.empty((len(positions), PACKED_WORDS), dtype=np.uint32)
+    word = packed[:, 0]
+    word[:] = positions[:, 0]
+    word |= positions[:, 1] << POSITION_BITS
+    word |= positions[:, 2] << 2 * POSITION_BITS
+    word |= faces.astype(np.uint32) << FACE_SHIFT
+    word |= uvs[:, 0] << U_SHIFT
+    word |= uvs[:, 1] << V_SHIFT
+    if ao is not None:
+        word |= ao.astype(np.uint32) << AO_SHIFT
+
+    word = packed[:, 1]
+    word[:] = tiles.astype(np.uint32)
+    light = light if light is not None else np.uint32(FULL_SKY)
+    word |= np.asarray(light, dtype=np.uint32) << LIGHT_SHIFT
+    return packed
+
+
+def unpack_vertices(packed: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Decodes packed vertices back into their attributes, the way the shader does.
+
+    Args:
+        packed (np.ndarray): Flat or (N, 2) uint32 packed vertices.
+
+    Returns:
+        dict: "position" (N, 3), "face", "uv" (N, 2), "ao", "tile", "sky",
+            "block_light" and "slot" arrays of ints.
+    """
+    words = packed.reshape(-1, PACKED_WORDS).astype(np.int64)
+    first, second = words[:, 0], words[:, 1]
+    mask = (1 << POSITION_BITS) - 1
+    return {
+        "position": np.stack(
+            (
+                first & mask,
+                (first >> POSITION_BITS) & mask,
+                (first >> 2 * POSITION_BITS) & mask,
+            ),
+            axis=1,
+        ),
+        "face": (first >> FACE_SHIFT) & 7,
+        "uv": np.stack(((first >> U_SHIFT) & mask, (first >> V_SHIFT) & mask), axis=1),
+        "ao": (first >> AO_SHIFT) & 3,
+        "tile": second & MAX_TILE,
+        "sky": (second >> (LIGHT_SHIFT + 4)) & 15,
+        "block_light": (second >> LIGHT_SHIFT) & 15,
+        "slot": second >> SLOT_SHIFT,
+    }
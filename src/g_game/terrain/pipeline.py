@@ -0,0 +1,450 @@
+from __future__ import annotations
+
+import heapq
+import multiprocessing
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import BrokenExecutor, Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from g_game.terrain.chunk import Chunk, touching_layers
+from g_game.terrain.generator import TerrainGenerator
+from g_game.terrain.lod import lod_of
+from g_utils import GLogger
+
+glog = GLogger(name="pipeline")
+
+# How strongly chunks in front of the camera are preferred over ones behind it.
+# A chunk straight ahead is scheduled as if it were (1 - VIEW_WEIGHT) times as far.
+VIEW_WEIGHT = 0.5
+
+# Camera movement (in blocks) or turn (cosine) before pending work is re-prioritized
+REPRIORITIZE_DISTANCE = 4.0
+REPRIORITIZE_COSINE = 0.95
+
+# Times a chunk's build or re-mesh may fail before it is given up on, until it
+# is wanted again
+MAX_ATTEMPTS = 3
+
+
+@dataclass
+class ChunkBuild:
+    """A generated chunk and its mesh, ready to be added to the world and uploaded."""
+
+    position: tuple[int, int, int]
+    chunk: Chunk
+    vertices: np.ndarray
+    indices: np.ndarray
+    lod: int = 0  # The level of detail the mesh was built at
+
+
+@dataclass
+class PipelineStats:
+    submitted: int = 0
+    completed: int = 0
+    cancelled: int = 0
+    discarded: int = 0
+    failed: int = 0  # Jobs that raised, see MAX_ATTEMPTS
+    restarts: int = 0  # Executors replaced after they broke
+
+
+# Per worker process cache, so each worker only builds its noise tables once
+_generators: dict[tuple[int, tuple[int, int, int]], TerrainGenerator] = {}
+
+
+def build_chunk(
+    seed: int,
+    chunk_size: tuple[int, int, int],
+    position: tuple[int, int, int],
+    packed: bool = False,
+    lod: int = 0,
+) -> ChunkBuild:
+    """
+    Generates and meshes a single chunk. Runs inside the worker processes.
+
+    Args:
+        seed (int): The terrain generator seed.
+        chunk_size (tuple): The dimensions of the chunk.
+        position (tuple): The (x, y, z) position of the chunk.
+        packed (bool, optional): Emit the packed vertex format. Defaults to False.
+        lod (int, optional): Level of detail to mesh at, see lod.py. Defaults to 0.
+
+    Returns:
+        ChunkBuild: The chunk with its greedy mesh and face connectivity.
+    """
+    generator = _generators.get((seed, chunk_size))
+    if generator is None:
+        generator = _generators[(seed, chunk_size)] = TerrainGenerator(seed, chunk_size)
+
+    chunk = generator.generate_chunk(position)
+    vertices, indices = chunk.greedy_mesh(packed=packed, lod=lod)
+    chunk.compute_connectivity()  # Here, off the main process, and sent back with it
+    return ChunkBuild(position, chunk, vertices, indices, lod)
+
+
+def remesh_chunk(
+    chunk: Chunk,
+    packed: bool = False,
+    lod: int = 0,
+    neighbours: Sequence[Chunk | None] | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Meshes an already generated chunk again. Runs inside the worker processes.
+
+    Args:
+        chunk (Chunk): The chunk to mesh.
+        packed (bool, optional): Emit the packed vertex format. Defaults to False.
+        lod (int, optional): Level of detail to mesh at, see lod.py. Defaults to 0.
+        neighbours (Sequence, optional): The layers of the neighbours touching the
+            chunk, see touching_layers. Border faces they hide are skipped.
+
+    Returns:
+        tuple[np.array, np.array]: A tuple containing the vertex data and the index data.
+    """
+    return chunk.greedy_mesh(neighbours, packed, lod)
+
+
+def create_process_pool(workers: int | None = None) -> ProcessPoolExecutor:
+    """
+    Creates a worker pool for the pipeline.
+
+    Workers are spawned rather than forked so they never inherit the window or
+    GL context of the main process.
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+@dataclass(order=True)
+class _Pending:
+    priority: float
+    position: tuple[int, int, int] = field(compare=False)
+    lod: int = field(default=0, compare=False)
+
+
+class ChunkPipeline:
+    """
+    Schedules chunk generation and meshing on a background executor.
+
+    Wanted chunks wait in a priority queue ordered by distance to the camera, with
+    chunks in the view direction first. Only a few jobs are handed to the executor
+    at a time so the queue order stays meaningful, and work for chunks that are no
+    longer wanted is cancelled, or discarded if it already started.
+
+    Far chunks are meshed at the level of detail their distance calls for when
+    they're queued, given `lod_distances`. Loaded chunks can be re-meshed at
+    another level with remesh(), those jobs skip the queue.
+
+    Nothing here touches the window or GL, so any Executor works, including a
+    thread pool or a synchronous one for tests.
+
+    A job that raises is logged and queued again, up to MAX_ATTEMPTS times. An
+    executor that breaks, like a process pool whose worker died, is replaced
+    from `executor_factory` and everything it held is submitted again.
+    """
+
+    executor: Executor
+    seed: int
+    chunk_size: tuple[int, int, int]
+    max_in_flight: int
+    packed: bool
+    lod_distances: Sequence[float]
+    executor_factory: Callable[[], Executor] | None
+    stats: PipelineStats
+
+    wanted: set[tuple[int, int, int]]
+    in_flight: dict[tuple[int, int, int], Future[ChunkBuild]]
+    remeshing: dict[
+        tuple[int, int, int],
+        tuple[
+            Chunk,
+            int,
+            list[Chunk | None] | None,
+            Future[tuple[np.ndarray, np.ndarray]],
+        ],
+    ]
+    _queue: list[_Pending]
+    _failures: dict[tuple[int, int, int], int]  # Failed attempts per chunk
+    _broken: bool
+    _eye: np.ndarray
+    _front: np.ndarray
+    _prioritized_eye: np.ndarray | None
+    _prioritized_front: np.ndarray | None
+
+    def __init__(
+        self,
+        executor: Executor,
+        seed: int,
+        chunk_size: tuple[int, int, int] = (16, 16, 16),
+        max_in_flight: int = 8,
+        packed: bool = False,
+        lod_distances: Sequence[float] = (),
+        executor_factory: Callable[[], Executor] | None = None,
+    ) -> None:
+        """
+        Args:
+            executor (Executor): Runs build_chunk jobs, usually from create_process_pool.
+            seed (int): The terrain generator seed.
+            chunk_size (tuple, optional): The dimensions of generated chunks. Defaults to (16, 16, 16).
+            max_in_flight (int, optional): Jobs handed to the executor at once. Defaults to 8.
+            packed (bool, optional): Mesh into the packed vertex format. Defaults to False.
+            lod_distances (Sequence, optional): Distances in blocks at which levels of
+                detail from 1 on start, see lod.py. Defaults to none, full detail.
+            executor_factory (Callable, optional): Makes a replacement when the
+                executor breaks. Without it a broken pipeline stops building.
+        """
+        self.executor = executor
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.max_in_flight = max_in_flight
+        self.packed = packed
+        self.lod_distances = lod_distances
+        self.executor_factory = executor_factory
+        self.stats = PipelineStats()
+
+        self.wanted = set()
+        self.in_flight = {}
+        self.remeshing = {}
+        self._queue = []
+        self._failures = {}
+        self._broken = False
+        self._eye = np.zeros(3)
+        self._front = np.array([0.0, 0.0, 1.0])
+        self._prioritized_eye = None
+        self._prioritized_front = None
+
+    @property
+    def pending(self) -> int:
+        """Number of wanted chunks that have not been handed to the executor yet."""
+        return len(self._queue)
+
+    def set_wanted(self, positions: Iterable[tuple[int, int, int]]) -> None:
+        """
+        Replaces the set of chunks that should be built.
+
+        Queued chunks that are no longer wanted are dropped and their in flight
+        jobs cancelled. Chunks that are already built should not be passed in.
+
+        Args:
+            positions (Iterable): The (x, y, z) positions of the wanted chunks.
+        """
+        self.wanted = set(positions)
+
+        for position, future in list(self.in_flight.items()):
+            if position not in self.wanted and future.cancel():
+                del self.in_flight[position]
+                self.stats.cancelled += 1
+
+        self._prioritized_eye = None  # Force a rebuild of the queue
+
+    def set_view(self, eye: np.ndarray, front: np.ndarray) -> None:
+        """
+        Updates the camera used to prioritize queued chunks.
+
+        The queue is only re-sorted once the camera has moved or turned far enough
+        to matter, so this is cheap to call every frame.
+        """
+        self._eye = np.asarray(eye, dtype=np.float64)
+        self._front = np.asarray(front, dtype=np.float64)
+
+    def _needs_reprioritize(self) -> bool:
+        if self._prioritized_eye is None or self._prioritized_front is None:
+            return True
+        moved = np.linalg.norm(self._eye - self._prioritized_eye)
+        turned = float(np.dot(self._front, self._prioritized_front))
+        return moved > REPRIORITIZE_DISTANCE or turned < REPRIORITIZE_COSINE
+
+    def _reprioritize(self) -> None:
+        """Rebuilds the priority queue from the wanted chunks that aren't in flight."""
+        positions = [p for p in self.wanted if p not in self.in_flight]
+        self._prioritized_eye = self._eye.copy()
+        self._prioritized_front = self._front.copy()
+        if not positions:
+            self._queue = []
+            return
+
+        centers = (np.array(positions) + 0.5) * self.chunk_size
+        offsets = centers - self._eye
+        distances = np.linalg.norm(offsets, axis=1)
+        cosines = offsets @ self._front / np.maximum(distances, 1e-6)
+        priorities = distances * (1.0 - VIEW_WEIGHT * cosines)
+        lods = lod_of(distances, thresholds=self.lod_distances)
+
+        self._queue = [
+            _Pending(float(priority), position, lod)
+            for priority, position, lod in zip(priorities, positions, lods.tolist())
+        ]
+        heapq.heapify(self._queue)
+
+    def poll(self) -> list[ChunkBuild]:
+        """
+        Collects finished builds and hands more queued chunks to the executor.
+
+        Returns:
+            list[ChunkBuild]: Builds for chunks that are still wanted.
+        """
+        finished: list[ChunkBuild] = []
+        for position, future in list(self.in_flight.items()):
+            # Skips jobs dropped since, by a restart after a broken executor
+            if not future.done() or self.in_flight.get(position) is not future:
+                continue
+            del self.in_flight[position]
+
+            if position not in self.wanted:
+                self.stats.discarded += 1
+                continue
+
+            build = self._result(position, future)
+            if build is None:
+                continue
+            self.wanted.discard(position)
+            self._failures.pop(position, None)
+            self.stats.completed += 1
+            finished.append(build)
+
+        if self._needs_reprioritize():
+            self._reprioritize()
+
+        while (
+            self._queue
+            and not self._broken
+            and len(self.in_flight) + len(self.remeshing) < self.max_in_flight
+        ):
+            pending = heapq.heappop(self._queue)
+            position = pending.position
+            if position not in self.wanted or position in self.in_flight:
+                continue
+            self.in_flight[position] = self.executor.submit(
+                build_chunk,
+                self.seed,
+                self.chunk_size,
+                position,
+                self.packed,
+                pending.lod,
+            )
+            self.stats.submitted += 1
+
+        return finished
+
+    def _result(
+        self, position: tuple[int, int, int], future: Future[ChunkBuild]
+    ) -> ChunkBuild | None:
+        """The build of a finished job, or None after handling its failure."""
+        try:
+            if not future.cancelled():
+                return future.result()
+        except BrokenExecutor as error:
+            self._restart(error)
+        except Exception as error:
+            self._failed(position, "Building", error)
+        self._prioritized_eye = None  # Queue it again if it's still wanted
+        return None
+
+    def _failed(
+        self, position: tuple[int, int, int], job: str, error: Exception
+    ) -> bool:
+        """Counts a failed job, returning whether it may be tried again."""
+        self.stats.failed += 1
+        attempts = self._failures[position] = self._failures.get(position, 0) + 1
+        if attempts < MAX_ATTEMPTS:
+            glog.e(f"{job} chunk {position} failed, trying again: {error!r}")
+            return True
+        glog.e(f"{job} chunk {position} failed {attempts} times, giving up: {error!r}")
+        self.wanted.discard(position)
+        del self._failures[position]
+        return False
+
+    def _restart(self, error: Exception) -> None:
+        """Replaces a broken executor and resubmits everything that was on it."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.in_flight.clear()  # Queued again by the next reprioritize
+        self._prioritized_eye = None
+        if self.executor_factory is None:
+            glog.e(f"Chunk executor broke, no more chunks will be built: {error!r}")
+            self.remeshing.clear()
+            self._broken = True
+            return
+
+        glog.e(f"Chunk executor broke, starting a new one: {error!r}")
+        self.executor = self.executor_factory()
+        self.stats.restarts += 1
+        for position, (chunk, lod, layers, _) in list(self.remeshing.items()):
+            self._submit_remesh(position, chunk, lod, layers)
+
+    def remesh(
+        self,
+        position: tuple[int, int, int],
+        chunk: Chunk,
+        lod: int,
+        neighbours: Sequence[Chunk | None] | None = None,
+    ) -> None:
+        """
+        Re-meshes a loaded chunk at a level of detail, replacing any earlier request.
+
+        The chunk is copied to the worker as it is now, so cancel_remesh() it when
+        its blocks change before the result is collected. Of the neighbours only
+        the layers touching the chunk are sent along.
+
+        Args:
+            position (tuple): The (x, y, z) position of the chunk.
+            chunk (Chunk): The chunk to mesh.
+            lod (int): Level of detail to mesh at, see lod.py.
+            neighbours (Sequence, optional): The adjacent chunk for every entry in
+                FACES to hide border faces against, None where faces are kept.
+        """
+        layers = touching_layers(neighbours) if neighbours else None
+        self._submit_remesh(position, chunk, lod, layers)
+
+    def _submit_remesh(
+        self,
+        position: tuple[int, int, int],
+        chunk: Chunk,
+        lod: int,
+        layers: list[Chunk | None] | None,
+    ) -> None:
+        self.cancel_remesh(position)
+        if self._broken:
+            return
+        future = self.executor.submit(remesh_chunk, chunk, self.packed, lod, layers)
+        self.remeshing[position] = (chunk, lod, layers, future)
+
+    def cancel_remesh(self, position: tuple[int, int, int]) -> None:
+        """Forgets a chunk's outstanding re-mesh, if it has one."""
+        job = self.remeshing.pop(position, None)
+        if job is not None:
+            job[3].cancel()
+
+    def poll_remeshed(self) -> list[ChunkBuild]:
+        """
+        Collects finished re-meshes.
+
+        Returns:
+            list[ChunkBuild]: Builds holding the chunk passed to remesh() and its new mesh.
+        """
+        finished: list[ChunkBuild] = []
+        for position, (chunk, lod, layers, future) in list(self.remeshing.items()):
+            if not future.done():
+                continue
+            del self.remeshing[position]
+            try:
+                vertices, indices = future.result()
+            except BrokenExecutor as error:
+                self._restart(error)
+                break  # Everything left was resubmitted
+            except Exception as error:
+                if self._failed(position, "Re-meshing", error):
+                    self._submit_remesh(position, chunk, lod, layers)
+                continue
+            self._failures.pop(position, None)
+            finished.append(ChunkBuild(position, chunk, vertices, indices, lod))
+        return finished
+
+    def shutdown(self) -> None:
+        """Cancels everything outstanding and stops the executor once running jobs finish."""
+        self.wanted.clear()
+        self._queue.clear()
+        for position in list(self.remeshing):
+            self.cancel_remesh(position)
+        self.executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,358 @@
+import math
+from collections.abc import Mapping
+from dataclasses import dataclass
+
+import numpy as np
+
+from g_game.terrain.blocks import AIR
+from g_game.terrain.chunk import Chunk
+from g_game.terrain.grid import ChunkGrid
+
+# INFO: Voxel traversal
+# Both raycasts walk the grid with Amanatides & Woo's DDA: every step moves into
+# whichever neighbouring voxel the ray reaches first, so each voxel the ray
+# passes through is visited exactly once, in order. Chunks that aren't loaded
+# are treated as air. A ray starting inside a solid block hits it at distance 0,
+# with a zero normal. Since unloaded chunks never stop a ray, the distance has
+# to be finite.
+
+
+@dataclass
+class RayHit:
+    """The first solid block a ray ran into."""
+
+    block: tuple[int, int, int]  # World block position
+    block_type: int
+    normal: tuple[int, int, int]  # Of the face that was hit, pointing back at the ray
+    distance: float  # Along the ray, in blocks if the direction is unit length
+
+
+@dataclass
+class RayHits:
+    """The results of a batch of rays, one row per ray."""
+
+    hit: np.ndarray  # (n,) bool
+    block: np.ndarray  # (n, 3) int64 world block positions
+    block_type: np.ndarray  # (n,) int64, AIR for misses
+    normal: np.ndarray  # (n, 3) int64
+    distance: np.ndarray  # (n,) float64, inf for misses
+
+    def __len__(self) -> int:
+        return len(self.hit)
+
+    def __getitem__(self, ray: int) -> RayHit | None:
+        if not self.hit[ray]:
+            return None
+        bx, by, bz = self.block[ray].tolist()
+        nx, ny, nz = self.normal[ray].tolist()
+        return RayHit(
+            (bx, by, bz),
+            int(self.block_type[ray]),
+            (nx, ny, nz),
+            float(self.distance[ray]),
+        )
+
+
+def _axis_setup(origin: float, direction: float) -> tuple[int, int, float, float]:
+    """Start voxel, step, and the distances to the first and between voxel borders."""
+    voxel = math.floor(origin)
+    if direction > 0:
+        return voxel, 1, (voxel + 1 - origin) / direction, 1 / direction
+    if direction < 0:
+        return voxel, -1, (voxel - origin) / direction, -1 / direction
+    return voxel, 0, math.inf, math.inf
+
+
+def _unloaded(_x: int, _y: int, _z: int) -> int:
+    return AIR
+
+
+def raycast(
+    chunks: Mapping[tuple[int, int, int], Chunk],
+    chunk_size: tuple[int, int, int],
+    origin: np.ndarray | tuple[float, float, float],
+    direction: np.ndarray | tuple[float, float, float],
+    max_distance: float,
+) -> RayHit | None:
+    """
+    Finds the first solid block along a ray.
+
+    The walk keeps chunk-local coordinates and only looks a chunk up when it
+    crosses into the next one, so each voxel costs a few float compares and one
+    block read.
+
+    Args:
+        chunks (Mapping): Loaded chunks by chunk position, e.g. World.chunks.
+        chunk_size (tuple): Size of every chunk in blocks.
+        origin (np.ndarray | tuple): Where the ray starts, in world space.
+        direction (np.ndarray | tuple): Which way it goes, need not be unit length.
+        max_distance (float): How far to look, in multiples of `direction`.
+
+    Returns:
+        RayHit | None: The hit, or None if the ray ran out of distance first.
+
+    Raises:
+        ValueError: If `max_distance` isn't finite.
+    """
+    if not math.isfinite(max_distance):
+        raise ValueError(f"Ray distance must be finite, got {max_distance}.")
+
+    # 1. Per axis step and border distances, on Python floats for speed
+    x, step_x, t_max_x, t_delta_x = _axis_setup(float(origin[0]), float(direction[0]))
+    y, step_y, t_max_y, t_delta_y = _axis_setup(float(origin[1]), float(direction[1]))
+    z, step_z, t_max_z, t_delta_z = _axis_setup(float(origin[2]), float(direction[2]))
+    if not (step_x or step_y or step_z):
+        return None
+
+    # 2. Split the start voxel into a chunk and a position inside it
+    sx, sy, sz = chunk_size
+    (cx, lx), (cy, ly), (cz, lz) = divmod(x, sx), divmod(y, sy), divmod(z, sz)
+    distance, normal = 0.0, (0, 0, 0)
+
+    while True:
+        # 3. Entered a new chunk, look it up once for all of its voxels
+        chunk = chunks.get((cx, cy, cz))
+        if chunk is None:
+            uniform, get = AIR, _unloaded
+        else:
+            uniform, get = chunk.uniform_block, chunk.storage.get
+
+        while 0 <= lx < sx and 0 <= ly < sy and 0 <= lz < sz:
+            block_type = uniform if uniform is not None else get(lx, ly, lz)
+            if block_type != AIR:
+                return RayHit(
+                    (cx * sx + lx, cy * sy + ly, cz * sz + lz),
+                    int(block_type),
+                    normal,
+                    distance,
+                )
+
+            # 4. Step into whichever neighbour the ray reaches first, ties going
+            # to the lowest axis like argmin in raycast_many()
+            if t_max_x <= t_max_y and t_max_x <= t_max_z:
+                distance, t_max_x = t_max_x, t_max_x + t_delta_x
+                lx += step_x
+                normal = (-step_x, 0, 0)
+            elif t_max_y <= t_max_z:
+                distance, t_max_y = t_max_y, t_max_y + t_delta_y
+                ly += step_y
+                normal = (0, -step_y, 0)
+            else:
+                distance, t_max_z = t_max_z, t_max_z + t_delta_z
+                lz += step_z
+                normal = (0, 0, -step_z)
+            if distance > max_distance:
+                return None
+
+        # 5. Left the chunk, wrap into its neighbour
+        if not 0 <= lx < sx:
+            cx, lx = cx + step_x, lx - step_x * sx
+        elif not 0 <= ly < sy:
+            cy, ly = cy + step_y, ly - step_y * sy
+        else:
+            cz, lz = cz + step_z, lz - step_z * sz
+
+
+class ChunkStack:
+    """
+    Dense copies of the chunks rays pass through, stacked in one array.
+
+    Slot 0 is all air and stands in for unloaded chunks, so the block under every
+    ray can be gathered with a single fancy index per step. Chunks are found
+    through the grid slots of a ChunkGrid and copied in the first time a ray
+    enters them. The copies outlive a batch, World keeps one stack for all of its
+    raycast_many() calls and invalidates the chunks it edits, adds or removes, so
+    only those are copied again.
+    """
+
+    chunks: ChunkGrid
+    blocks: np.ndarray  # (slots, *chunk_size) uint16
+    used: int  # Slots handed out so far, freed ones are reused first
+    free: list[int]
+    stack_slots: np.ndarray  # Stack slot of each grid slot, -1 until copied
+
+    def __init__(self, chunks: ChunkGrid, chunk_size: tuple[int, int, int]) -> None:
+        self.chunks = chunks
+        self.blocks = np.zeros((8, *chunk_size), dtype=np.uint16)
+        self.used = 1
+        self.free = []
+        self.stack_slots = np.full(chunks.capacity, -1, dtype=np.int64)
+
+    def invalidate(self, chunk_position: tuple[int, int, int]) -> None:
+        """Drops the copy of a chunk whose blocks changed, or that was added or removed."""
+        if len(self.stack_slots) != self.chunks.capacity:
+            return  # The grid grew, slots_of() drops every copy anyway
+        grid_slot = self.chunks.slot_of(chunk_position)
+        slot = int(self.stack_slots[grid_slot])
+        if slot > 0:
+            self.free.append(slot)
+        self.stack_slots[grid_slot] = -1
+
+    def slots_of(self, chunk_positions: np.ndarray) -> np.ndarray:
+        """Maps (n, 3) chunk positions to stack slots, copying in new chunks."""
+        if len(self.stack_slots) != self.chunks.capacity:
+            # Every chunk moved to another grid slot, start over
+            self.stack_slots = np.full(self.chunks.capacity, -1, dtype=np.int64)
+            self.used = 1
+            self.free.clear()
+        grid_slots = self.chunks.lookup(chunk_positions)
+        loaded = grid_slots >= 0
+        found = self.stack_slots[grid_slots[loaded]]
+        if (found < 0).any():
+            for slot in np.unique(grid_slots[loaded][found < 0]).tolist():
+                self.stack_slots[slot] = self._add(self.chunks.chunk_at(slot))
+            found = self.stack_slots[grid_slots[loaded]]
+        slots = np.zeros(len(grid_slots), dtype=np.int64)
+        slots[loaded] = found
+        return slots
+
+    def _add(self, chunk: Chunk) -> int:
+        if chunk.is_empty:
+            return 0
+        if self.free:
+            slot = self.free.pop()
+        else:
+            if self.used == len(self.blocks):
+                grown = np.zeros((self.used * 2, *self.blocks.shape[1:]), np.uint16)
+                grown[: self.used] = self.blocks
+                self.blocks = grown
+            slot = self.used
+            self.used += 1
+        self.blocks[slot] = chunk.blocks
+        return slot
+
+
+def raycast_many(
+    chunks: Mapping[tuple[int, int, int], Chunk],
+    chunk_size: tuple[int, int, int],
+    origins: np.ndarray,
+    directions: np.ndarray,
+    max_distance: float | np.ndarray,
+    stack: ChunkStack | None = None,
+) -> RayHits:
+    """
+    Traces a batch of rays at once, for picking, line of sight or AI queries.
+
+    Every ray takes one DDA step per iteration, all in NumPy, so the Python work
+    per iteration is the same however many rays there are. Like raycast(), rays
+    keep chunk-local coordinates and a flat index into the stack, and only the
+    rays that crossed into another chunk look it up. Iterations stop once every
+    ray has hit or run out of distance.
+
+    Args:
+        chunks (Mapping): Loaded chunks by chunk position, e.g. World.chunks.
+            Any other Mapping than a ChunkGrid is copied into one first.
+        chunk_size (tuple): Size of every chunk in blocks.
+        origins (np.ndarray): (n, 3) ray starts, in world space.
+        directions (np.ndarray): (n, 3) ray directions, need not be unit length.
+        max_distance (float | np.ndarray): How far each ray looks, in multiples of
+            its direction, one for all or (n,).
+        stack (ChunkStack, optional): Chunk copies kept from earlier batches over
+            the same ChunkGrid. Defaults to a new one for this batch.
+
+    Returns:
+        RayHits: A hit or miss for every ray, in input order.
+
+    Raises:
+        ValueError: If any `max_distance` isn't finite.
+    """
+    origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+    directions = np.asarray(directions, dtype=np.float64).reshape(-1, 3)
+    count = len(origins)
+    limit = np.broadcast_to(np.asarray(max_distance, dtype=np.float64), (count,))
+    if not np.isfinite(limit).all():
+        raise ValueError("Ray distances must be finite.")
+    size = np.array(chunk_size, dtype=np.int64)
+    strides = np.array((size[1] * size[2], size[2], 1), dtype=np.int64)
+    volume = int(size.prod())
+
+    # 1. Per axis step and border distances, as in _axis_setup
+    voxel = np.floor(origins).astype(np.int64)
+    step = np.sign(directions).astype(np.int64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_delta = np.where(step != 0, np.abs(1 / directions), np.inf)
+        t_max = np.where(step != 0, (voxel + (step > 0) - origins) / directions, np.inf)
+
+    hits = RayHits(
+        hit=np.zeros(count, dtype=bool),
+        block=np.zeros((count, 3), dtype=np.int64),
+        block_type=np.zeros(count, dtype=np.int64),
+        normal=np.zeros((count, 3), dtype=np.int64),
+        distance=np.full(count, np.inf),
+    )
+    if stack is None:
+        grid = chunks if isinstance(chunks, ChunkGrid) else ChunkGrid(chunks)
+        stack = ChunkStack(grid, chunk_size)
+
+    # 2. State of the rays still going. `ray` maps rows back to input order,
+    # `chunk_origin` is the first block of each ray's chunk, `cell` its block in the
+    # flattened stack, and `axis` the axis of its last step, -1 before the first
+    ray = np.flatnonzero(step.any(axis=1))
+    voxel, step, t_max, t_delta = voxel[ray], step[ray], t_max[ray], t_delta[ray]
+    limit = limit[ray]
+    chunk_positions, local = np.divmod(voxel, size)
+    chunk_origin = chunk_positions * size
+    cell = stack.slots_of(chunk_positions) * volume + local @ strides
+    distance = np.zeros(len(ray))
+    axis = np.full(len(ray), -1)
+    going = np.ones(len(ray), dtype=bool)
+    rows = np.arange(len(ray))
+
+    while len(ray):
+        # 3. Gather the block under every ray
+        block_types = stack.blocks.reshape(-1)[cell]
+
+        solid = (block_types != AIR) & going
+        if solid.any():
+            done = ray[solid]
+            hits.hit[done] = True
+            hits.block[done] = chunk_origin[solid] + local[solid]
+            hits.block_type[done] = block_types[solid]
+            hits.distance[done] = distance[solid]
+            stepped = np.flatnonzero(solid & (axis >= 0))
+            hits.normal[ray[stepped], axis[stepped]] = -step[stepped, axis[stepped]]
+
+        # 4. Step every ray along its nearest border, ties going to the lowest
+        # axis, through the flattened arrays
+        rows = rows[: len(ray)]
+        t_x, t_y, t_z = t_max[:, 0], t_max[:, 1], t_max[:, 2]
+        axis = np.where(t_x <= np.minimum(t_y, t_z), 0, np.where(t_y <= t_z, 1, 2))
+        flat = rows * 3 + axis
+        distance = t_max.reshape(-1)[flat]
+        t_max.reshape(-1)[flat] = distance + t_delta.reshape(-1)[flat]
+        moves = step.reshape(-1)[flat]
+        moved = local.reshape(-1)[flat] + moves
+        local.reshape(-1)[flat] = moved
+        cell += moves * strides[axis]
+
+        # 5. Rays that left their chunk look up the one they entered
+        crossed = np.flatnonzero((moved < 0) | (moved >= size[axis]))
+        if len(crossed):
+            chunk_positions, local[crossed] = np.divmod(
+                chunk_origin[crossed] + local[crossed], size
+            )
+            chunk_origin[crossed] = chunk_positions * size
+            cell[crossed] = (
+                stack.slots_of(chunk_positions) * volume + local[crossed] @ strides
+            )
+
+        # 6. Rays that hit or ran out of distance stop counting. They're only
+        # dropped once a quarter of the rows are stopped, each compaction costs
+        # about as much as a step
+        going &= ~solid & (distance <= limit)
+        remaining = np.count_nonzero(going)
+        if remaining * 4 <= len(ray) * 3:
+            keep = np.flatnonzero(going)
+            ray, chunk_origin, local, cell, step, limit = (
+                ray[keep],
+                np.take(chunk_origin, keep, axis=0),
+                np.take(local, keep, axis=0),
+                cell[keep],
+                np.take(step, keep, axis=0),
+                limit[keep],
+            )
+            t_max = np.take(t_max, keep, axis=0)
+            t_delta = np.take(t_delta, keep, axis=0)
+            distance, axis, going = distance[keep], axis[keep], going[keep]
+
+    return hits
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import zlib
+from typing import BinaryIO, Literal
+
+import numpy as np
+
+from g_game.terrain.chunk import Chunk
+from g_game.terrain.storage import MAX_DENSE_BLOCK
+
+# INFO: Region file layout
+# A region groups REGION_SHAPE chunks (32x32 columns, 8 chunks tall) into one file.
+#
+#   [preamble][offset table][padding to SECTOR_SIZE][chunk sectors...]
+#
+# The offset table has one (sector offset, byte length) entry per chunk slot, zero
+# for chunks that were never saved. Every chunk is zlib compressed on its own and
+# starts on a sector boundary, so reading one chunk only touches its own pages.
+REGION_SHAPE: tuple[int, int, int] = (32, 8, 32)
+SECTOR_SIZE = 4096
+
+REGION_MAGIC = b"GRGN"
+REGION_VERSION = 1
+_PREAMBLE = struct.Struct("<4sI8x")
+_TABLE_DTYPE = np.dtype([("offset", "<u4"), ("length", "<u4")])
+
+_SLOT_COUNT = REGION_SHAPE[0] * REGION_SHAPE[1] * REGION_SHAPE[2]
+_HEADER_SECTORS = -(
+    -(_PREAMBLE.size + _SLOT_COUNT * _TABLE_DTYPE.itemsize) // SECTOR_SIZE
+)
+
+# Fast compression, chunk data is very repetitive so higher levels gain little
+COMPRESSION_LEVEL = 1
+
+# Chunk payload header: (uniform flag, bytes per block, sx, sy, sz, uniform block)
+_CHUNK_HEADER = struct.Struct("<BBHHHH")
+
+
+def region_of(
+    chunk_position: tuple[int, int, int],
+) -> tuple[tuple[int, int, int], int]:
+    """
+    Splits a chunk position into its region position and slot within the region.
+
+    Args:
+        chunk_position (tuple): The (x, y, z) position of the chunk.
+
+    Returns:
+        tuple: The (x, y, z) region position and the slot index inside that region.
+    """
+    region = tuple(c // s for c, s in zip(chunk_position, REGION_SHAPE))
+    lx, ly, lz = (c % s for c, s in zip(chunk_position, REGION_SHAPE))
+    slot = (lx * REGION_SHAPE[1] + ly) * REGION_SHAPE[2] + lz
+    return (region[0], region[1], region[2]), slot
+
+
+def encode_chunk(chunk: Chunk) -> bytes:
+    """Serializes and compresses the blocks of a chunk."""
+    sx, sy, sz = chunk.size
+    block = chunk.uniform_block
+    if block is not None:
+        return zlib.compress(
+            _CHUNK_HEADER.pack(1, 0, sx, sy, sz, block), COMPRESSION_LEVEL
+        )
+
+    blocks = chunk.blocks
+    header = _CHUNK_HEADER.pack(0, blocks.itemsize, sx, sy, sz, 0)
+    data = header + blocks.astype(f"<u{blocks.itemsize}").tobytes()
+    return zlib.compress(data, COMPRESSION_LEVEL)
+
+
+def decode_chunk(data: bytes, storage: Literal["dense", "palette"] = "dense") -> Chunk:
+    """
+    Decompresses and deserializes a chunk written by encode_chunk.
+
+    Chunks holding block IDs above MAX_DENSE_BLOCK always come back with palette
+    storage, since dense storage can't hold them.
+    """
+    payload = zlib.decompress(data)
+    uniform, itemsize, sx, sy, sz, block = _CHUNK_HEADER.unpack_from(payload)
+
+    if uniform:
+        if block > MAX_DENSE_BLOCK:
+            storage = "palette"
+        return Chunk((sx, sy, sz), storage=storage, fill=block)
+
+    blocks = np.frombuffer(
+        payload, dtype=f"<u{itemsize}", offset=_CHUNK_HEADER.size
+    ).reshape(sx, sy, sz)
+    if blocks.max() > MAX_DENSE_BLOCK:
+        storage = "palette"
+    chunk = Chunk((sx, sy, sz), storage=storage)
+    chunk.blocks = blocks
+    return chunk
+
+
+class RegionFile:
+    """
+    A single region file on disk.
+
+    Reads go through a read only mmap of the file, so loading a chunk only parses its
+    table entry and its own compressed bytes. Writes reuse a chunk's sectors when the
+    new data fits. Otherwise its old sectors are freed and the data goes into the
+    first run of free sectors long enough for it, or the end of the file.
+    """
+
+    path: str
+    table: np.ndarray
+    _file: BinaryIO
+    _map: mmap.mmap | None
+    _used: np.ndarray  # (sectors,) bool, which sectors of the file hold data
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._map = None
+
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self._file = open(path, "r+b" if exists else "w+b")
+        try:
+            if exists:
+                self.table = self._read_header()
+            else:
+                self.table = np.zeros(_SLOT_COUNT, dtype=_TABLE_DTYPE)
+                self._file.write(_PREAMBLE.pack(REGION_MAGIC, REGION_VERSION))
+                self._file.write(self.table.tobytes())
+                self._file.truncate(_HEADER_SECTORS * SECTOR_SIZE)
+                self._file.flush()
+        except BaseException:
+            self._file.close()
+            raise
+
+        # Free sector map, rebuilt from the table since only it is stored
+        self._used = np.ones(_HEADER_SECTORS, dtype=bool)
+        for offset, length in self.table[self.table["length"] > 0].tolist():
+            self._mark(offset, -(-length // SECTOR_SIZE), True)
+
+    def _read_header(self) -> np.ndarray:
+        """Checks the preamble of an existing file and reads its offset table."""
+        header = self._file.read(_PREAMBLE.size + _SLOT_COUNT * _TABLE_DTYPE.itemsize)
+        if len(header) < _PREAMBLE.size + _SLOT_COUNT * _TABLE_DTYPE.itemsize:
+            raise ValueError(f"{self.path} has a truncated region header.")
+        magic, version = _PREAMBLE.unpack_from(header)
+        if magic != REGION_MAGIC or version != REGION_VERSION:
+            raise ValueError(
+                f"{self.path} is not a version {REGION_VERSION} region file."
+            )
+        return np.frombuffer(header, dtype=_TABLE_DTYPE, offset=_PREAMBLE.size).copy()
+
+    def _mark(self, offset: int, sectors: int, used: bool) -> None:
+        """Marks a run of sectors used or free, growing the map past the end if needed."""
+        if offset + sectors > len(self._used):
+            grown = np.zeros(offset + sectors, dtype=bool)
+            grown[: len(self._used)] = self._used
+            self._used = grown
+        self._used[offset : offset + sectors] = used
+
+    def _allocate(self, sectors: int) -> int:
+        """Finds the first run of free sectors that fits, a free tail counting as unbounded."""
+        free = np.concatenate(([0], ~self._used, [0])).astype(np.int8)
+        edges = np.flatnonzero(np.diff(free))
+        starts, ends = edges[0::2], edges[1::2]
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            if end - start >= sectors or end == len(self._used):
+                return start
+        return len(self._used)
+
+    def _mapping(self) -> mmap.mmap:
+        """Maps the file lazily, remapping after writes that changed its size."""
+        if self._map is None:
+            self._file.flush()
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def read(self, slot: int) -> bytes | None:
+        """
+        Reads the compressed data of one chunk.
+
+        Args:
+            slot (int): The slot of the chunk within the region.
+
+        Returns:
+            bytes | None: The compressed chunk, or None if it was never saved.
+        """
+        offset, length = self.table[slot]
+        if length == 0:
+            return None
+
+        start = int(offset) * SECTOR_SIZE
+        return self._mapping()[start : start + int(length)]
+
+    def write(self, slot: int, data: bytes) -> None:
+        """
+        Writes the compressed data of one chunk and updates its table entry.
+
+        Args:
+            slot (int): The slot of the chunk within the region.
+            data (bytes): The compressed chunk.
+        """
+        offset, length = (int(v) for v in self.table[slot])
+        sectors_needed = -(-len(data) // SECTOR_SIZE)
+        sectors_used = -(-length // SECTOR_SIZE)
+
+        if length == 0 or sectors_needed > sectors_used:
+            # Doesn't fit where it was, so move to the first free run that fits
+            self._mark(offset, sectors_used, False)
+            offset = self._allocate(sectors_needed)
+        else:
+            # Shrunk, so the sectors past its new end are free again
+            self._mark(offset + sectors_needed, sectors_used - sectors_needed, False)
+        self._mark(offset, sectors_needed, True)
+
+        self._file.seek(offset * SECTOR_SIZE)
+        self._file.write(data)
+        self._file.write(b"\0" * (sectors_needed * SECTOR_SIZE - len(data)))
+
+        self.table[slot] = (offset, len(data))
+        self._file.seek(_PREAMBLE.size + slot * _TABLE_DTYPE.itemsize)
+        self._file.write(self.table[slot : slot + 1].tobytes())
+
+        # The file may have grown past the old mapping
+        self.close_mapping()
+
+    def flush(self) -> None:
+        """Pushes buffered writes to the OS and fsyncs them to disk."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close_mapping(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def close(self) -> None:
+        self.close_mapping()
+        self._file.flush()
+        self._file.close()
@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict, deque
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from g_game.terrain.chunk import Chunk
+from g_game.terrain.world import World
+
+if TYPE_CHECKING:
+    from g_game.draw import ArenaMesh
+
+type ChunkPosition = tuple[int, int, int]
+
+
+@dataclass
+class ResidencyStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    saved: int = 0
+    loaded: int = 0
+
+
+@dataclass
+class Resident:
+    """A loaded chunk and, once uploaded, its GPU mesh."""
+
+    chunk: Chunk
+    mesh: ArenaMesh | None
+    nbytes: int
+
+
+class ChunkResidency:
+    """
+    Keeps the set of loaded chunks bounded around the camera.
+
+    Chunks are wanted within `load_radius` chunk columns of the camera and only
+    unloaded once they are beyond `unload_radius`, so moving back and forth across a
+    chunk border doesn't churn. On top of that the chunk data plus GPU mesh bytes are
+    kept under `byte_budget` by evicting the least recently used chunks first.
+
+    The budget never evicts chunks within `load_radius` of the camera, update() would
+    only want them straight back. When those alone exceed it the budget is overrun.
+
+    Evicted chunks are handed to `save_hook` and their meshes to `release_mesh`, and
+    missing chunks that `is_saved` finds are read through `load_hook` instead of being
+    generated, so nothing here touches GL or the disk directly.
+
+    Reading, decoding and lighting a saved chunk, or encoding one to save it, takes
+    far longer than a frame can spare for hundreds of chunks at once. Both are queued
+    instead and worked off by drain() within a time budget each frame.
+    """
+
+    world: World
+    load_radius: int
+    unload_radius: int
+    byte_budget: int
+    release_mesh: Callable[[ChunkPosition, ArenaMesh], None]
+    save_hook: Callable[[ChunkPosition, Chunk], None] | None
+    load_hook: Callable[[ChunkPosition], Chunk | None] | None
+    is_saved: Callable[[ChunkPosition], bool] | None
+    stats: ResidencyStats
+
+    residents: OrderedDict[ChunkPosition, Resident]
+    nbytes: int
+    camera_chunk: ChunkPosition | None
+    pending_loads: deque[ChunkPosition]  # Saved chunks to load, nearest first
+    pending_saves: dict[ChunkPosition, Chunk]  # Evicted chunks not yet saved
+
+    def __init__(
+        self,
+        world: World,
+        release_mesh: Callable[[ChunkPosition, ArenaMesh], None],
+        load_radius: int = 6,
+        unload_radius: int = 8,
+        byte_budget: int = 256 * 1024 * 1024,
+        save_hook: Callable[[ChunkPosition, Chunk], None] | None = None,
+        load_hook: Callable[[ChunkPosition], Chunk | None] | None = None,
+        is_saved: Callable[[ChunkPosition], bool] | None = None,
+    ) -> None:
+        """
+        Args:
+            world (World): The world whose chunks are managed.
+            release_mesh (Callable): Frees the GPU mesh of an evicted chunk.
+            load_radius (int, optional): Chunk columns around the camera to load. Defaults to 6.
+            unload_radius (int, optional): Chunk columns beyond which chunks unload. Defaults to 8.
+            byte_budget (int, optional): Max bytes of chunk data plus meshes. Defaults to 256 MiB.
+            save_hook (Callable, optional): Receives every evicted chunk, e.g. World.save_chunk.
+            load_hook (Callable, optional): Returns a saved chunk or None, e.g. World.read_chunk.
+            is_saved (Callable, optional): Cheaply checks whether load_hook would find a
+                chunk, e.g. World.has_saved_chunk. Without it nothing is loaded.
+        """
+        if unload_radius < load_radius:
+            raise ValueError("unload_radius must be at least load_radius.")
+
+        self.world = world
+        self.release_mesh = release_mesh
+        self.load_radius = load_radius
+        self.unload_radius = unload_radius
+        self.byte_budget = byte_budget
+        self.save_hook = save_hook
+        self.load_hook = load_hook
+        self.is_saved = is_saved
+        self.stats = ResidencyStats()
+
+        self.residents = OrderedDict()
+        self.nbytes = 0
+        self.camera_chunk = None
+        self.pending_loads = deque()
+        self.pending_saves = {}
+
+    def __contains__(self, position: ChunkPosition) -> bool:
+        return position in self.residents
+
+    def __len__(self) -> int:
+        return len(self.residents)
+
+    def _resize(self, resident: Resident) -> None:
+        """Recomputes the bytes a resident uses and updates the running total."""
+        nbytes = resident.chunk.memory_usage().nbytes + resident.chunk.light_nbytes
+        if resident.mesh is not None:
+            nbytes += resident.mesh.nbytes
+        self.nbytes += nbytes - resident.nbytes
+        resident.nbytes = nbytes
+
+    def get(self, position: ChunkPosition) -> Chunk | None:
+        """
+        Looks up a loaded chunk and marks it as recently used.
+
+        Returns:
+            Chunk | None: The chunk, or None on a miss.
+        """
+        resident = self.residents.get(position)
+        if resident is None:
+            self.stats.misses += 1
+            return None
+
+        self.stats.hits += 1
+        self.residents.move_to_end(position)
+        return resident.chunk
+
+    def touch(self, position: ChunkPosition) -> None:
+        """Marks a chunk as recently used, e.g. because it was drawn."""
+        if position in self.residents:
+            self.residents.move_to_end(position)
+
+    def admit(self, position: ChunkPosition, chunk: Chunk) -> None:
+        """Adds a newly loaded chunk to the world, evicting others if over budget."""
+        resident = self.residents.get(position)
+        if resident is not None:
+            self.evict(position)
+
+        self.world.add_chunk(position, chunk)
+        resident = self.residents[position] = Resident(chunk, None, 0)
+        self._resize(resident)
+        self.enforce_budget()
+
+    def attach_mesh(self, position: ChunkPosition, mesh: ArenaMesh) -> None:
+        """Records the GPU mesh uploaded for a resident chunk, or re-measures an updated one."""
+        resident = self.residents[position]
+        if resident.mesh is not None and resident.mesh is not mesh:
+            self.release_mesh(position, resident.mesh)
+        resident.mesh = mesh
+        self._resize(resident)
+        self.enforce_budget()
+
+    def detach_mesh(self, position: ChunkPosition) -> None:
+        """Frees the mesh of a resident chunk that no longer has any visible faces."""
+        resident = self.residents[position]
+        if resident.mesh is not None:
+            self.release_mesh(position, resident.mesh)
+            resident.mesh = None
+            self._resize(resident)
+
+    def refresh(self, position: ChunkPosition) -> None:
+        """Re-measures a chunk after its blocks changed storage."""
+        resident = self.residents.get(position)
+        if resident is not None:
+            self._resize(resident)
+
+    def evict(self, position: ChunkPosition) -> None:
+        """Unloads a chunk, freeing its mesh and queueing it to be saved."""
+        resident = self.residents.pop(position)
+        self.nbytes -= resident.nbytes
+        self.world.remove_chunk(position)
+        self.stats.evictions += 1
+
+        if resident.mesh is not None:
+            self.release_mesh(position, resident.mesh)
+        if self.save_hook is not None:
+            self.pending_saves[position] = resident.chunk
+
+    def _wanted(self, position: ChunkPosition) -> bool:
+        """Checks whether a chunk is within the load radius of the camera."""
+        if self.camera_chunk is None:
+            return False
+        cx, _, cz = self.camera_chunk
+        x, _, z = position
+        return (x - cx) ** 2 + (z - cz) ** 2 <= self.load_radius * self.load_radius
+
+    def enforce_budget(self) -> None:
+        """Evicts least recently used chunks outside the load radius until the byte budget is met."""
+        excess = self.nbytes - self.byte_budget
+        if excess <= 0:
+            return
+
+        victims: list[ChunkPosition] = []
+        for position, resident in self.residents.items():
+            if excess <= 0:
+                break
+            if not self._wanted(position):
+                victims.append(position)
+                excess -= resident.nbytes
+        for position in victims:
+            self.evict(position)
+
+    def update(self, camera_chunk: ChunkPosition) -> list[ChunkPosition]:
+        """
+        Unloads chunks beyond the unload radius and lists the ones left to generate.
+
+        Missing chunks that were saved, or are still waiting to be, are queued for
+        drain() to load instead.
+
+        Args:
+            camera_chunk (tuple): The (x, y, z) position of the chunk the camera is in.
+
+        Returns:
+            list: The (x, y, z) positions within the load radius that aren't loaded
+                or saved.
+        """
+        self.camera_chunk = camera_chunk
+        cx, _, cz = camera_chunk
+        limit = self.unload_radius * self.unload_radius
+        for position in [
+            (x, y, z)
+            for x, y, z in self.residents
+            if (x - cx) ** 2 + (z - cz) ** 2 > limit
+        ]:
+            self.evict(position)
+
+        self.enforce_budget()
+        missing = self.world.missing_chunks(camera_chunk, self.load_radius)
+
+        # Re-targeted from scratch, chunks that left the radius aren't loaded
+        saved: list[ChunkPosition] = []
+        unsaved: list[ChunkPosition] = []
+        for position in missing:
+            if position in self.pending_saves or (
+                self.load_hook is not None
+                and self.is_saved is not None
+                and self.is_saved(position)
+            ):
+                saved.append(position)
+            else:
+                unsaved.append(position)
+        saved.sort(key=lambda p: (p[0] - cx) ** 2 + (p[2] - cz) ** 2)
+        self.pending_loads = deque(saved)
+        return unsaved
+
+    def drain(self, budget: float) -> None:
+        """
+        Loads queued chunks, then saves evicted ones, until `budget` seconds are spent.
+
+        Loaded chunks are admitted and marked dirty, the caller meshes them like edited
+        chunks. A chunk evicted but not yet saved is re-admitted as is, its saved copy
+        would be stale. At least one chunk is handled per call while any are queued.
+
+        Args:
+            budget (float): Seconds to spend.
+        """
+        start = time.perf_counter()
+        while self.pending_loads and time.perf_counter() - start < budget:
+            position = self.pending_loads.popleft()
+            if position in self.residents:
+                continue
+
+            chunk = self.pending_saves.pop(position, None)
+            if chunk is None and self.load_hook is not None:
+                chunk = self.load_hook(position)
+            if chunk is None:
+                continue
+            self.admit(position, chunk)
+            self.world.mark_dirty(position)
+            self.stats.loaded += 1
+
+        while self.pending_saves and time.perf_counter() - start < budget:
+            self._save(*self.pending_saves.popitem())
+
+    def flush(self) -> None:
+        """Saves every evicted chunk still waiting, e.g. before the world is closed."""
+        while self.pending_saves:
+            self._save(*self.pending_saves.popitem())
+
+    def _save(self, position: ChunkPosition, chunk: Chunk) -> None:
+        """Hands one evicted chunk to save_hook."""
+        assert self.save_hook is not None
+        self.save_hook(position, chunk)
+        self.stats.saved += 1
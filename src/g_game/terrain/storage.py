@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+# Bits in one packed storage word
+WORD_BITS = 64
+
+# Highest block ID DenseStorage's one byte per block can hold
+MAX_DENSE_BLOCK = 255
+
+# Highest block ID any storage can hold, the uint16 of a dense block array
+MAX_BLOCK = 65535
+
+
+@dataclass
+class StorageMemory:
+    """Memory report for the block storage of a single chunk."""
+
+    storage: str
+    palette_size: int
+    bits_per_block: int
+    nbytes: int
+    dense_nbytes: int
+
+    @property
+    def ratio(self) -> float:
+        """How many times smaller this storage is than a dense uint8 array."""
+        return self.dense_nbytes / max(self.nbytes, 1)
+
+
+class UniformStorage:
+    """
+    A chunk where every block has the same type, stored without any array.
+
+    Chunks start out like this and are promoted to a full storage backend by the
+    first set that differs from the uniform block.
+    """
+
+    size: tuple[int, int, int]
+    block: int
+
+    def __init__(self, size: tuple[int, int, int], fill: int = 0) -> None:
+        self.size = size
+        self.block = fill
+
+    def get(self, x: int, y: int, z: int) -> int:
+        return self.block
+
+    def to_dense(self) -> np.ndarray:
+        """Returns a read only broadcast view, so no block array is allocated."""
+        dtype = np.uint8 if self.block < 256 else np.uint16
+        return np.broadcast_to(np.array(self.block, dtype=dtype), self.size)
+
+    def memory(self) -> StorageMemory:
+        return StorageMemory(
+            storage="uniform",
+            palette_size=1,
+            bits_per_block=0,
+            nbytes=0,
+            dense_nbytes=self.size[0] * self.size[1] * self.size[2],
+        )
+
+
+class DenseStorage:
+    """One byte per block in a plain uint8 array, so block IDs only go up to 255."""
+
+    size: tuple[int, int, int]
+    blocks: np.ndarray
+
+    def __init__(self, size: tuple[int, int, int], fill: int = 0) -> None:
+        if not 0 <= fill <= MAX_DENSE_BLOCK:
+            raise ValueError(f"Block type {fill} is out of range for dense storage.")
+        self.size = size
+        self.blocks = np.full(size, fill, dtype=np.uint8)
+
+    @classmethod
+    def from_dense(cls, blocks: np.ndarray) -> DenseStorage:
+        """Copies a dense block array, which must not hold IDs above MAX_DENSE_BLOCK."""
+        storage = cls(blocks.shape)
+        if blocks.size and blocks.max() > MAX_DENSE_BLOCK:
+            raise ValueError(
+                f"Block type {int(blocks.max())} is out of range for dense storage."
+            )
+        storage.blocks[:] = blocks
+        return storage
+
+    def get(self, x: int, y: int, z: int) -> int:
+        return int(self.blocks[x, y, z])
+
+    def set(self, x: int, y: int, z: int, block_type: int) -> None:
+        if not 0 <= block_type <= MAX_DENSE_BLOCK:
+            raise ValueError(
+                f"Block type {block_type} is out of range for dense storage."
+            )
+        self.blocks[x, y, z] = block_type
+
+    def to_dense(self) -> np.ndarray:
+        """Returns the live block array, writes to it go straight into the chunk."""
+        return self.blocks
+
+    def memory(self) -> StorageMemory:
+        return StorageMemory(
+            storage="dense",
+            palette_size=0,
+            bits_per_block=8,
+            nbytes=self.blocks.nbytes,
+            dense_nbytes=self.blocks.nbytes,
+        )
+
+
+class PaletteStorage:
+    """
+    Blocks stored as bit-packed indices into a per-chunk palette of block types.
+
+    Indices are packed into 64 bit words without straddling word boundaries, so a
+    chunk with 2 block types spends 1 bit per block and one with 5 types spends 3.
+    The bit width grows automatically as new block types are set. Block IDs may go
+    up to 65535.
+    """
+
+    size: tuple[int, int, int]
+    palette: list[int]
+    palette_lookup: dict[int, int]
+    bits: int
+    words: np.ndarray
+
+    def __init__(self, size: tuple[int, int, int], fill: int = 0) -> None:
+        self.size = size
+        self.palette = [fill]
+        self.palette_lookup = {fill: 0}
+        self.bits = 1
+        self.words = np.zeros(self._word_count(self.bits), dtype=np.uint64)
+
+    @property
+    def volume(self) -> int:
+        return self.size[0] * self.size[1] * self.size[2]
+
+    def _word_count(self, bits: int) -> int:
+        per_word = WORD_BITS // bits
+        return -(-self.volume // per_word)
+
+    def _locate(self, x: int, y: int, z: int) -> tuple[int, int]:
+        """Returns the (word, bit shift) holding the index of a block."""
+        _, sy, sz = self.size
+        i = (x * sy + y) * sz + z
+        per_word = WORD_BITS // self.bits
+        return i // per_word, (i % per_word) * self.bits
+
+    # --------------------
+    #   Bulk (un)packing
+    # --------------------
+
+    @staticmethod
+    def _unpack(words: np.ndarray, bits: int, count: int) -> np.ndarray:
+        per_word = WORD_BITS // bits
+        shifts = np.arange(per_word, dtype=np.uint64) * np.uint64(bits)
+        mask = np.uint64((1 << bits) - 1)
+        return ((words[:, None] >> shifts[None, :]) & mask).reshape(-1)[:count]
+
+    @staticmethod
+    def _pack(indices: np.ndarray, bits: int) -> np.ndarray:
+        per_word = WORD_BITS // bits
+        word_count = -(-len(indices) // per_word)
+        padded = np.zeros(word_count * per_word, dtype=np.uint64)
+        padded[: len(indices)] = indices
+        shifts = np.arange(per_word, dtype=np.uint64) * np.uint64(bits)
+        return np.bitwise_or.reduce(
+            padded.reshape(word_count, per_word) << shifts[None, :], axis=1
+        )
+
+    @classmethod
+    def from_dense(cls, blocks: np.ndarray) -> PaletteStorage:
+        """Packs a dense block array, keeping only the block types it contains."""
+        palette, indices = np.unique(blocks.reshape(-1), return_inverse=True)
+
+        storage = cls(blocks.shape)
+        storage.palette = [int(block) for block in palette]
+        storage.palette_lookup = {block: i for i, block in enumerate(storage.palette)}
+        storage.bits = max(1, (len(palette) - 1).bit_length())
+        storage.words = cls._pack(indices, storage.bits)
+        return storage
+
+    def to_dense(self) -> np.ndarray:
+        """
+        Unpacks every block into a new dense array.
+
+        The result is read only, since writes to it would not reach the storage.
+        """
+        dtype = np.uint8 if max(self.palette) < 256 else np.uint16
+        palette = np.array(self.palette, dtype=dtype)
+        indices = self._unpack(self.words, self.bits, self.volume)
+
+        blocks = palette[indices].reshape(self.size)
+        blocks.flags.writeable = False
+        return blocks
+
+    # ----------------------
+    #   Single block access
+    # ----------------------
+
+    def get(self, x: int, y: int, z: int) -> int:
+        word, shift = self._locate(x, y, z)
+        index = (int(self.words[word]) >> shift) & ((1 << self.bits) - 1)
+        return self.palette[index]
+
+    def set(self, x: int, y: int, z: int, block_type: int) -> None:
+        index = self.palette_lookup.get(block_type)
+        if index is None:
+            if not 0 <= block_type <= MAX_BLOCK:
+                raise ValueError(f"Block type {block_type} is out of range.")
+            index = len(self.palette)
+            self.palette.append(block_type)
+            self.palette_lookup[block_type] = index
+            if index >= 1 << self.bits:
+                self._widen(self.bits + 1)
+
+        word, shift = self._locate(x, y, z)
+        mask = ((1 << self.bits) - 1) << shift
+        value = (int(self.words[word]) & ~mask) | (index << shift)
+        self.words[word] = value
+
+    def _widen(self, bits: int) -> None:
+        """Repacks every index with a larger bit width."""
+        indices = self._unpack(self.words, self.bits, self.volume)
+        self.bits = bits
+        self.words = self._pack(indices, bits)
+
+    def memory(self) -> StorageMemory:
+        return StorageMemory(
+            storage="palette",
+            palette_size=len(self.palette),
+            bits_per_block=self.bits,
+            nbytes=self.words.nbytes + 2 * len(self.palette),
+            dense_nbytes=self.volume,
+        )
+
+
+type BlockStorage = UniformStorage | DenseStorage | PaletteStorage
+
+STORAGES: dict[str, type[DenseStorage] | type[PaletteStorage]] = {
+    "dense": DenseStorage,
+    "palette": PaletteStorage,
+}
@@ -0,0 +1,173 @@
+from collections.abc import Mapping
+from itertools import chain
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from g_game.terrain.lighting import TRANSPARENT
+
+if TYPE_CHECKING:
+    from g_game.terrain.chunk import Chunk
+
+# INFO: Chunk connectivity
+# Which of a chunk's 6 faces can see each other through it, 36 bits packed in
+# an int: bit a * 6 + b is set when air touching face a is connected to air
+# touching face b, with faces in FACES / NEIGHBOUR_OFFSETS order (+X, -X, +Y,
+# -Y, +Z, -Z). The opposite of face d is d ^ 1.
+#   Looking through the world means entering chunks by one face and leaving by
+# another, so a chunk can only be seen from the camera if there is a chain of
+# chunks to it where each one connects the face it was entered by to the face
+# it is left by. reachable_chunks() walks those chains. Like the shadow of a
+# hill, this only hides chunks, it never says what on them is visible.
+FACE_COUNT = 6
+FACE_BITS = (1 << FACE_COUNT) - 1
+
+# Every face connected to every other one, like an all air chunk
+ALL_CONNECTED = (1 << FACE_COUNT * FACE_COUNT) - 1
+
+# (normal axis, sign) of each face
+_FACE_AXES = ((0, 1), (0, -1), (1, 1), (1, -1), (2, 1), (2, -1))
+
+
+def face_links(connectivity: int, face: int) -> int:
+    """The 6 bit mask of faces connected to `face`."""
+    return (connectivity >> face * FACE_COUNT) & FACE_BITS
+
+
+def face_connectivity(blocks: np.ndarray) -> int:
+    """
+    Finds which faces of a chunk are connected through its air.
+
+    Every air voxel keeps a 6 bit mask of the faces known to reach it, seeded on
+    the face layers and flooded through the air one step per iteration, all
+    faces at once. This stops as soon as a step changes nothing.
+
+    Args:
+        blocks (np.ndarray): (sx, sy, sz) block types.
+
+    Returns:
+        int: The packed connectivity, see the top of this module.
+    """
+    open_ = TRANSPARENT[blocks]
+    if open_.all():
+        return ALL_CONNECTED
+    if not open_.any():
+        return 0
+
+    # 1. Seed every face's bit on its outermost layer of air
+    reached = np.zeros(blocks.shape, dtype=np.uint8)
+    for face, (axis, sign) in enumerate(_FACE_AXES):
+        layer = [slice(None)] * 3
+        layer[axis] = -1 if sign > 0 else 0
+        reached[tuple(layer)] |= np.uint8(1 << face)
+    reached *= open_
+
+    # 2. Flood, every voxel takes the bits of its 6 neighbours
+    spread = np.empty_like(reached)
+    while True:
+        spread[:] = reached
+        spread[1:] |= reached[:-1]
+        spread[:-1] |= reached[1:]
+        spread[:, 1:] |= reached[:, :-1]
+        spread[:, :-1] |= reached[:, 1:]
+        spread[:, :, 1:] |= reached[:, :, :-1]
+        spread[:, :, :-1] |= reached[:, :, 1:]
+        spread *= open_
+        if np.array_equal(spread, reached):
+            break
+        reached, spread = spread, reached
+
+    # 3. A face is connected to everything that reached its layer
+    connectivity = 0
+    for face, (axis, sign) in enumerate(_FACE_AXES):
+        layer = np.take(reached, -1 if sign > 0 else 0, axis=axis)
+        links = int(np.bitwise_or.reduce(layer, axis=None))
+        connectivity |= links << face * FACE_COUNT
+    return connectivity
+
+
+def reachable_chunks(
+    chunks: Mapping[tuple[int, int, int], "Chunk"],
+    camera_chunk: tuple[int, int, int],
+    radius: int,
+    y_range: tuple[int, int],
+) -> set[tuple[int, int, int]]:
+    """
+    Finds the chunks the camera could see into through connected faces.
+
+    A BFS from the camera's chunk steps into a neighbour through a face the
+    current chunk connects to the face it was entered by. Steps only ever go
+    away from the camera along their axis, so a path can't turn back on itself,
+    which is what makes this a visibility test and not just a flood of the
+    caves. With that ordering the BFS runs on a dense grid of the chunks around
+    the camera, one NumPy step per layer of the search.
+
+    The camera's own chunk is left through all of its faces. Chunks that aren't
+    loaded count as all air, so the sky and anything still streaming in stays
+    reachable.
+
+    Args:
+        chunks (Mapping): Loaded chunks by chunk position, e.g. World.chunks.
+        camera_chunk (tuple): The (x, y, z) position of the chunk the camera is in.
+        radius (int): Chunk columns around the camera to search.
+        y_range (tuple): The lowest and highest chunk y to search, inclusive.
+
+    Returns:
+        set: Positions of the reachable chunks, loaded or not.
+    """
+    cx, cy, cz = camera_chunk
+    y_low, y_high = min(y_range[0], cy), max(y_range[1], cy)
+    origin = np.array((cx - radius, y_low, cz - radius))
+    shape = (2 * radius + 1, y_high - y_low + 1, 2 * radius + 1)
+    camera = (radius, cy - y_low, radius)
+
+    # 1. Per cell and face, the faces it connects to, all open where unloaded
+    connectivity = np.full(shape, ALL_CONNECTED, dtype=np.uint64)
+    if chunks:
+        count = len(chunks)
+        cells = np.fromiter(chain.from_iterable(chunks), np.int64, count * 3)
+        cells = cells.reshape(-1, 3) - origin
+        values = np.fromiter(
+            (chunk.connectivity for chunk in chunks.values()), np.uint64, count
+        )
+        inside = ((cells >= 0) & (cells < shape)).all(axis=1)
+        connectivity[tuple(cells[inside].T)] = values[inside]
+    links = np.empty((FACE_COUNT, *shape), dtype=np.uint8)
+    for face in range(FACE_COUNT):
+        links[face] = (connectivity >> np.uint64(face * FACE_COUNT)) & FACE_BITS
+
+    # 2. Which steps lead away from the camera, from each cell
+    away = np.empty((FACE_COUNT, *shape), dtype=bool)
+    for face, (axis, sign) in enumerate(_FACE_AXES):
+        offset = np.arange(shape[axis]) - camera[axis]
+        view = [1, 1, 1]
+        view[axis] = shape[axis]
+        away[face] = np.broadcast_to((offset * sign >= 0).reshape(view), shape)
+
+    # 3. BFS, `entered` holds the faces each cell was entered by. All 6 faces
+    # are stepped together, a step out of face d enters by face d ^ 1
+    entered = np.zeros(shape, dtype=np.uint8)
+    entered[camera] = FACE_BITS
+    entry_bits = np.array([1 << (face ^ 1) for face in range(FACE_COUNT)], np.uint8)
+    entry_bits = entry_bits.reshape(-1, 1, 1, 1)
+    linked = np.empty((FACE_COUNT, *shape), dtype=np.uint8)
+    steps = np.empty((FACE_COUNT, *shape), dtype=np.uint8)
+    while True:
+        np.bitwise_and(entered, links, out=linked)
+        np.logical_and(linked, away, out=steps, casting="unsafe")
+        steps[(slice(None), *camera)] = 1
+        steps *= entry_bits
+
+        spread = entered.copy()
+        for face, (axis, sign) in enumerate(_FACE_AXES):
+            source = [slice(None)] * 3
+            target = [slice(None)] * 3
+            source[axis] = slice(None, -1) if sign > 0 else slice(1, None)
+            target[axis] = slice(1, None) if sign > 0 else slice(None, -1)
+            spread[tuple(target)] |= steps[face][tuple(source)]
+        if np.array_equal(spread, entered):
+            break
+        entered = spread
+
+    found = np.argwhere(entered) + origin
+    return {(x, y, z) for x, y, z in found.tolist()}
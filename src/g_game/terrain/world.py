@@ -1,27 +1,141 @@
-from g_game.terrain.chunk import Chunk
+import math
+import os
+from collections.abc import Iterator, Mapping
+
+import numpy as np
+
+from g_game.terrain.blocks import AIR
+from g_game.terrain.chunk import Chunk, empty_mesh
+from g_game.terrain.generator import TerrainGenerator
+from g_game.terrain.grid import ChunkGrid
+from g_game.terrain.lighting import (
+    BLOCK_MASK,
+    MAX_LIGHT,
+    SKY_SHIFT,
+    compute_light,
+    relight,
+)
+from g_game.terrain.raycast import ChunkStack, RayHit, RayHits, raycast, raycast_many
+from g_game.terrain.region import RegionFile, decode_chunk, encode_chunk, region_of
+from g_game.terrain.visibility import reachable_chunks
+
+# Offsets to the 6 face-adjacent chunks
+NEIGHBOUR_OFFSETS: tuple[tuple[int, int, int], ...] = (
+    (1, 0, 0),
+    (-1, 0, 0),
+    (0, 1, 0),
+    (0, -1, 0),
+    (0, 0, 1),
+    (0, 0, -1),
+)
+
+
+# Height of the generated world in chunks, starting at chunk y = 0
+WORLD_HEIGHT = 4
+
+
+def _by_slot(slots: np.ndarray) -> Iterator[tuple[int, np.ndarray]]:
+    """Groups the rows of a batch by grid slot, yielding (slot, rows) per distinct slot."""
+    if not len(slots):
+        return
+    order = np.argsort(slots, kind="stable")
+    bounds = np.flatnonzero(np.diff(slots[order])) + 1
+    for rows in np.split(order, bounds):
+        yield int(slots[rows[0]]), rows
 
 
 class World:
-    chunks: dict[tuple[int, int, int], Chunk]
+    chunks: ChunkGrid
+    dirty: set[tuple[int, int, int]]
+    save_dir: str | None
+    regions: dict[tuple[int, int, int], RegionFile]
+    generator: TerrainGenerator
+    ray_stack: ChunkStack  # Chunk copies raycast_many() reuses between calls
 
-    def __init__(self):
+    def __init__(
+        self,
+        save_dir: str | None = None,
+        seed: int = 0,
+        radius: int | None = 2,
+    ):
         """
         Manages the collection of chunks in the world.
+
+        Args:
+            save_dir (str, optional): Directory holding the region files of the world.
+                Saving and loading are disabled when omitted.
+            seed (int, optional): Seed for the terrain generator. Defaults to 0.
+            radius (int, optional): Radius in chunk columns of the initial area around the
+                origin, or None to start with no chunks at all. Defaults to 2.
         """
-        self.chunks = {}
-        self.generate_world()
+        self.chunks = ChunkGrid()
+        self.dirty = set()
+        self.save_dir = save_dir
+        self.regions = {}
+        self.generator = TerrainGenerator(seed)
+        self.ray_stack = ChunkStack(self.chunks, self.chunk_size)
+        if radius is not None:
+            self.generate_world(radius)
 
     def add_chunk(self, chunk_position: tuple[int, int, int], chunk: Chunk):
         """
-        Adds a chunk to the world.
+        Adds a chunk to the world, lighting it first if it isn't lit yet.
 
         Args:
             chunk_position (tuple): The (x, y, z) position of the chunk in the world.
             chunk (Chunk): The chunk object.
         """
         self.chunks[chunk_position] = chunk
+        self.ray_stack.invalidate(chunk_position)
+        if chunk.light is None:
+            self.light_chunk(chunk_position)
 
-    def get_chunk(self, chunk_position: tuple[int, int, int]) -> Chunk:
+    def light_chunk(self, chunk_position: tuple[int, int, int]) -> None:
+        """
+        Recomputes the light volume of a loaded chunk in bulk, see compute_light.
+
+        Light flows in from the loaded neighbours, and sky light from the chunk
+        above. With that chunk unloaded, the terrain generator's surface decides
+        which columns are open to the sky.
+        """
+        chunk = self._loaded(chunk_position)
+        x, y, z = chunk_position
+        above = self.chunks.get((x, y + 1, z))
+        if y + 1 >= WORLD_HEIGHT:
+            sky_open: np.ndarray | bool = True
+        elif above is not None and above.light is not None:
+            sky_open = (above.light[:, 0, :] >> SKY_SHIFT) == MAX_LIGHT
+        else:
+            sky_open = self.generator.sky_open(chunk_position)
+
+        borders: list[np.ndarray | None] = []
+        for (dx, dy, dz), neighbour in zip(
+            NEIGHBOUR_OFFSETS, self.neighbours_of(chunk_position)
+        ):
+            if neighbour is None or neighbour.light is None:
+                borders.append(None)
+                continue
+            axis = 0 if dx else 1 if dy else 2
+            index = 0 if dx + dy + dz > 0 else neighbour.size[axis] - 1
+            borders.append(np.take(neighbour.light, index, axis=axis))
+
+        chunk.light = compute_light(chunk.blocks, sky_open, borders)
+
+    def remove_chunk(self, chunk_position: tuple[int, int, int]) -> Chunk | None:
+        """
+        Removes a chunk from the world.
+
+        Args:
+            chunk_position (tuple): The (x, y, z) position of the chunk.
+
+        Returns:
+            Chunk | None: The removed chunk, or None if it wasn't loaded.
+        """
+        self.dirty.discard(chunk_position)
+        self.ray_stack.invalidate(chunk_position)
+        return self.chunks.pop(chunk_position, None)
+
+    def get_chunk(self, chunk_position: tuple[int, int, int]) -> Chunk | None:
         """
         Gets a chunk from the world.
 
@@ -29,17 +143,526 @@ class World:
             chunk_position (tuple): The (x, y, z) position of the chunk.
 
         Returns:
-            Chunk: The chunk object, or None if it doesn't exist.
+            Chunk | None: The chunk object, or None if it isn't loaded.
+        """
+        return self.chunks.get(chunk_position)
+
+    def _loaded(self, chunk_position: tuple[int, int, int]) -> Chunk:
+        """Gets a chunk that has to be loaded, raising KeyError if it isn't."""
+        chunk = self.chunks.get(chunk_position)
+        if chunk is None:
+            raise KeyError(f"Chunk at position {chunk_position} not found.")
+        return chunk
+
+    @property
+    def chunk_size(self) -> tuple[int, int, int]:
+        return self.generator.chunk_size
+
+    def chunk_position_of(self, position: np.ndarray) -> tuple[int, int, int]:
+        """
+        Finds the chunk containing a world space position.
+
+        Args:
+            position (np.ndarray): The (x, y, z) world position, in blocks.
+
+        Returns:
+            tuple: The (x, y, z) position of the chunk.
+        """
+        # On scalars, since this runs every frame
+        sx, sy, sz = self.chunk_size
+        return (
+            math.floor(position[0]) // sx,
+            math.floor(position[1]) // sy,
+            math.floor(position[2]) // sz,
+        )
+
+    def missing_chunks(
+        self, center: tuple[int, int, int], radius: int
+    ) -> list[tuple[int, int, int]]:
+        """
+        Lists the chunks within a radius of chunk columns that aren't loaded.
+
+        Args:
+            center (tuple): The (x, y, z) chunk position to measure from.
+            radius (int): Radius in chunk columns.
+
+        Returns:
+            list: The (x, y, z) positions of the missing chunks, over the whole world height.
+        """
+        cx, _, cz = center
+        missing: list[tuple[int, int, int]] = []
+        for x in range(cx - radius, cx + radius + 1):
+            for z in range(cz - radius, cz + radius + 1):
+                if (x - cx) ** 2 + (z - cz) ** 2 > radius * radius:
+                    continue
+                for y in range(WORLD_HEIGHT):
+                    if (x, y, z) not in self.chunks:
+                        missing.append((x, y, z))
+        return missing
+
+    def neighbours_of(
+        self, chunk_position: tuple[int, int, int]
+    ) -> tuple[Chunk | None, ...]:
+        """Gets the 6 face-adjacent chunks in NEIGHBOUR_OFFSETS order, None where unloaded."""
+        x, y, z = chunk_position
+        return tuple(
+            self.chunks.get((x + dx, y + dy, z + dz))
+            for dx, dy, dz in NEIGHBOUR_OFFSETS
+        )
+
+    def culling_neighbours(
+        self,
+        chunk_position: tuple[int, int, int],
+        lod: int,
+        lods: Mapping[tuple[int, int, int], int],
+    ) -> list[Chunk | None] | None:
+        """
+        Gets the neighbours a chunk's mesh hides its border faces against, see lod.py.
+
+        Only level 0 meshes hide border faces, and only against neighbours at level
+        0 too, so on a seam between levels both sides keep their border walls.
+
+        Args:
+            chunk_position (tuple): The (x, y, z) position of the chunk.
+            lod (int): The level of detail the chunk is meshed at.
+            lods (Mapping): The level of each meshed chunk. Chunks not in it count
+                as level 0, their seams are redone once they get a level.
+
+        Returns:
+            list | None: The neighbours in NEIGHBOUR_OFFSETS order, None where faces
+                are kept, or None altogether above level 0.
+        """
+        if lod:
+            return None
+        x, y, z = chunk_position
+        neighbours: list[Chunk | None] = []
+        for dx, dy, dz in NEIGHBOUR_OFFSETS:
+            position = (x + dx, y + dy, z + dz)
+            same_level = lods.get(position, 0) == 0
+            neighbours.append(self.chunks.get(position) if same_level else None)
+        return neighbours
+
+    def _locate(
+        self, position: tuple[int, int, int]
+    ) -> tuple[tuple[int, int, int], tuple[int, int, int]]:
+        """Splits a world block position into its chunk position and chunk-local position."""
+        sx, sy, sz = self.chunk_size
+        x, y, z = position
+        (cx, lx), (cy, ly), (cz, lz) = divmod(x, sx), divmod(y, sy), divmod(z, sz)
+        return (cx, cy, cz), (lx, ly, lz)
+
+    def get_light(self, position: tuple[int, int, int]) -> tuple[int, int]:
+        """
+        Gets the (sky, block) light at a world block position, see lighting.py.
+
+        Raises:
+            KeyError: If the chunk holding the block isn't loaded.
+        """
+        chunk_position, local = self._locate(position)
+        light = self._loaded(chunk_position).light
+        if light is None:
+            return MAX_LIGHT, 0
+        value = int(light[local])
+        return value >> SKY_SHIFT, value & BLOCK_MASK
+
+    def get_block(self, position: tuple[int, int, int]) -> int:
+        """
+        Gets the block type at a world block position.
+
+        Raises:
+            KeyError: If the chunk holding the block isn't loaded.
+        """
+        chunk_position, (x, y, z) = self._locate(position)
+        return self._loaded(chunk_position).get_block(x, y, z)
+
+    def set_block(self, position: tuple[int, int, int], block_type: int) -> None:
+        """
+        Sets the block type at a world block position and marks the meshes it affects dirty.
+
+        That is the chunk holding the block, plus the neighbouring chunk across any
+        border the block touches, since its hidden boundary faces may now show.
+        The light around the block is updated incrementally, and the chunks whose
+        light changed are marked dirty too.
+
+        Args:
+            position (tuple): The (x, y, z) world block position.
+            block_type (int): The block type ID to set.
+
+        Raises:
+            KeyError: If the chunk holding the block isn't loaded.
+        """
+        chunk_position, local = self._locate(position)
+        chunk = self._loaded(chunk_position)
+        if chunk.get_block(*local) == block_type:
+            return
+
+        chunk.set_block(*local, block_type)
+        self.ray_stack.invalidate(chunk_position)
+        self.mark_dirty(chunk_position)
+
+        sky_height = WORLD_HEIGHT * self.chunk_size[1]
+        for lit in relight(self.chunks, self.chunk_size, position, sky_height):
+            self.mark_dirty(lit)
+
+        for axis, size in enumerate(self.chunk_size):
+            if local[axis] == 0 or local[axis] == size - 1:
+                neighbour = list(chunk_position)
+                neighbour[axis] += 1 if local[axis] else -1
+                self.mark_dirty((neighbour[0], neighbour[1], neighbour[2]))
+
+    def _split(self, positions: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Splits (n, 3) world block positions into grid slots and chunk-local positions."""
+        chunk_positions, local = np.divmod(positions, self.chunk_size)
+        return self.chunks.lookup(chunk_positions), local
+
+    def get_blocks(self, positions: np.ndarray, default: int = AIR) -> np.ndarray:
+        """
+        Gets the block types at a batch of world block positions.
+
+        Positions are split into chunks and local coordinates as arrays, their
+        chunks found in one grid lookup, and each chunk read with a single fancy
+        index. The Python work grows with the chunks touched, not the blocks, for
+        physics, raycast and meshing queries that need many blocks at once.
+
+        Args:
+            positions (np.ndarray): (n, 3) int world block positions.
+            default (int, optional): Block type of positions in unloaded chunks.
+                Defaults to AIR.
+
+        Returns:
+            np.ndarray: (n,) int64 block types, in input order.
+        """
+        positions = np.asarray(positions, dtype=np.int64).reshape(-1, 3)
+        slots, local = self._split(positions)
+        block_types = np.full(len(positions), default, dtype=np.int64)
+        for slot, rows in _by_slot(slots):
+            if slot >= 0:
+                chunk = self.chunks.chunk_at(slot)
+                block_types[rows] = chunk.get_blocks(*local[rows].T)
+        return block_types
+
+    def set_blocks(self, positions: np.ndarray, block_types: np.ndarray | int) -> int:
+        """
+        Sets the block types at a batch of world block positions, like set_block on each.
+
+        Each chunk's storage is written once for all of its blocks, skipping the
+        ones that already hold their new type. Then the light around every block
+        that changed is updated and the meshes they affect are marked dirty, the
+        same as set_block does. Where a position repeats the last write wins.
+
+        Args:
+            positions (np.ndarray): (n, 3) int world block positions.
+            block_types (np.ndarray | int): (n,) block type IDs to set, or one for all.
+
+        Returns:
+            int: How many blocks changed.
+
+        Raises:
+            KeyError: If a chunk holding one of the blocks isn't loaded, in which
+                case nothing is set.
+        """
+        positions = np.asarray(positions, dtype=np.int64).reshape(-1, 3)
+        slots, local = self._split(positions)
+        block_types = np.broadcast_to(
+            np.asarray(block_types, dtype=np.int64), (len(positions),)
+        )
+        if (slots < 0).any():
+            x, y, z = (positions[np.argmax(slots < 0)] // self.chunk_size).tolist()
+            raise KeyError(f"Chunk at position {(x, y, z)} not found.")
+
+        # 1. Keep only the last write to every block
+        _, sy, sz = self.chunk_size
+        cells = (slots * self.chunk_size[0] + local[:, 0]) * sy + local[:, 1]
+        cells = cells * sz + local[:, 2]
+        _, last = np.unique(cells[::-1], return_index=True)
+        keep = len(cells) - 1 - last
+
+        # 2. Write each chunk once, with only the blocks that change
+        changed: list[np.ndarray] = []
+        for slot, rows in _by_slot(slots[keep]):
+            rows = keep[rows]
+            chunk = self.chunks.chunk_at(slot)
+            rows = rows[chunk.get_blocks(*local[rows].T) != block_types[rows]]
+            if len(rows):
+                chunk.set_blocks(*local[rows].T, block_types[rows])
+                changed.append(rows)
+        if not changed:
+            return 0
+        rows = np.concatenate(changed)
+
+        # 3. The chunks written, and the neighbour across any border a block
+        # touches, whose hidden boundary faces may now show
+        size = np.array(self.chunk_size)
+        chunk_positions, local = positions[rows] // size, local[rows]
+        for x, y, z in np.unique(chunk_positions, axis=0).tolist():
+            self.ray_stack.invalidate((x, y, z))
+        dirty = [chunk_positions]
+        for axis, offset in enumerate(np.eye(3, dtype=np.int64)):
+            dirty.append(chunk_positions[local[:, axis] == size[axis] - 1] + offset)
+            dirty.append(chunk_positions[local[:, axis] == 0] - offset)
+        for x, y, z in np.unique(np.concatenate(dirty), axis=0).tolist():
+            self.mark_dirty((x, y, z))
+
+        # 4. Relight after all the writes, so every update sees the final blocks
+        sky_height = WORLD_HEIGHT * self.chunk_size[1]
+        for x, y, z in positions[rows].tolist():
+            for lit in relight(self.chunks, self.chunk_size, (x, y, z), sky_height):
+                self.mark_dirty(lit)
+        return len(rows)
+
+    def raycast(
+        self,
+        origin: np.ndarray | tuple[float, float, float],
+        direction: np.ndarray | tuple[float, float, float],
+        max_distance: float,
+    ) -> RayHit | None:
+        """
+        Finds the first solid block along a ray, e.g. the block the camera looks at.
+
+        Args:
+            origin (np.ndarray | tuple): Where the ray starts, in world space.
+            direction (np.ndarray | tuple): Which way it goes, need not be unit length.
+            max_distance (float): How far to look, in multiples of `direction`.
+                Must be finite.
+
+        Returns:
+            RayHit | None: The block, the normal of the face hit and the distance,
+                or None if nothing solid is in reach. Unloaded chunks count as air.
+        """
+        return raycast(self.chunks, self.chunk_size, origin, direction, max_distance)
+
+    def raycast_many(
+        self,
+        origins: np.ndarray,
+        directions: np.ndarray,
+        max_distance: float | np.ndarray,
+    ) -> RayHits:
+        """
+        Traces a batch of rays at once, see raycast.raycast_many.
+
+        Args:
+            origins (np.ndarray): (n, 3) ray starts, in world space.
+            directions (np.ndarray): (n, 3) ray directions.
+            max_distance (float | np.ndarray): How far each ray looks, finite.
+
+        Returns:
+            RayHits: A hit or miss for every ray, in input order.
+        """
+        return raycast_many(
+            self.chunks,
+            self.chunk_size,
+            origins,
+            directions,
+            max_distance,
+            self.ray_stack,
+        )
+
+    def reachable_chunks(
+        self, camera_chunk: tuple[int, int, int], radius: int
+    ) -> set[tuple[int, int, int]]:
+        """
+        Finds the chunks the camera could see into through connected chunk faces.
+
+        Args:
+            camera_chunk (tuple): The (x, y, z) position of the chunk the camera is in.
+            radius (int): Chunk columns around the camera to search.
+
+        Returns:
+            set: Positions of the reachable chunks, see visibility.reachable_chunks.
+        """
+        # One layer over the world too, so paths can pass over the top of it
+        return reachable_chunks(self.chunks, camera_chunk, radius, (0, WORLD_HEIGHT))
+
+    def mark_dirty(self, chunk_position: tuple[int, int, int]) -> None:
+        """Queues a loaded chunk to be re-meshed. Repeated marks coalesce into one re-mesh."""
+        if chunk_position in self.chunks:
+            self.dirty.add(chunk_position)
+
+    def mesh_chunk(
+        self,
+        chunk_position: tuple[int, int, int],
+        packed: bool = False,
+        lod: int = 0,
+        lods: Mapping[tuple[int, int, int], int] | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Greedy meshes a chunk, skipping border faces hidden by its loaded neighbours.
+
+        Args:
+            chunk_position (tuple): The (x, y, z) position of the chunk.
+            packed (bool, optional): Emit the packed vertex format. Defaults to False.
+            lod (int, optional): Level of detail to mesh at, see lod.py. Defaults to 0.
+            lods (Mapping, optional): The level of every meshed chunk. When given,
+                border faces are only skipped against neighbours at the same level,
+                see culling_neighbours. Defaults to every loaded neighbour.
+
+        Returns:
+            tuple[np.array, np.array]: A tuple containing the vertex data and the index data.
+        """
+        self.dirty.discard(chunk_position)
+        chunk = self._loaded(chunk_position)
+        chunk.compute_connectivity()  # Re-computed along with the mesh after an edit
+        if not self.needs_mesh(chunk_position):
+            return empty_mesh(packed)
+        if lod:
+            return chunk.greedy_mesh(packed=packed, lod=lod)
+        if lods is None:
+            return chunk.greedy_mesh(self.neighbours_of(chunk_position), packed)
+        return chunk.greedy_mesh(
+            self.culling_neighbours(chunk_position, 0, lods), packed
+        )
+
+    def needs_mesh(self, chunk_position: tuple[int, int, int]) -> bool:
+        """
+        Checks whether a chunk could have any visible faces.
+
+        All air chunks never do, and neither do chunks completely filled with solid
+        blocks whose 6 neighbours are also completely solid.
+
+        Args:
+            chunk_position (tuple): The (x, y, z) position of the chunk.
+
+        Returns:
+            bool: False if meshing the chunk can be skipped.
+        """
+        chunk = self._loaded(chunk_position)
+        if chunk.is_empty:
+            return False
+        if not chunk.is_full:
+            return True
+
+        x, y, z = chunk_position
+        for dx, dy, dz in NEIGHBOUR_OFFSETS:
+            neighbour = self.chunks.get((x + dx, y + dy, z + dz))
+            if neighbour is None or not neighbour.is_full:
+                return True
+        return False
+
+    def meshable_chunks(self) -> Iterator[tuple[int, int, int]]:
+        """Yields the position of every loaded chunk that needs a mesh."""
+        for chunk_position in self.chunks:
+            if self.needs_mesh(chunk_position):
+                yield chunk_position
+
+    # -------------------
+    #   Saving / loading
+    # -------------------
+
+    def _region(
+        self, region_position: tuple[int, int, int], create: bool
+    ) -> RegionFile | None:
+        """Gets an open region file, opening it on first use."""
+        if self.save_dir is None:
+            raise RuntimeError("World has no save_dir to save to or load from.")
+
+        region = self.regions.get(region_position)
+        if region is None:
+            rx, ry, rz = region_position
+            path = os.path.join(self.save_dir, f"r.{rx}.{ry}.{rz}.greg")
+            if not create and not os.path.exists(path):
+                return None
+            os.makedirs(self.save_dir, exist_ok=True)
+            region = self.regions[region_position] = RegionFile(path)
+        return region
+
+    def save_chunk(self, chunk_position: tuple[int, int, int], chunk: Chunk) -> None:
+        """
+        Writes a single chunk to its region file, loaded or not.
+
+        The write is buffered, it reaches the disk on save() or close().
+
+        Args:
+            chunk_position (tuple): The (x, y, z) position of the chunk.
+            chunk (Chunk): The chunk object.
+        """
+        region_position, slot = region_of(chunk_position)
+        region = self._region(region_position, create=True)
+        assert region is not None
+        region.write(slot, encode_chunk(chunk))
+
+    def save(self) -> None:
+        """Writes every loaded chunk to the region files in save_dir."""
+        for chunk_position, chunk in self.chunks.items():
+            self.save_chunk(chunk_position, chunk)
+
+        for region in self.regions.values():
+            region.flush()
+
+    def load_chunk(self, chunk_position: tuple[int, int, int]) -> Chunk | None:
+        """
+        Loads a single chunk from its region file and adds it to the world.
+
+        Only the region's offset table entry and the chunk's own bytes are read.
+
+        Args:
+            chunk_position (tuple): The (x, y, z) position of the chunk.
+
+        Returns:
+            Chunk | None: The chunk object, or None if it was never saved.
         """
         if chunk_position in self.chunks:
             return self.chunks[chunk_position]
-        else:
-            raise KeyError(f"Chunk at position {chunk_position} not found.")
 
-    def generate_world(self):
+        chunk = self.read_chunk(chunk_position)
+        if chunk is not None:
+            self.add_chunk(chunk_position, chunk)
+        return chunk
+
+    def read_chunk(self, chunk_position: tuple[int, int, int]) -> Chunk | None:
+        """
+        Reads a single chunk from its region file without adding it to the world.
+
+        Args:
+            chunk_position (tuple): The (x, y, z) position of the chunk.
+
+        Returns:
+            Chunk | None: The unlit chunk object, or None if it was never saved.
+        """
+        region_position, slot = region_of(chunk_position)
+        region = self._region(region_position, create=False)
+        data = region.read(slot) if region is not None else None
+        if data is None:
+            return None
+        return decode_chunk(data)
+
+    def has_saved_chunk(self, chunk_position: tuple[int, int, int]) -> bool:
+        """
+        Checks whether a chunk was saved, from its region's offset table alone.
+
+        Args:
+            chunk_position (tuple): The (x, y, z) position of the chunk.
+
+        Returns:
+            bool: Whether read_chunk() would find the chunk.
         """
-        Generates the initial world terrain.
+        region_position, slot = region_of(chunk_position)
+        region = self._region(region_position, create=False)
+        return region is not None and int(region.table["length"][slot]) > 0
+
+    def close(self) -> None:
+        """Closes every open region file."""
+        for region in self.regions.values():
+            region.close()
+        self.regions.clear()
 
-        (This is a stub for procedural generation or loading from a file).
+    def generate_world(self, radius: int) -> None:
         """
-        self.add_chunk((0, 0, 0), Chunk())
+        Fills the square of chunk columns around the origin with terrain.
+
+        Chunks that were saved before are loaded from their region files, the rest
+        are generated together in one batch.
+
+        Args:
+            radius (int): Radius of the square in chunk columns.
+        """
+        missing: list[tuple[int, int, int]] = []
+        for x in range(-radius, radius + 1):
+            for z in range(-radius, radius + 1):
+                for y in range(WORLD_HEIGHT):
+                    if self.save_dir is None or self.load_chunk((x, y, z)) is None:
+                        missing.append((x, y, z))
+
+        for chunk_position, chunk in zip(
+            missing, self.generator.generate_chunks(missing)
+        ):
+            self.add_chunk(chunk_position, chunk)
@@ -15,6 +15,11 @@ class GWin:
 
     size: tuple[int, int] = (768, 576)
 
+    # Framebuffer size in pixels, which differs from `size` on high DPI screens,
+    # and whether it changed since the game last looked
+    framebuffer_size: tuple[int, int]
+    resized: bool
+
     def __init__(self) -> None:
         glog.i("Initializing GWindow...")
 
@@ -40,6 +45,15 @@ class GWin:
             glfw.terminate()
             raise RuntimeError("GLFW window failed to spawen.")
 
+        self.framebuffer_size = glfw.get_framebuffer_size(self.window)
+        self.resized = True
+
+        def framebuffer_size_callback(_window: Any, width: int, height: int) -> None:
+            self.framebuffer_size = (width, height)
+            self.resized = True
+
+        glfw.set_framebuffer_size_callback(self.window, framebuffer_size_callback)
+
     @property
     def _as_parameter_(self) -> Any:
         """
@@ -53,6 +67,17 @@ class GWin:
         glfw.make_context_current(window=self)
         return self
 
+    def set_vsync(self, enabled: bool) -> None:
+        """Syncs buffer swaps to the display refresh, needs the context to be current."""
+        glfw.swap_interval(1 if enabled else 0)
+
+    @property
+    def refresh_rate(self) -> float:
+        """The primary monitor's refresh rate in Hz, 60 if it can't be read."""
+        monitor = glfw.get_primary_monitor()
+        mode = glfw.get_video_mode(monitor) if monitor else None
+        return float(mode.refresh_rate) if mode and mode.refresh_rate > 0 else 60.0
+
     def should_close(self) -> bool:
         """Returns whether the window should close"""
         return glfw.window_should_close(window=self)
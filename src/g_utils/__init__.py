@@ -1,23 +1,69 @@
-from .glogger import GLogger
+from .allocator import ArenaAllocator, Relocation
+from .glogger import GLogger, LogLevel, flush_logs, set_log_queue
+from .pacing import FixedTimestep, FrameLimiter, WorkBudget, sleep_until
+from .profiler import FrameProfiler, StageStats
 from .render import (
+    boxes_in_frustum,
     compile_shader_program,
     create_perspective_matrix,
+    create_translation_matrix,
+    extract_frustum_planes,
+    link_program,
     load_texture,
+    load_texture_array,
     look_at,
     normalize,
 )
+from .shaders import ShaderRegistry, load_cached_program
+from .textures import TextureArray, build_mipmaps, build_texture_array
 
 __all__ = [
+    # ----------------/
+    #    ./allocator  \
+    # ----------------/
+    "ArenaAllocator",
+    "Relocation",
     # --------------/
     #    ./glogger  \
     # --------------/
     "GLogger",
+    "LogLevel",
+    "flush_logs",
+    "set_log_queue",
+    # -------------/
+    #    ./pacing  \
+    # -------------/
+    "FixedTimestep",
+    "FrameLimiter",
+    "WorkBudget",
+    "sleep_until",
+    # ---------------/
+    #    ./profiler  \
+    # ---------------/
+    "FrameProfiler",
+    "StageStats",
     # -------------/
     #    ./render  \
     # -------------/
+    "boxes_in_frustum",
     "compile_shader_program",
     "create_perspective_matrix",
+    "create_translation_matrix",
+    "extract_frustum_planes",
+    "link_program",
     "look_at",
     "normalize",
     "load_texture",
+    "load_texture_array",
+    # --------------/
+    #    ./shaders  \
+    # --------------/
+    "ShaderRegistry",
+    "load_cached_program",
+    # ---------------/
+    #    ./textures  \
+    # ---------------/
+    "TextureArray",
+    "build_mipmaps",
+    "build_texture_array",
 ]
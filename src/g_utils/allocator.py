@@ -0,0 +1,157 @@
+from bisect import bisect_left
+from dataclasses import dataclass
+
+
+@dataclass
+class Relocation:
+    """A block the allocator moved while defragmenting, in allocator units."""
+
+    old_offset: int
+    new_offset: int
+    size: int
+
+
+class ArenaAllocator:
+    """
+    First fit sub-allocator over one linear range of `capacity` units.
+
+    It only does the bookkeeping: offsets and sizes in whatever unit the caller
+    picks (vertices, indices, bytes), so the memory itself can live anywhere,
+    like a GPU buffer. Freed blocks are merged with their free neighbours, and
+    defragment() packs every live block to the front and reports the moves the
+    caller has to replay on the real memory.
+    """
+
+    capacity: int
+    allocations: dict[int, int]
+
+    # Free blocks as parallel lists sorted by offset, never adjacent to each other
+    _free_offsets: list[int]
+    _free_sizes: list[int]
+
+    def __init__(self, capacity: int) -> None:
+        """
+        Args:
+            capacity (int): Size of the managed range in units.
+        """
+        if capacity < 0:
+            raise ValueError("capacity must not be negative.")
+
+        self.capacity = capacity
+        self.allocations = {}
+        self._free_offsets = [0] if capacity else []
+        self._free_sizes = [capacity] if capacity else []
+
+    @property
+    def used(self) -> int:
+        """Units held by live allocations."""
+        return self.capacity - self.free_space
+
+    @property
+    def free_space(self) -> int:
+        """Units not held by any allocation, fragmented or not."""
+        return sum(self._free_sizes)
+
+    @property
+    def largest_free(self) -> int:
+        """The largest allocation that can currently succeed."""
+        return max(self._free_sizes, default=0)
+
+    @property
+    def fragmentation(self) -> float:
+        """0 when all free space is one block, approaching 1 as it splinters."""
+        free_space = self.free_space
+        if free_space == 0:
+            return 0.0
+        return 1.0 - self.largest_free / free_space
+
+    def allocate(self, size: int) -> int | None:
+        """
+        Reserves `size` units.
+
+        Returns:
+            int | None: The offset of the block, or None if no free block is large
+                enough. defragment() or grow() can make room.
+        """
+        if size <= 0:
+            raise ValueError("Allocation size must be positive.")
+
+        for i, free_size in enumerate(self._free_sizes):
+            if free_size < size:
+                continue
+
+            offset = self._free_offsets[i]
+            if free_size == size:
+                del self._free_offsets[i]
+                del self._free_sizes[i]
+            else:
+                self._free_offsets[i] += size
+                self._free_sizes[i] -= size
+            self.allocations[offset] = size
+            return offset
+        return None
+
+    def free(self, offset: int) -> None:
+        """
+        Releases the block at `offset`, merging it with free blocks on either side.
+
+        Raises:
+            KeyError: If no block was allocated at `offset`.
+        """
+        size = self.allocations.pop(offset)
+        i = bisect_left(self._free_offsets, offset)
+
+        # Merge with the free block right after it
+        if i < len(self._free_offsets) and self._free_offsets[i] == offset + size:
+            size += self._free_sizes[i]
+            del self._free_offsets[i]
+            del self._free_sizes[i]
+
+        # Merge with the free block right before it
+        if i > 0 and self._free_offsets[i - 1] + self._free_sizes[i - 1] == offset:
+            self._free_sizes[i - 1] += size
+        else:
+            self._free_offsets.insert(i, offset)
+            self._free_sizes.insert(i, size)
+
+    def grow(self, capacity: int) -> None:
+        """Extends the managed range to `capacity` units, live blocks keep their offsets."""
+        if capacity < self.capacity:
+            raise ValueError("An allocator can only grow.")
+
+        added = capacity - self.capacity
+        if added == 0:
+            return
+        if self._free_offsets and self._free_offsets[-1] + self._free_sizes[-1] == (
+            self.capacity
+        ):
+            self._free_sizes[-1] += added
+        else:
+            self._free_offsets.append(self.capacity)
+            self._free_sizes.append(added)
+        self.capacity = capacity
+
+    def defragment(self) -> list[Relocation]:
+        """
+        Packs every live block to the front, leaving one free block at the end.
+
+        Blocks keep their order, so each one only ever moves towards the front.
+
+        Returns:
+            list[Relocation]: The blocks that moved, in offset order.
+        """
+        moves: list[Relocation] = []
+        packed: dict[int, int] = {}
+        cursor = 0
+        for offset in sorted(self.allocations):
+            size = self.allocations[offset]
+            if offset != cursor:
+                moves.append(Relocation(offset, cursor, size))
+            packed[cursor] = size
+            cursor += size
+
+        self.allocations = packed
+        tail = self.capacity - cursor
+        self._free_offsets = [cursor] if tail else []
+        self._free_sizes = [tail] if tail else []
+        return moves
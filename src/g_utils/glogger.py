@@ -1,15 +1,54 @@
+import atexit
+import os
 import sys
+import threading
+import time
 from datetime import datetime
+from enum import IntEnum
 from functools import lru_cache
-from typing import TextIO
+from queue import SimpleQueue
+from types import FrameType
+from typing import Any
 
-from rich.console import Console
+from rich.console import Console, Group, RenderableType
+from rich.pretty import Pretty
+from rich.scope import render_scope
+from rich.styled import Styled
+from rich.table import Table
+from rich.text import Text
+
+
+class LogLevel(IntEnum):
+    DEBUG = 10
+    INFO = 20
+    ERROR = 40
+
+
+# Level of loggers that don't set their own, e.g. G_LOG_LEVEL=error for release runs
+DEFAULT_LEVEL = LogLevel.__members__.get(
+    os.environ.get("G_LOG_LEVEL", "info").upper(), LogLevel.INFO
+)
+
+
+# A log call waiting to be rendered: error, values, sep, end, name, style,
+# caller (filename, line, locals) and how many calls the rate limit dropped before it.
+# A plain tuple since building one is on the caller's time.
+type _Record = tuple[
+    bool,
+    tuple[object, ...],
+    str,
+    str,
+    str,
+    str,
+    tuple[str, int, dict[str, Any]],
+    int,
+]
 
 
 class _GMasterLogger:
     # Consoles
-    _console: Console = Console(log_time=True)
-    _econsole: Console = Console(log_time=True, stderr=True)
+    _console: Console = Console()
+    _econsole: Console = Console(stderr=True)
 
     # Logger state
     len_last_name: int = 0
@@ -17,6 +56,15 @@ class _GMasterLogger:
     last_message_count: int = 1
     last_name: str = ""
     repeat_line_printed: bool = False
+    last_time: str = ""
+
+    # Queued mode, records are rendered by a background thread when set
+    _queue: SimpleQueue[_Record | threading.Event | None] | None = None
+    _worker: threading.Thread | None = None
+
+    # Per call site (filename, line) rate limiting state
+    _last_emitted: dict[tuple[str, int], float] = {}
+    _suppressed: dict[tuple[str, int], int] = {}
 
     def _smart_gutter_prefix(
         self, name: str, gutter_str: str = " │ "
@@ -36,18 +84,75 @@ class _GMasterLogger:
         else:
             return (f" {cname}",)
 
-    def _log(
+    def _log_row(
         self,
         console: Console,
-        stream: TextIO,
         values: tuple[object, ...],
         sep: str,
         end: str,
-        name: str,
         style: str,
-        log_locals: bool = False,
+        caller: tuple[str, int, dict[str, Any]],
     ) -> None:
+        """
+        Prints one message as a [time] message path:line row, like Console.log.
+
+        The row is laid out here from the caller captured at the log call, since
+        queued records are rendered on the logging thread, where the stack no
+        longer leads back to the caller.
+        """
+        filename, line, local_values = caller
+
+        # 1. The message, values joined into one text as far as possible.
+        # Containers are pretty printed and renderables drawn on their own lines
+        parts: list[RenderableType] = []
+        for value in values:
+            if hasattr(value, "__rich_console__") or hasattr(value, "__rich__"):
+                parts.append(value)  # type: ignore[arg-type]
+                continue
+            if isinstance(value, (dict, list, tuple, set, frozenset)):
+                parts.append(Pretty(value))
+                continue
+            if isinstance(value, str):
+                text = console.render_str(value)
+            else:
+                text = console.render_str(str(value), markup=False)
+            if parts and isinstance(parts[-1], Text):
+                parts[-1].append(sep)
+                parts[-1].append_text(text)
+            else:
+                parts.append(text)
+        if parts and isinstance(parts[-1], Text):
+            parts[-1].append(end)
+        message: RenderableType = parts[0] if len(parts) == 1 else Group(*parts)
+        if local_values:
+            scope = {k: v for k, v in local_values.items() if not k.startswith("__")}
+            message = Group(message, render_scope(scope, title="[i]locals"))
+
+        # 2. The time, left blank while it repeats, and a link to the call site
+        timestamp = datetime.now().strftime("[%X]")
+        shown_time = " " * len(timestamp) if timestamp == self.last_time else timestamp
+        self.last_time = timestamp
+        path = Text(os.path.basename(filename), style=f"link file://{filename}")
+        path.append(":")
+        path.append(str(line), style=f"link file://{filename}#{line}")
+
+        row = Table.grid(padding=(0, 1), expand=True)
+        row.add_column(style="log.time")
+        row.add_column(ratio=1, style="log.message", overflow="fold")
+        row.add_column(style="log.path")
+        row.add_row(Text(shown_time), Styled(message, style), path)
+        console.print(row)
+
+    def _log(self, record: _Record) -> None:
         """Core logging logic to handle new and repeated messages."""
+        error, values, sep, end, name, style, caller, suppressed = record
+        console = self._econsole if error else self._console
+        stream = sys.stderr if error else sys.stdout
+
+        if len(values) == 1 and callable(values[0]):
+            values = (values[0](),)  # Lazy message, built only now
+        if suppressed:
+            values = (*values, f"[dim](+{suppressed} suppressed)[/]")
         current_message = sep.join(str(v) for v in values)
 
         if current_message == self.last_message and name == self.last_name:
@@ -68,14 +173,13 @@ class _GMasterLogger:
             self.repeat_line_printed = True
         else:
             # Logic for new messages
-            console.log(
-                *self._smart_gutter_prefix(name),
-                *values,
-                sep=sep,
-                end=end,
-                style=style,
-                log_locals=log_locals,
-                _stack_offset=4,
+            self._log_row(
+                console,
+                (*self._smart_gutter_prefix(name), *values),
+                sep,
+                end,
+                style,
+                caller,
             )
 
             self.last_message = current_message
@@ -85,76 +189,162 @@ class _GMasterLogger:
 
         self.len_last_name = len(name)
 
-    def e(
+    def submit(
         self,
-        *values: object,
-        sep: str = " ",
-        end: str = "",
-        name: str = "default",
-        style: str = "red",
+        frame: FrameType,
+        values: tuple[object, ...],
+        sep: str,
+        end: str,
+        name: str,
+        style: str,
+        error: bool,
+        every: float | None,
     ) -> None:
-        """Logs an error message to stderr."""
-        self._log(
-            console=self._econsole,
-            stream=sys.stderr,
-            values=values,
-            sep=sep,
-            end=end,
-            name=name,
-            style=style,
-            log_locals=True,
-        )
+        """
+        Logs one message from the caller at `frame`, on this thread or queued.
 
-    def i(
-        self,
-        *values: object,
-        sep: str = " ",
-        end: str = "",
-        name: str = "default",
-        style: str = "blue",
+        Args:
+            every (float | None): If set, messages from the same call site closer
+                together than this many seconds are dropped and counted instead.
+        """
+        site = (frame.f_code.co_filename, frame.f_lineno)
+        suppressed = 0
+        if every is not None:
+            now = time.monotonic()
+            if now - self._last_emitted.get(site, float("-inf")) < every:
+                self._suppressed[site] = self._suppressed.get(site, 0) + 1
+                return
+            self._last_emitted[site] = now
+            suppressed = self._suppressed.pop(site, 0)
+
+        # Locals are only rendered for errors, copy them before the frame moves on
+        caller = (*site, dict(frame.f_locals) if error else {})
+        record = (error, values, sep, end, name, style, caller, suppressed)
+        if self._queue is not None:
+            self._queue.put(record)
+        else:
+            self._log(record)
+
+    def _run_queue(
+        self, records: SimpleQueue[_Record | threading.Event | None]
     ) -> None:
-        """Logs an informational message to stdout."""
-        self._log(
-            console=self._console,
-            stream=sys.stdout,
-            values=values,
-            sep=sep,
-            end=end,
-            name=name,
-            style=style,
-            log_locals=False,
-        )
+        """The logging thread, rendering records until it gets None."""
+        while (record := records.get()) is not None:
+            if isinstance(record, threading.Event):
+                record.set()  # A flush marker, everything before it is written
+                continue
+            try:
+                self._log(record)
+            # Never let a bad message kill the thread. Rich raises SystemExit when
+            # stdout is a closed pipe, which would only end this thread
+            except (Exception, SystemExit) as error:
+                try:
+                    sys.stderr.write(f"GLogger failed to render a message: {error!r}\n")
+                except OSError:
+                    pass
+
+    def set_queued(self, queued: bool) -> None:
+        """Starts or stops rendering log records on a background thread."""
+        if queued and self._queue is None:
+            self._queue = SimpleQueue()
+            self._worker = threading.Thread(
+                target=self._run_queue, args=(self._queue,), name="glogger", daemon=True
+            )
+            self._worker.start()
+        elif not queued and self._queue is not None:
+            records, worker = self._queue, self._worker
+            self._queue = self._worker = None
+            records.put(None)
+            if worker is not None:
+                worker.join()
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Waits until every queued record has been written."""
+        if self._queue is None:
+            return
+        written = threading.Event()
+        self._queue.put(written)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not written.wait(0.1):
+            if self._worker is None or not self._worker.is_alive():
+                return
+            if deadline is not None and time.monotonic() > deadline:
+                return
 
 
 _gLogger = _GMasterLogger()
 
+# Queued records left at exit would otherwise vanish with the daemon thread
+atexit.register(_gLogger.set_queued, False)
+
+
+def set_log_queue(queued: bool) -> None:
+    """
+    Moves all log formatting and rendering to a background thread, or back.
+
+    Queued, a log call only captures its caller and enqueues its values, which are
+    turned into text later. Mutable values are rendered as they are by then, not
+    as they were at the call.
+    """
+    _gLogger.set_queued(queued)
+
+
+def flush_logs(timeout: float | None = None) -> None:
+    """Waits for the queued log records to be written, when logging is queued."""
+    _gLogger.flush(timeout)
+
 
 @lru_cache
 class GLogger:
+    """
+    A named logger.
+
+    Calls below the logger's level return straight away. A single callable value
+    is a lazy message, only called if the message is actually rendered:
+
+        glog.d(lambda: f"Meshed {describe(chunk)}")
+
+    Hot paths can pass `every` to log at most once per that many seconds from the
+    call site, the skipped messages are counted in the next one that gets through.
+    """
+
     # Logger state
     name: str
     err_color: str
     log_color: str
+    level: LogLevel
 
     def __init__(
-        self, err_color: str = "red", log_color: str = "blue", name: str = "default"
+        self,
+        err_color: str = "red",
+        log_color: str = "blue",
+        name: str = "default",
+        level: LogLevel | None = None,
     ) -> None:
         self.err_color = err_color
         self.log_color = log_color
         self.name = name
+        self.level = level if level is not None else DEFAULT_LEVEL
 
     def e(
         self,
         *values: object,
         sep: str = " ",
         end: str = "",
+        every: float | None = None,
     ) -> None:
-        _gLogger.e(
-            *values,
-            sep=sep,
-            end=end,
-            name=self.name,
-            style=self.err_color,
+        """Logs an error message, with the caller's locals, to stderr."""
+        if self.level > LogLevel.ERROR:
+            return
+        _gLogger.submit(
+            sys._getframe(1),
+            values,
+            sep,
+            end,
+            self.name,
+            self.err_color,
+            error=True,
+            every=every,
         )
 
     def i(
@@ -162,11 +352,39 @@ class GLogger:
         *values: object,
         sep: str = " ",
         end: str = "",
+        every: float | None = None,
+    ) -> None:
+        """Logs an informational message to stdout."""
+        if self.level > LogLevel.INFO:
+            return
+        _gLogger.submit(
+            sys._getframe(1),
+            values,
+            sep,
+            end,
+            self.name,
+            self.log_color,
+            error=False,
+            every=every,
+        )
+
+    def d(
+        self,
+        *values: object,
+        sep: str = " ",
+        end: str = "",
+        every: float | None = None,
     ) -> None:
-        _gLogger.i(
-            *values,
-            sep=sep,
-            end=end,
-            name=self.name,
-            style=self.log_color,
+        """Logs a debug message to stdout, hidden unless the level is DEBUG."""
+        if self.level > LogLevel.DEBUG:
+            return
+        _gLogger.submit(
+            sys._getframe(1),
+            values,
+            sep,
+            end,
+            self.name,
+            f"dim {self.log_color}",
+            error=False,
+            every=every,
         )
@@ -0,0 +1,120 @@
+import time
+from dataclasses import dataclass, field
+
+# Sleeps overshoot by up to a millisecond or so, the last stretch is spun instead
+SPIN_TIME = 0.002
+
+
+def sleep_until(deadline: float, spin: float = SPIN_TIME) -> None:
+    """
+    Waits until perf_counter() reaches `deadline`, accurate to a few microseconds.
+
+    Most of the wait is slept, so the CPU idles, and only the final `spin` seconds
+    are busy-waited to make up for the OS waking the thread late.
+    """
+    remaining = deadline - time.perf_counter()
+    if remaining > spin:
+        time.sleep(remaining - spin)
+    while time.perf_counter() < deadline:
+        pass
+
+
+@dataclass
+class FixedTimestep:
+    """
+    Turns variable frame times into a whole number of fixed length simulation ticks.
+
+    Each frame, advance() adds the frame's time and returns how many ticks to run.
+    The time left over is kept for the next frame, and `alpha` says how far the
+    frame is between the last two ticks, to interpolate what gets drawn.
+
+    Args:
+        tick_rate (float): Ticks per second.
+        max_ticks (int): Most ticks run in one frame. After a long stall the
+            simulation slows down instead of spending ever longer catching up.
+    """
+
+    tick_rate: float = 60.0
+    max_ticks: int = 5
+    _accumulator: float = field(default=0.0, init=False)
+
+    @property
+    def tick(self) -> float:
+        """Seconds per tick."""
+        return 1.0 / self.tick_rate
+
+    @property
+    def alpha(self) -> float:
+        """How far into the next tick the current frame is, from 0 to 1."""
+        return self._accumulator * self.tick_rate
+
+    def advance(self, frame_time: float) -> int:
+        """Adds a frame's time in seconds and returns the number of ticks to run."""
+        tick = self.tick
+        self._accumulator = min(
+            self._accumulator + max(frame_time, 0.0), tick * self.max_ticks
+        )
+        ticks = int(self._accumulator * self.tick_rate)
+        self._accumulator -= ticks * tick
+        return ticks
+
+
+@dataclass
+class FrameLimiter:
+    """
+    Holds frames to a steady rate by sleeping out the rest of each one.
+
+    Deadlines are a fixed period apart instead of measured from when each wait
+    ended, so oversleeping in one frame is made up in the next. A frame that ran
+    long resets the schedule rather than letting the following frames rush.
+    """
+
+    fps: float
+    _deadline: float | None = field(default=None, init=False)
+
+    @property
+    def period(self) -> float:
+        return 1.0 / self.fps
+
+    def wait(self) -> None:
+        """Waits until the current frame's time is up."""
+        now = time.perf_counter()
+        if self._deadline is None or now - self._deadline > self.period:
+            self._deadline = now
+            return
+        self._deadline += self.period
+        sleep_until(self._deadline)
+
+
+@dataclass
+class WorkBudget:
+    """
+    Hands the spare time of each frame to background work, like uploads and re-meshing.
+
+    The frame's render work (culling, draw submission) is timed with an
+    exponential moving average, and background work may use whatever the frame
+    period leaves after it. Every job still gets `min_slice`, so work keeps
+    moving when frames are already over time.
+
+    Args:
+        period (float): Seconds per frame, from the frame limit or refresh rate.
+        min_slice (float): Seconds any job gets, however late the frame is.
+    """
+
+    period: float
+    min_slice: float = 0.0005
+    render_estimate: float = 0.0
+    _frame_start: float = field(default=0.0, init=False)
+
+    def start_frame(self, frame_start: float) -> None:
+        self._frame_start = frame_start
+
+    def remaining(self, limit: float) -> float:
+        """Seconds the next job may take, no more than `limit`."""
+        deadline = self._frame_start + self.period - self.render_estimate
+        spare = deadline - time.perf_counter()
+        return min(limit, max(spare, self.min_slice))
+
+    def record_render(self, seconds: float, smoothing: float = 0.1) -> None:
+        """Adds a measurement of how long the frame's render work took."""
+        self.render_estimate += (seconds - self.render_estimate) * smoothing
@@ -2,17 +2,24 @@ import math
 
 import numpy as np
 from OpenGL.GL import (
-    GL_CLAMP_TO_EDGE,
     GL_COMPILE_STATUS,
     GL_FRAGMENT_SHADER,
     GL_LINEAR,
+    GL_LINEAR_MIPMAP_LINEAR,
     GL_LINK_STATUS,
+    GL_PROGRAM_BINARY_RETRIEVABLE_HINT,
+    GL_REPEAT,
     GL_RGB,
+    GL_RGBA,
+    GL_RGBA8,
     GL_TEXTURE_2D,
+    GL_TEXTURE_2D_ARRAY,
     GL_TEXTURE_MAG_FILTER,
+    GL_TEXTURE_MAX_LEVEL,
     GL_TEXTURE_MIN_FILTER,
     GL_TEXTURE_WRAP_S,
     GL_TEXTURE_WRAP_T,
+    GL_TRUE,
     GL_UNSIGNED_BYTE,
     GL_VERTEX_SHADER,
     glAttachShader,
@@ -27,12 +34,16 @@ from OpenGL.GL import (
     glGetShaderInfoLog,
     glGetShaderiv,
     glLinkProgram,
+    glProgramParameteri,
     glShaderSource,
     glTexImage2D,
+    glTexImage3D,
     glTexParameteri,
 )
 from PIL import Image
 
+from .textures import TextureArray
+
 
 def normalize(v: np.ndarray) -> np.ndarray:
     """Normalizes a vector."""
@@ -42,28 +53,62 @@ def normalize(v: np.ndarray) -> np.ndarray:
     return v / norm
 
 
-def look_at(eye: np.ndarray, target: np.ndarray, up: np.ndarray) -> np.ndarray:
-    """Creates a world to view matrix for a camera."""
-    zaxis = normalize(target - eye)
-    xaxis = normalize(np.cross(zaxis, up))
-    yaxis = np.cross(xaxis, zaxis)
-
-    # Create a 4x4 view matrix
-    view_matrix = np.array(
-        [
-            [xaxis[0], yaxis[0], -zaxis[0], 0],
-            [xaxis[1], yaxis[1], -zaxis[1], 0],
-            [xaxis[2], yaxis[2], -zaxis[2], 0],
-            [-np.dot(xaxis, eye), -np.dot(yaxis, eye), np.dot(zaxis, eye), 1],
-        ],
-        dtype=np.float32,
-    )
+def look_at(
+    eye: np.ndarray,
+    target: np.ndarray,
+    up: np.ndarray,
+    out: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Creates a world to view matrix for a camera.
+
+    The basis is worked out on plain floats, which for 3 vectors is several times
+    faster than NumPy and allocates no temporary arrays.
+
+    Args:
+        eye (np.ndarray): The camera position.
+        target (np.ndarray): The point it looks at.
+        up (np.ndarray): The world's up direction.
+        out (np.ndarray, optional): A (4, 4) float32 array to write the matrix into
+            instead of allocating a new one.
+    """
+    ex, ey, ez = float(eye[0]), float(eye[1]), float(eye[2])
+    ux, uy, uz = float(up[0]), float(up[1]), float(up[2])
+
+    # Forward, normalized
+    zx, zy, zz = float(target[0]) - ex, float(target[1]) - ey, float(target[2]) - ez
+    length = math.sqrt(zx * zx + zy * zy + zz * zz) or 1.0
+    zx, zy, zz = zx / length, zy / length, zz / length
 
-    return view_matrix
+    # Right = forward x up, normalized
+    xx, xy, xz = zy * uz - zz * uy, zz * ux - zx * uz, zx * uy - zy * ux
+    length = math.sqrt(xx * xx + xy * xy + xz * xz) or 1.0
+    xx, xy, xz = xx / length, xy / length, xz / length
+
+    # Camera up = right x forward
+    yx, yy, yz = xy * zz - xz * zy, xz * zx - xx * zz, xx * zy - xy * zx
+
+    if out is None:
+        out = np.empty((4, 4), dtype=np.float32)
+    # Row vector layout, the basis goes in the columns and the translation last
+    out[0] = xx, yx, -zx, 0.0
+    out[1] = xy, yy, -zy, 0.0
+    out[2] = xz, yz, -zz, 0.0
+    out[3] = (
+        -(xx * ex + xy * ey + xz * ez),
+        -(yx * ex + yy * ey + yz * ez),
+        zx * ex + zy * ey + zz * ez,
+        1.0,
+    )
+    return out
 
 
 def create_perspective_matrix(
-    fov_degrees: float, aspect_ratio: float, near: float, far: float
+    fov_degrees: float,
+    aspect_ratio: float,
+    near: float,
+    far: float,
+    out: np.ndarray | None = None,
 ) -> np.ndarray:
     """
     Creates a perspective projection matrix using NumPy.
@@ -72,6 +117,7 @@ def create_perspective_matrix(
     aspect_ratio: The aspect ratio of the viewport (width / height).
     near: The near clipping plane distance.
     far: The far clipping plane distance.
+    out: Optional (4, 4) float32 array to write into instead of allocating one.
 
     Returns a 4x4 NumPy array representing the perspective matrix.
     """
@@ -81,8 +127,12 @@ def create_perspective_matrix(
     # 2. Calculate the tangent of half the FOV
     tan_half_fov = math.tan(fov_rad / 2.0)
 
-    # 3. Initialize a 4x4 identity matrix
-    matrix = np.zeros((4, 4), dtype=np.float32)
+    # 3. Start from an all zero 4x4 matrix
+    if out is None:
+        matrix = np.zeros((4, 4), dtype=np.float32)
+    else:
+        matrix = out
+        matrix.fill(0.0)
 
     # 4. Set the matrix elements according to the perspective projection formula
 
@@ -98,13 +148,83 @@ def create_perspective_matrix(
     return matrix
 
 
-def compile_shader_program(vertex_path: str, fragment_path: str) -> int:
-    # Read shader source code from files
-    with open(vertex_path, "r") as f:
-        vertex_source = f.read()
-    with open(fragment_path, "r") as f:
-        fragment_source = f.read()
+def create_translation_matrix(offset: np.ndarray) -> np.ndarray:
+    """
+    Creates a model matrix that translates by the given (x, y, z) offset.
+
+    Like the other matrices here it is laid out for row vectors (translation in the
+    last row), so it composes with a view matrix as `model @ view`.
+    """
+    matrix = np.identity(4, dtype=np.float32)
+    matrix[3, :3] = offset
+    return matrix
+
+
+def extract_frustum_planes(view_projection: np.ndarray) -> np.ndarray:
+    """
+    Extracts the 6 clipping planes of a camera frustum (Gribb & Hartmann).
+
+    Args:
+        view_projection (np.ndarray): `view @ projection`, laid out for row vectors
+            like the other matrices here.
+
+    Returns:
+        np.ndarray: (6, 4) planes (a, b, c, d) with unit normals pointing into the
+            frustum, so a point is inside when a*x + b*y + c*z + d >= 0 for all 6.
+            Ordered left, right, bottom, top, near, far.
+    """
+    # Transpose back to column vector layout, where the planes are row sums
+    m = np.asarray(view_projection, dtype=np.float64).T
+    planes = np.stack(
+        (m[3] + m[0], m[3] - m[0], m[3] + m[1], m[3] - m[1], m[3] + m[2], m[3] - m[2])
+    )
+    planes /= np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+    return planes
+
+
+def boxes_in_frustum(
+    planes: np.ndarray, box_min: np.ndarray, box_max: np.ndarray
+) -> np.ndarray:
+    """
+    Tests a batch of axis aligned boxes against frustum planes at once.
+
+    A box is culled when it lies entirely behind any one plane, which is when its
+    center is further behind the plane than the box's extent along the normal.
+    This is conservative: boxes near the frustum corners may be kept.
+
+    Args:
+        planes (np.ndarray): (6, 4) planes from extract_frustum_planes.
+        box_min (np.ndarray): (N, 3) minimum corners.
+        box_max (np.ndarray): (N, 3) maximum corners.
+
+    Returns:
+        np.ndarray: (N,) bool, True for boxes that are at least partly inside.
+    """
+    normals = planes[:, :3]
+    centers = (box_min + box_max) * 0.5
+    half_extents = (box_max - box_min) * 0.5
+
+    # (N, 6) signed center distances, and the box's reach towards each plane
+    distances = centers @ normals.T + planes[:, 3]
+    reach = half_extents @ np.abs(normals).T
+    return (distances >= -reach).all(axis=1)
+
 
+def link_program(
+    vertex_source: str, fragment_source: str, retrievable: bool = False
+) -> int:
+    """
+    Compiles and links a shader program from source.
+
+    Args:
+        vertex_source (str): The vertex shader source.
+        fragment_source (str): The fragment shader source.
+        retrievable (bool, optional): Ask the driver to keep the linked binary around
+            for glGetProgramBinary. Defaults to False.
+
+    Returns:
+        int: The linked program.
+    """
     # Compile Vertex Shader
     vertex_shader = glCreateShader(GL_VERTEX_SHADER)
     glShaderSource(vertex_shader, vertex_source)
@@ -127,6 +247,8 @@ def compile_shader_program(vertex_path: str, fragment_path: str) -> int:
     shader_program = glCreateProgram()
     glAttachShader(shader_program, vertex_shader)
     glAttachShader(shader_program, fragment_shader)
+    if retrievable:
+        glProgramParameteri(shader_program, GL_PROGRAM_BINARY_RETRIEVABLE_HINT, GL_TRUE)
     glLinkProgram(shader_program)
     if not glGetProgramiv(shader_program, GL_LINK_STATUS):
         raise Exception(
@@ -145,14 +267,25 @@ def compile_shader_program(vertex_path: str, fragment_path: str) -> int:
     return shader_program
 
 
+def compile_shader_program(vertex_path: str, fragment_path: str) -> int:
+    # Read shader source code from files
+    with open(vertex_path, "r") as f:
+        vertex_source = f.read()
+    with open(fragment_path, "r") as f:
+        fragment_source = f.read()
+
+    return link_program(vertex_source, fragment_source)
+
+
 def load_texture(path: str) -> int:
     """Loads a texture from a file and returns the texture ID."""
     texture_id = glGenTextures(1)
     glBindTexture(GL_TEXTURE_2D, texture_id)
 
     # Set texture wrapping and filtering options
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+    # Repeat so greedy meshed quads tile the texture once per block
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
     glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
     glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
 
@@ -178,3 +311,36 @@ def load_texture(path: str) -> int:
         raise FileNotFoundError(f"Texture file not found at: {path}")
 
     return texture_id
+
+
+def load_texture_array(texture_array: TextureArray) -> int:
+    """Uploads a texture array and its mip levels and returns the texture ID."""
+    texture_id = glGenTextures(1)
+    glBindTexture(GL_TEXTURE_2D_ARRAY, texture_id)
+
+    # Repeat so greedy meshed quads tile the texture once per block
+    glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_WRAP_S, GL_REPEAT)
+    glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_WRAP_T, GL_REPEAT)
+    glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
+    glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+    glTexParameteri(
+        GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MAX_LEVEL, len(texture_array.levels) - 1
+    )
+
+    for level, data in enumerate(texture_array.levels):
+        layers, height, width, _ = data.shape
+        glTexImage3D(
+            GL_TEXTURE_2D_ARRAY,
+            level,
+            GL_RGBA8,
+            width,
+            height,
+            layers,
+            0,
+            GL_RGBA,
+            GL_UNSIGNED_BYTE,
+            data,
+        )
+
+    glBindTexture(GL_TEXTURE_2D_ARRAY, 0)
+    return texture_id
@@ -0,0 +1,192 @@
+import ctypes
+import hashlib
+import os
+import struct
+from functools import lru_cache
+
+from OpenGL.error import GLError
+from OpenGL.GL import (
+    GL_LINK_STATUS,
+    GL_NUM_PROGRAM_BINARY_FORMATS,
+    GL_PROGRAM_BINARY_LENGTH,
+    GL_RENDERER,
+    GL_VENDOR,
+    GL_VERSION,
+    glCreateProgram,
+    glDeleteProgram,
+    glGetIntegerv,
+    glGetProgramBinary,
+    glGetProgramiv,
+    glGetString,
+    glProgramBinary,
+)
+
+from .glogger import GLogger
+from .render import link_program
+
+glog = GLogger(name="shaders")
+
+# INFO: Program binary cache file layout
+#   preamble: magic b"GSHB", format version, driver binary format   (<4sII)
+#   the rest: the driver's program binary, opaque to us
+# Files are named by a hash of both sources and the driver's vendor, renderer and
+# version strings, so a driver update simply misses the cache.
+_PREAMBLE = struct.Struct("<4sII")
+_MAGIC = b"GSHB"
+_VERSION = 1
+
+
+def _driver_identity() -> bytes:
+    """The strings that decide whether a program binary from earlier still loads."""
+    return b"\0".join(
+        glGetString(name) or b"" for name in (GL_VENDOR, GL_RENDERER, GL_VERSION)
+    )
+
+
+def _binaries_supported() -> bool:
+    """Whether the driver can hand out program binaries at all (macOS can't)."""
+    if not bool(glGetProgramBinary) or not bool(glProgramBinary):
+        return False
+    return int(glGetIntegerv(GL_NUM_PROGRAM_BINARY_FORMATS)) > 0
+
+
+def load_cached_program(
+    vertex_source: str, fragment_source: str, cache_dir: str
+) -> tuple[int, bool]:
+    """
+    Gets a linked program from the binary cache, or compiles and caches it.
+
+    Any cache problem, like a missing or unreadable file, a stale binary or a driver
+    rejecting it, falls back to compiling from source. Failing to write the cache is
+    logged and the compiled program still returned.
+
+    Args:
+        vertex_source (str): The vertex shader source.
+        fragment_source (str): The fragment shader source.
+        cache_dir (str): The directory holding cached program binaries.
+
+    Returns:
+        tuple[int, bool]: The program, and whether it came from the cache.
+    """
+    if not _binaries_supported():
+        return link_program(vertex_source, fragment_source), False
+
+    key = hashlib.sha256(
+        b"\0".join(
+            (vertex_source.encode(), fragment_source.encode(), _driver_identity())
+        )
+    ).hexdigest()
+    path = os.path.join(cache_dir, f"{key}.bin")
+
+    # 1. Try the cached binary
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        data = None
+    except OSError as error:
+        glog.e(f"Can't read shader cache entry {key[:12]}: {error}")
+        data = None
+
+    if data is not None and len(data) > _PREAMBLE.size:
+        magic, version, binary_format = _PREAMBLE.unpack_from(data)
+        if magic == _MAGIC and version == _VERSION:
+            binary = data[_PREAMBLE.size :]
+            program = glCreateProgram()
+            try:
+                # An unknown binary_format raises GL_INVALID_ENUM rather than failing
+                # the link
+                glProgramBinary(program, binary_format, binary, len(binary))
+                if glGetProgramiv(program, GL_LINK_STATUS):
+                    return program, True
+            except GLError:
+                pass
+            glDeleteProgram(program)
+        glog.i(f"Discarding stale shader cache entry {key[:12]}")
+
+    # 2. Compile from source and store the linked binary
+    program = link_program(vertex_source, fragment_source, retrievable=True)
+    length = int(glGetProgramiv(program, GL_PROGRAM_BINARY_LENGTH))
+    if length <= 0:
+        return program, False
+
+    binary = (ctypes.c_ubyte * length)()
+    written = ctypes.c_int(0)
+    binary_format = ctypes.c_uint(0)
+    glGetProgramBinary(
+        program, length, ctypes.byref(written), ctypes.byref(binary_format), binary
+    )
+
+    # A read only or full cache dir only costs the next launch a compile
+    temporary = f"{path}.tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(temporary, "wb") as f:
+            f.write(_PREAMBLE.pack(_MAGIC, _VERSION, binary_format.value))
+            f.write(bytes(binary)[: written.value])
+        os.replace(temporary, path)
+    except OSError as error:
+        glog.e(f"Can't write shader cache entry {key[:12]}: {error}")
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+    return program, False
+
+
+@lru_cache
+class ShaderRegistry:
+    """
+    Hands out linked shader programs, compiling each at most once per process.
+
+    Like GLogger, constructing a registry with the same cache_dir returns the same
+    instance, so every system can just ask for its shaders by path.
+    """
+
+    cache_dir: str | None
+    programs: dict[tuple[str, str], int]
+
+    def __init__(self, cache_dir: str | None = None) -> None:
+        """
+        Args:
+            cache_dir (str, optional): Directory for cached program binaries. Programs
+                are always compiled from source when omitted.
+        """
+        self.cache_dir = cache_dir
+        self.programs = {}
+
+    def get(self, vertex_path: str, fragment_path: str) -> int:
+        """
+        Gets the program linked from a vertex and fragment shader file.
+
+        Requires a current GL context, and programs are only valid within it.
+        """
+        key = (vertex_path, fragment_path)
+        program = self.programs.get(key)
+        if program is not None:
+            return program
+
+        with open(vertex_path, "r") as f:
+            vertex_source = f.read()
+        with open(fragment_path, "r") as f:
+            fragment_source = f.read()
+
+        if self.cache_dir is None:
+            program, cached = link_program(vertex_source, fragment_source), False
+        else:
+            program, cached = load_cached_program(
+                vertex_source, fragment_source, self.cache_dir
+            )
+        glog.i(
+            f"{'Loaded cached' if cached else 'Compiled'} shader program "
+            f"{os.path.basename(vertex_path)} + {os.path.basename(fragment_path)}"
+        )
+
+        self.programs[key] = program
+        return program
+
+    def clear(self) -> None:
+        """Deletes every program, e.g. before the GL context goes away."""
+        for program in self.programs.values():
+            glDeleteProgram(program)
+        self.programs.clear()
@@ -0,0 +1,271 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+
+import numpy as np
+
+# INFO: Texture array cache file layout
+#   preamble: magic b"GTEX", format version, manifest length   (<4sII)
+#   manifest: utf-8 JSON describing the layers and their source files
+#   padding up to a multiple of _DATA_ALIGNMENT
+#   data:     every mip level back to back, each (layers, size, size, 4) RGBA uint8
+# The data is memory-mapped on load, so a warm start never decodes a PNG.
+_PREAMBLE = struct.Struct("<4sII")
+_MAGIC = b"GTEX"
+_VERSION = 1
+_DATA_ALIGNMENT = 64
+
+# Magenta and black checkers for layers without a texture
+_MISSING_COLORS = np.array([[255, 0, 255, 255], [0, 0, 0, 255]], dtype=np.uint8)
+
+
+@dataclass
+class TextureArray:
+    """Equally sized RGBA layers with their mip chain, ready for a GL texture array."""
+
+    names: list[str | None]
+    levels: list[np.ndarray]  # (layers, size, size, 4) uint8, full size first
+    from_cache: bool = False
+    _mapping: mmap.mmap | None = field(default=None, repr=False)
+
+    @property
+    def size(self) -> int:
+        return self.levels[0].shape[1]
+
+    def close(self) -> None:
+        """Releases the cache file mapping, the levels must not be used afterwards."""
+        self.levels = []
+        if self._mapping is not None:
+            self._mapping.close()
+            self._mapping = None
+
+
+def build_mipmaps(layers: np.ndarray) -> list[np.ndarray]:
+    """
+    Builds the full mip chain of a stack of square RGBA layers with a 2x2 box filter.
+
+    Args:
+        layers (np.ndarray): (layers, size, size, 4) uint8.
+
+    Returns:
+        list[np.ndarray]: Every level down to 1x1, starting with `layers` itself.
+    """
+    levels = [layers]
+    level = layers.astype(np.float32)
+    while level.shape[1] > 1:
+        # Odd sizes drop their last row and column, like GL's floor(size / 2)
+        even = level.shape[1] // 2 * 2
+        level = level[:, :even, :even]
+        level = (
+            level[:, 0::2, 0::2]
+            + level[:, 1::2, 0::2]
+            + level[:, 0::2, 1::2]
+            + level[:, 1::2, 1::2]
+        ) * 0.25
+        levels.append(np.rint(level).astype(np.uint8))
+    return levels
+
+
+def _find_source(directory: str, name: str) -> str | None:
+    """Finds the texture for `name`, either name.png or name_<anything>.png."""
+    for entry in sorted(os.listdir(directory)):
+        stem, extension = os.path.splitext(entry)
+        if extension.lower() == ".png" and (
+            stem == name or stem.startswith(f"{name}_")
+        ):
+            return os.path.join(directory, entry)
+    return None
+
+
+def _hash_file(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _decode_layers(
+    sources: Sequence[str | None],
+) -> np.ndarray:
+    """Decodes the source PNGs, scaling them all to the largest with nearest filtering."""
+    from PIL import Image  # Only needed when the cache is cold
+
+    images: list[Image.Image | None] = []
+    for path in sources:
+        if path is None:
+            images.append(None)
+            continue
+        with Image.open(path) as img:
+            # Flip image to match what opengl expects (0,0 is bottom left, not top left)
+            img = img.transpose(Image.Transpose.FLIP_TOP_BOTTOM)
+            images.append(img.convert("RGBA"))
+
+    size = max((max(img.size) for img in images if img is not None), default=16)
+    layers = np.empty((len(images), size, size, 4), dtype=np.uint8)
+    for i, img in enumerate(images):
+        if img is None:
+            checker = (np.arange(size)[:, None] * 2 // size) ^ (
+                np.arange(size)[None, :] * 2 // size
+            )
+            layers[i] = _MISSING_COLORS[checker]
+        else:
+            if img.size != (size, size):
+                img = img.resize((size, size), Image.Resampling.NEAREST)
+            layers[i] = np.asarray(img)
+    return layers
+
+
+def _write_cache(
+    path: str, manifest: dict[str, object], levels: Sequence[np.ndarray]
+) -> None:
+    """Writes the cache file atomically, so a crash never leaves a torn cache."""
+    manifest_bytes = json.dumps(manifest).encode()
+    header_size = _PREAMBLE.size + len(manifest_bytes)
+    padding = -header_size % _DATA_ALIGNMENT
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(_PREAMBLE.pack(_MAGIC, _VERSION, len(manifest_bytes)))
+        f.write(manifest_bytes)
+        f.write(b"\0" * padding)
+        for level in levels:
+            f.write(np.ascontiguousarray(level).tobytes())
+    os.replace(temporary, path)
+
+
+def _level_shapes(manifest: dict) -> list[tuple[int, int, int, int]]:
+    """The (layers, edge, edge, 4) shape of every mip level a manifest describes."""
+    layers, size = int(manifest["layers"]), int(manifest["size"])
+    return [
+        (layers, max(size >> level, 1), max(size >> level, 1), 4)
+        for level in range(int(manifest["levels"]))
+    ]
+
+
+def _read_cache(path: str) -> tuple[dict, mmap.mmap, int] | None:
+    """
+    Maps a cache file, returning its manifest, mapping and data offset.
+
+    Returns None for anything that isn't a complete cache, including a file cut
+    short of the texel data its manifest describes.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+
+    with f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size:
+            return None
+        magic, version, manifest_length = _PREAMBLE.unpack(preamble)
+        if magic != _MAGIC or version != _VERSION:
+            return None
+        try:
+            manifest = json.loads(f.read(manifest_length))
+            shapes = _level_shapes(manifest)
+        except (ValueError, TypeError, KeyError):
+            return None
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    header_size = _PREAMBLE.size + manifest_length
+    data_offset = header_size + (-header_size % _DATA_ALIGNMENT)
+    if len(mapping) < data_offset + sum(int(np.prod(shape)) for shape in shapes):
+        mapping.close()
+        return None
+    return manifest, mapping, data_offset
+
+
+def build_texture_array(
+    directory: str, names: Sequence[str | None], cache_path: str
+) -> TextureArray:
+    """
+    Packs the named textures of a directory into one texture array, through a cache.
+
+    Layer i holds the texture for names[i], found as names[i].png or names[i]_*.png.
+    Layers whose name is None or has no file get a magenta checker instead.
+
+    The decoded layers and their mip chain are written to `cache_path` and memory
+    mapped on later calls. Sources are only hashed when their mtime or size moved,
+    and only decoded with PIL when that hash, the names or the file set changed.
+
+    Args:
+        directory (str): The directory holding the PNG textures.
+        names (Sequence): The texture name of every layer, in layer order.
+        cache_path (str): Where the decoded texture array is cached.
+
+    Returns:
+        TextureArray: The layers and their mip levels.
+    """
+    sources = [
+        _find_source(directory, name) if name is not None else None for name in names
+    ]
+
+    # 1. Try the cache, checking every source against the manifest
+    cached = _read_cache(cache_path)
+    if cached is not None:
+        manifest, mapping, data_offset = cached
+        entries = manifest.get("sources", [])
+        valid = manifest.get("names") == list(names) and [
+            entry and entry["path"] for entry in entries
+        ] == [source and os.path.relpath(source, directory) for source in sources]
+
+        refresh = False
+        for entry, source in zip(entries, sources):
+            if not valid:
+                break
+            if source is None:
+                continue
+            stat = os.stat(source)
+            if stat.st_mtime_ns == entry["mtime_ns"] and stat.st_size == entry["size"]:
+                continue
+            # Touched but maybe not changed, e.g. by a checkout, so compare contents
+            valid = _hash_file(source) == entry["sha256"]
+            entry["mtime_ns"], entry["size"] = stat.st_mtime_ns, stat.st_size
+            refresh = True
+
+        if valid:
+            levels: list[np.ndarray] = []
+            offset = data_offset
+            for shape in _level_shapes(manifest):
+                levels.append(
+                    np.frombuffer(
+                        mapping, np.uint8, int(np.prod(shape)), offset
+                    ).reshape(shape)
+                )
+                offset += levels[-1].nbytes
+
+            if refresh:
+                # Only the manifest changed, rewrite it so the next start skips hashing
+                _write_cache(cache_path, manifest, levels)
+            return TextureArray(list(names), levels, True, mapping)
+        mapping.close()
+
+    # 2. Cold cache, decode and mip the sources then cache the result
+    levels = build_mipmaps(_decode_layers(sources))
+    source_entries: list[dict[str, object] | None] = []
+    for source in sources:
+        if source is None:
+            source_entries.append(None)
+            continue
+        stat = os.stat(source)
+        source_entries.append(
+            {
+                "path": os.path.relpath(source, directory),
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "sha256": _hash_file(source),
+            }
+        )
+    manifest = {
+        "names": list(names),
+        "sources": source_entries,
+        "layers": len(names),
+        "size": levels[0].shape[1],
+        "levels": len(levels),
+    }
+    _write_cache(cache_path, manifest, levels)
+    return TextureArray(list(names), levels)
@@ -0,0 +1,18 @@
+#version 330 core
+
+// Input from vertex shader
+in vec2 v_tex_coord;
+flat in float v_layer;
+in float v_shade;
+
+// Output to the framebuffer
+out vec4 FragColor;
+
+// One layer per block type, see g_utils.build_texture_array
+uniform sampler2DArray u_texture;
+
+void main()
+{
+    vec4 color = texture(u_texture, vec3(v_tex_coord, v_layer));
+    FragColor = vec4(color.rgb * v_shade, color.a);
+}
@@ -0,0 +1,42 @@
+#version 330 core
+
+// Packed vertex data (from the VBO), see src/g_game/terrain/packing.py
+//   x: x:5 | y:5 | z:5 | face:3 | u:5 | v:5 | ao:2
+//   y: tile:8 | block light:4 | sky light:4 | slot:16
+layout(location = 0) in uvec2 aPacked;
+
+// Output to fragment shader
+out vec2 v_tex_coord;
+flat out float v_layer;
+out float v_shade;
+
+uniform mat4 projection;
+uniform mat4 modelView;
+uniform vec3 chunkSize;
+
+// Chunk position of every MeshArena slot, in texel xyz
+uniform isamplerBuffer chunkPositions;
+
+// Brightness lost per light level below 15, and per level of ambient occlusion
+const float LIGHT_FALLOFF = 0.8;
+const float AO_STRENGTH = 0.2;
+
+// Light never goes fully black, so unlit caves stay faintly readable
+const float MIN_BRIGHTNESS = 0.05;
+
+void main() {
+  uint a = aPacked.x;
+  uint b = aPacked.y;
+
+  vec3 local = vec3(a & 31u, (a >> 5) & 31u, (a >> 10) & 31u);
+  vec3 chunk = vec3(texelFetch(chunkPositions, int(b >> 16)).xyz);
+
+  gl_Position = projection * modelView * vec4(chunk * chunkSize + local, 1.0);
+  v_tex_coord = vec2((a >> 18) & 31u, (a >> 23) & 31u);
+  v_layer = float(b & 255u);  // Texture array layers are indexed by block type
+
+  // The brighter of sky and block light, darkened by ambient occlusion
+  float level = float(max((b >> 12) & 15u, (b >> 8) & 15u));
+  float ao = float((a >> 28) & 3u);
+  v_shade = max(pow(LIGHT_FALLOFF, 15.0 - level), MIN_BRIGHTNESS) * (1.0 - AO_STRENGTH * ao);
+}